@@ -4,15 +4,31 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_mail import Mail 
+from flask_migrate import Migrate
 
 db = SQLAlchemy()
 mail = Mail() 
+migrate = Migrate()
 
-def create_app():
+# Pasta das migrações do Alembic (na raiz do projeto, ao lado de app/)
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'migrations')
+
+def create_app(config=None):
+    """
+    Cria a aplicação. 'config' substitui valores da configuração padrão
+    (ex.: o banco temporário dos benchmarks em SQLALCHEMY_DATABASE_URI).
+    """
+    config = config or {}
     app = Flask(__name__)
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../instance/site.db'
+    # URL e opções do pool vêm de DATABASE_URL / DB_* (ver app/database.py)
+    from .database import configure_database, init_engine
+    configure_database(app, config.get('SQLALCHEMY_DATABASE_URI'))
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Segundos que o bloqueio/perfil de um usuário fica em cache para os decoradores de acesso
+    app.config['IDENTITY_CACHE_TTL'] = 30
+    # Raio, em metros, em que uma ocorrência nova é ligada aos pontos de monitoramento ativos
+    app.config['MONITORING_RADIUS_M'] = 500
 
     app.config['SECRET_KEY'] = 'uma_chave_secreta_bem_longa_e_aleatoria_para_sua_sessao'
     
@@ -36,10 +52,47 @@ def create_app():
     # Veja a documentação do Flask-Mail para mais detalhes se tiver problemas: https://flask-mail.readthedocs.io/en/latest/
 
 
+    app.config.update(config)
+
     CORS(app, supports_credentials=True, origins=['http://localhost:5173']) 
 
     db.init_app(app)
+    init_engine(app, db)
     mail.init_app(app) 
+    # render_as_batch: o SQLite só altera colunas recriando a tabela
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
+
+    # Latência, consultas SQL e tamanho das respostas por endpoint; /metrics e Server-Timing (ver app/metrics.py)
+    from .metrics import Instrumentation
+    Instrumentation(app)
+
+    # Fila assíncrona de e-mails (worker em segundo plano, ver app/mail_queue.py)
+    from .mail_queue import MailQueue
+    MailQueue(app)
+
+    # Tabelas de referência (status, perfis, tipos de pontuação) em memória
+    from .lookups import LookupRegistry
+    LookupRegistry(app)
+
+    # Hash de senhas em um pool de processos, com política configurável (ver app/passwords.py)
+    from .passwords import PasswordHasher
+    PasswordHasher(app)
+
+    # Limite de tentativas em /login, /register e /forgot-password (ver app/rate_limit.py)
+    from .rate_limit import RateLimiter
+    RateLimiter(app)
+
+    # Processamento das imagens enviadas em segundo plano (ver app/images.py)
+    from .images import ImagePipeline
+    ImagePipeline(app)
+
+    # Tiles do mapa de calor com cache em disco (ver app/heatmap.py)
+    from .heatmap import HeatmapTiles
+    HeatmapTiles(app)
+
+    # Cache das respostas de leitura com ETag/304 e compressão gzip (ver app/response_cache.py)
+    from .response_cache import ResponseCache
+    ResponseCache(app)
 
     instance_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'instance')
     if not os.path.exists(instance_path):
@@ -56,6 +109,16 @@ def create_app():
     from .models.coordenada import Coordenada
     from .models.tipo_pontuacao import TipoPontuacao
     from .models.ponto_monitoramento import PontoMonitoramento
+    from .models.fila_email import FilaEmail
+    from .models.historico_pontuacao import HistoricoPontuacao
+    from .models.limite_requisicao import LimiteRequisicao
+    from .models.pontuacao_periodo import PontuacaoPeriodo
+    from .models.resumo_ocorrencia import ResumoOcorrencia
+
+    # Resumo dos painéis atualizado a cada flush das ocorrências (ver app/analytics.py)
+    from . import analytics
+    # Ocorrências novas ligadas aos pontos de monitoramento próximos (ver app/monitoring.py)
+    from . import monitoring
 
     # Importe o módulo de decoradores
     from . import decorators # Adicione esta linha
@@ -0,0 +1,360 @@
+# SVCA/app/analytics.py
+# Resumo materializado das ocorrências (por status, órgão, semana e célula do mapa) mantido
+# incrementalmente a cada flush, e os agregados servidos aos painéis a partir dele.
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.base import NO_VALUE
+
+from . import db
+from .lookups import get_lookups
+from .models.coordenada import Coordenada
+from .models.ocorrencia import Ocorrencia
+from .models.orgao_responsavel import OrgaoResponsavel
+from .models.resumo_ocorrencia import ResumoOcorrencia
+
+# Lado das células do mapa, em graus (~1,1 km no equador)
+TAMANHO_CELULA_GRAUS = 0.01
+
+# Semanas devolvidas em por_semana quando ?semanas não é informado
+SEMANAS_PADRAO = 26
+
+# Campos de Ocorrencia que entram no resumo
+CAMPOS_RESUMO = ('status_id', 'orgao_responsavel_id', 'data_registro', 'data_finalizacao', 'coordenada_id')
+
+
+def cell_key(latitude, longitude):
+    return f"{math.floor(latitude / TAMANHO_CELULA_GRAUS)}:{math.floor(longitude / TAMANHO_CELULA_GRAUS)}"
+
+
+def cell_center(chave):
+    i, j = (int(parte) for parte in chave.split(':'))
+    return round((i + 0.5) * TAMANHO_CELULA_GRAUS, 6), round((j + 0.5) * TAMANHO_CELULA_GRAUS, 6)
+
+
+def contributions(status_id, orgao_id, data_registro, data_finalizacao, coordenadas):
+    """
+    Linhas do resumo em que uma ocorrência é contada: {(dimensao, chave, status_id):
+    (quantidade, finalizadas, dias até a finalização)}. 'coordenadas' é (lat, lon) ou None.
+    """
+    dias = (data_finalizacao - data_registro).days if data_finalizacao and data_registro else None
+    medidas = (1, 1 if dias is not None else 0, dias or 0)
+    chaves = [
+        (ResumoOcorrencia.DIMENSAO_TOTAL, ''),
+        (ResumoOcorrencia.DIMENSAO_ORGAO, str(orgao_id) if orgao_id else ''),
+    ]
+    if data_registro:
+        chaves.append((ResumoOcorrencia.DIMENSAO_SEMANA, (data_registro - timedelta(days=data_registro.weekday())).isoformat()))
+    if coordenadas:
+        chaves.append((ResumoOcorrencia.DIMENSAO_CELULA, cell_key(*coordenadas)))
+    return {(dimensao, chave, status_id): medidas for dimensao, chave in chaves}
+
+
+def add_contributions(totais, contribuicoes, sinal=1):
+    for chave, (quantidade, finalizadas, dias) in contribuicoes.items():
+        atual = totais.get(chave, (0, 0, 0))
+        totais[chave] = (atual[0] + sinal * quantidade, atual[1] + sinal * finalizadas, atual[2] + sinal * dias)
+    return totais
+
+
+def summary_rows(totais):
+    return [{
+        'dimensao': dimensao, 'chave': chave, 'status_id': status_id,
+        'quantidade': quantidade, 'finalizadas': finalizadas, 'dias_ate_finalizacao': dias,
+    } for (dimensao, chave, status_id), (quantidade, finalizadas, dias) in totais.items()
+        if quantidade or finalizadas or dias]
+
+
+def upsert_summary(executor, linhas):
+    """
+    Soma as linhas às de resumo_ocorrencia (INSERT ... ON CONFLICT DO UPDATE atômico no
+    SQLite e no PostgreSQL). 'executor' é a sessão ou uma conexão.
+    """
+    if not linhas:
+        return
+    tabela = ResumoOcorrencia.__table__
+    medidas = ('quantidade', 'finalizadas', 'dias_ate_finalizacao')
+    dialeto = db.engine.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(tabela)
+        statement = statement.on_conflict_do_update(
+            index_elements=[tabela.c.dimensao, tabela.c.chave, tabela.c.status_id],
+            set_={medida: tabela.c[medida] + statement.excluded[medida] for medida in medidas},
+        )
+        executor.execute(statement, linhas)
+        return
+    for linha in linhas:
+        alteradas = executor.execute(tabela.update().where(
+            tabela.c.dimensao == linha['dimensao'], tabela.c.chave == linha['chave'], tabela.c.status_id == linha['status_id']
+        ).values({medida: tabela.c[medida] + linha[medida] for medida in medidas})).rowcount
+        if not alteradas:
+            executor.execute(tabela.insert(), [linha])
+
+
+def _valores(occ, antigos):
+    # Valores do último flush (antigos=True) ou os atuais do objeto. Os CAMPOS_RESUMO têm
+    # active_history (ver models/ocorrencia.py): mesmo expirado, o valor anterior é carregado
+    # ao alterar o atributo, e um valor anterior nulo aparece como histórico sem 'deleted'.
+    estado = inspect(occ)
+    valores = {}
+    for campo in CAMPOS_RESUMO:
+        if antigos and campo in estado.committed_state:
+            anterior = estado.committed_state[campo]
+            if anterior is NO_VALUE:
+                # Nunca trata um valor não carregado como nulo: lê o que está no banco
+                anterior = db.session.execute(
+                    db.select(getattr(Ocorrencia, campo)).where(Ocorrencia.id == occ.id)
+                ).scalar()
+            valores[campo] = anterior
+        else:
+            valores[campo] = getattr(occ, campo)
+    return valores
+
+
+def _coordenadas_alteradas(session):
+    # Posição final das coordenadas movidas (lat/lon alterados) ou removidas (None) neste flush
+    alteradas = {}
+    for coordenada in session.dirty:
+        if isinstance(coordenada, Coordenada) and coordenada.id is not None:
+            estado = inspect(coordenada)
+            if any(estado.attrs[campo].history.has_changes() for campo in ('latitude', 'longitude')):
+                alteradas[coordenada.id] = (coordenada.latitude, coordenada.longitude)
+    for coordenada in session.deleted:
+        if isinstance(coordenada, Coordenada):
+            alteradas[coordenada.id] = None
+    return alteradas
+
+
+def _relacionamento_alterado(occ):
+    # Coordenada ou órgão trocados pelo objeto: o id só é sincronizado durante o flush
+    estado = inspect(occ)
+    return estado.attrs.coordenada.history.has_changes() or estado.attrs.orgao_responsavel.history.has_changes()
+
+
+@event.listens_for(db.session, 'before_flush')
+def _atualizar_resumo(session, flush_context, instances):
+    """
+    Aplica ao resumo, na mesma transação, a diferença das ocorrências novas, alteradas
+    e removidas neste flush, e das que mudam sem serem alteradas: as de um órgão removido
+    (o flush anula o órgão) e as de uma coordenada movida ou removida (mudam de célula).
+    Cargas feitas fora do ORM usam rebuild_summary().
+    """
+    # Pendências de um flush que falhou não valem para este
+    session.info.pop('resumo_aguardando_id', None)
+    mudancas = []
+    for occ in session.new:
+        if isinstance(occ, Ocorrencia):
+            mudancas.append((None, _valores(occ, antigos=False), occ))
+    for occ in session.dirty:
+        if isinstance(occ, Ocorrencia) and session.is_modified(occ):
+            antes, depois = _valores(occ, antigos=True), _valores(occ, antigos=False)
+            if any(antes[campo] != depois[campo] for campo in CAMPOS_RESUMO) or _relacionamento_alterado(occ):
+                mudancas.append((antes, depois, occ))
+    for occ in session.deleted:
+        if isinstance(occ, Ocorrencia):
+            mudancas.append((_valores(occ, antigos=True), None, occ))
+
+    orgaos_removidos = {orgao.id for orgao in session.deleted if isinstance(orgao, OrgaoResponsavel)}
+    coordenadas_alteradas = _coordenadas_alteradas(session)
+    if orgaos_removidos or coordenadas_alteradas:
+        # Ocorrências do órgão ou da coordenada que não estão entre as alteradas: valores do banco
+        tratadas = {occ.id for _, _, occ in mudancas if occ.id is not None}
+        colunas = [getattr(Ocorrencia, campo) for campo in CAMPOS_RESUMO]
+        afetadas = session.execute(db.select(Ocorrencia.id, *colunas).where(
+            db.or_(Ocorrencia.orgao_responsavel_id.in_(orgaos_removidos),
+                   Ocorrencia.coordenada_id.in_(coordenadas_alteradas)),
+            Ocorrencia.id.not_in(tratadas),
+        ))
+        for linha in afetadas:
+            valores = dict(zip(CAMPOS_RESUMO, linha[1:]))
+            mudancas.append((valores, dict(valores), None))
+    if not mudancas:
+        return
+
+    # Coordenadas de todas as ocorrências afetadas com uma consulta (posições antes do flush)
+    coordenada_ids = {valores['coordenada_id'] for antes, depois, _ in mudancas for valores in (antes, depois)
+                      if valores and valores['coordenada_id']}
+    coordenadas = {}
+    if coordenada_ids:
+        coordenadas = {linha.id: (linha.latitude, linha.longitude) for linha in session.execute(
+            db.select(Coordenada.id, Coordenada.latitude, Coordenada.longitude).where(Coordenada.id.in_(coordenada_ids))
+        )}
+
+    def posicao(valores, occ, final):
+        coordenada_id = valores['coordenada_id']
+        if not final:
+            return coordenadas.get(coordenada_id)
+        # Coordenada trocada pelo relacionamento (ex.: nova, ainda sem id): vale o objeto
+        if occ is not None and 'coordenada' in occ.__dict__ and (
+                coordenada_id is None or inspect(occ).attrs.coordenada.history.has_changes()):
+            pendente = occ.__dict__['coordenada']
+            if pendente is None or pendente in session.deleted:
+                return None
+            return pendente.latitude, pendente.longitude
+        if coordenada_id in coordenadas_alteradas:
+            return coordenadas_alteradas[coordenada_id]
+        return coordenadas.get(coordenada_id)
+
+    def orgao(valores, occ, final):
+        orgao_id = valores['orgao_responsavel_id']
+        if not final:
+            return orgao_id
+        # Órgão trocado pelo relacionamento: vale o objeto (o id de um órgão novo só existe após o flush)
+        if occ is not None and 'orgao_responsavel' in occ.__dict__ and (
+                orgao_id is None or inspect(occ).attrs.orgao_responsavel.history.has_changes()):
+            pendente = occ.__dict__['orgao_responsavel']
+            return None if pendente is None or pendente in session.deleted else pendente
+        return None if orgao_id in orgaos_removidos else orgao_id
+
+    totais = {}
+    aguardando_id = []
+    for antes, depois, occ in mudancas:
+        if antes:
+            add_contributions(totais, contributions(
+                antes['status_id'], antes['orgao_responsavel_id'], antes['data_registro'], antes['data_finalizacao'],
+                posicao(antes, occ, final=False),
+            ), -1)
+        if depois:
+            orgao_final = orgao(depois, occ, final=True)
+            medidas = [depois['status_id'], orgao_final, depois['data_registro'], depois['data_finalizacao'],
+                       posicao(depois, occ, final=True)]
+            if isinstance(orgao_final, OrgaoResponsavel):
+                if orgao_final.id is None:
+                    aguardando_id.append(medidas)
+                    continue
+                medidas[1] = orgao_final.id
+            add_contributions(totais, contributions(*medidas))
+    upsert_summary(session, summary_rows(totais))
+    if aguardando_id:
+        session.info.setdefault('resumo_aguardando_id', []).extend(aguardando_id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _resumo_de_orgaos_novos(session, flush_context):
+    # Ocorrências ligadas a um órgão criado no mesmo flush: contadas quando ele já tem id
+    totais = {}
+    for status_id, orgao, data_registro, data_finalizacao, posicao in session.info.pop('resumo_aguardando_id', ()):
+        add_contributions(totais, contributions(status_id, orgao.id, data_registro, data_finalizacao, posicao))
+    if totais:
+        upsert_summary(session, summary_rows(totais))
+
+
+def rebuild_summary(batch_size=10000):
+    """
+    Recalcula resumo_ocorrencia a partir de todas as ocorrências (ex.: após cargas em
+    massa feitas fora do ORM). Retorna o número de linhas gravadas.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(ResumoOcorrencia.__table__.delete())
+        resultado = connection.execute(
+            db.select(
+                Ocorrencia.status_id, Ocorrencia.orgao_responsavel_id, Ocorrencia.data_registro,
+                Ocorrencia.data_finalizacao, Coordenada.latitude, Coordenada.longitude,
+            ).outerjoin(Coordenada, Coordenada.id == Ocorrencia.coordenada_id),
+            execution_options={'yield_per': batch_size},
+        )
+        totais = {}
+        for linha in resultado:
+            posicao = (linha.latitude, linha.longitude) if linha.latitude is not None else None
+            add_contributions(totais, contributions(linha.status_id, linha.orgao_responsavel_id, linha.data_registro,
+                                                         linha.data_finalizacao, posicao))
+        linhas = summary_rows(totais)
+        for inicio in range(0, len(linhas), batch_size):
+            upsert_summary(connection, linhas[inicio:inicio + batch_size])
+    return len(linhas)
+
+
+def _media(dias, finalizadas):
+    return round(dias / finalizadas, 1) if finalizadas else None
+
+
+def _por_chave(dimensao, filtros=()):
+    # Soma das medidas por chave da dimensão (GROUP BY sobre o resumo, não sobre as ocorrências)
+    return db.session.query(
+        ResumoOcorrencia.chave,
+        db.func.sum(ResumoOcorrencia.quantidade),
+        db.func.sum(ResumoOcorrencia.finalizadas),
+        db.func.sum(ResumoOcorrencia.dias_ate_finalizacao),
+    ).filter(ResumoOcorrencia.dimensao == dimensao, *filtros).group_by(ResumoOcorrencia.chave)
+
+
+def build_dashboard(incluir_orgaos=True, semanas=SEMANAS_PADRAO):
+    """
+    Agregados dos painéis: ocorrências por status, órgão, semana e célula do mapa, tempo
+    médio entre registro e finalização e taxa de recusa. Cada parte é um GROUP BY sobre
+    resumo_ocorrencia, cujo tamanho não depende do número de ocorrências.
+    """
+    lookups = get_lookups()
+    recusada_id = lookups.id_for('status', 'Recusada')
+    registrada_id = lookups.id_for('status', 'Registrada')
+    fechadas_ids = [status_id for status_id in (
+        lookups.id_for('status', 'Fechada com solução'), lookups.id_for('status', 'Fechada sem solução')
+    ) if status_id]
+
+    por_status = db.session.query(
+        ResumoOcorrencia.status_id, ResumoOcorrencia.quantidade,
+        ResumoOcorrencia.finalizadas, ResumoOcorrencia.dias_ate_finalizacao,
+    ).filter(ResumoOcorrencia.dimensao == ResumoOcorrencia.DIMENSAO_TOTAL).all()
+    total = sum(linha.quantidade for linha in por_status)
+    quantidade_por_status = {linha.status_id: linha.quantidade for linha in por_status}
+    recusadas = quantidade_por_status.get(recusada_id, 0)
+    moderadas = total - quantidade_por_status.get(registrada_id, 0)
+    fechadas = [linha for linha in por_status if linha.status_id in fechadas_ids]
+
+    resultado = {
+        'total': total,
+        'por_status': [{
+            'status_id': linha.status_id,
+            'status': lookups.name_for('status', linha.status_id),
+            'quantidade': linha.quantidade,
+            'tempo_medio_finalizacao_dias': _media(linha.dias_ate_finalizacao, linha.finalizadas),
+        } for linha in sorted(por_status, key=lambda linha: linha.status_id) if linha.quantidade],
+        # Tempo médio de registro até o fechamento (com ou sem solução)
+        'tempo_medio_finalizacao_dias': _media(
+            sum(linha.dias_ate_finalizacao for linha in fechadas), sum(linha.finalizadas for linha in fechadas)
+        ),
+        # Fração das ocorrências já moderadas que foram recusadas
+        'taxa_recusa': round(recusadas / moderadas, 4) if moderadas else None,
+    }
+
+    inicio = datetime.now().date() - timedelta(weeks=semanas)
+    recusadas_por_semana = dict(db.session.query(ResumoOcorrencia.chave, ResumoOcorrencia.quantidade).filter(
+        ResumoOcorrencia.dimensao == ResumoOcorrencia.DIMENSAO_SEMANA,
+        ResumoOcorrencia.status_id == recusada_id,
+        ResumoOcorrencia.chave >= inicio.isoformat(),
+    ))
+    resultado['por_semana'] = [{
+        'semana': chave,
+        'quantidade': quantidade,
+        'recusadas': recusadas_por_semana.get(chave, 0),
+        'tempo_medio_finalizacao_dias': _media(dias, finalizadas),
+    } for chave, quantidade, finalizadas, dias in sorted(_por_chave(
+        ResumoOcorrencia.DIMENSAO_SEMANA, [ResumoOcorrencia.chave >= inicio.isoformat()]
+    )) if quantidade]
+
+    resultado['por_celula'] = []
+    for chave, quantidade, _, _ in _por_chave(ResumoOcorrencia.DIMENSAO_CELULA):
+        if quantidade:
+            latitude, longitude = cell_center(chave)
+            resultado['por_celula'].append({'latitude': latitude, 'longitude': longitude, 'quantidade': quantidade})
+    resultado['tamanho_celula_graus'] = TAMANHO_CELULA_GRAUS
+
+    if incluir_orgaos:
+        por_orgao = [linha for linha in _por_chave(ResumoOcorrencia.DIMENSAO_ORGAO) if linha[1]]
+        orgao_ids = [int(chave) for chave, *_ in por_orgao if chave]
+        nomes = dict(db.session.query(OrgaoResponsavel.id, OrgaoResponsavel.nome).filter(
+            OrgaoResponsavel.id.in_(orgao_ids)
+        )) if orgao_ids else {}
+        resultado['por_orgao'] = [{
+            'orgao_id': int(chave) if chave else None,
+            'nome': nomes.get(int(chave)) if chave else None,
+            'quantidade': quantidade,
+            'tempo_medio_finalizacao_dias': _media(dias, finalizadas),
+        } for chave, quantidade, finalizadas, dias in sorted(por_orgao, key=lambda linha: -linha[1])]
+
+    return resultado
@@ -0,0 +1,2 @@
+# SVCA/app/benchmarks/__init__.py
+# Benchmarks executados pelos comandos da CLI (flask cli ...).
@@ -0,0 +1,279 @@
+# SVCA/app/benchmarks/api.py
+# Teste de carga da API: popula uma base sintética em um banco temporário e mede latência
+# e vazão dos principais endpoints com o test client do Flask, em uma ou várias threads.
+import io
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from PIL import Image
+
+from .. import create_app, db
+from ..images import output_dir, rendition_filenames
+from ..models.imagem import Imagem
+from ..models.usuario import Usuario
+from ..search import create_search_index
+from ..spatial import create_spatial_index
+from .dataset import CENTRO, seed_dataset
+
+# Endpoints medidos, na ordem do relatório
+ENDPOINTS = (
+    'login',
+    'active-occurrences',
+    'active-occurrences-bbox',
+    'occurrences',
+    'my-occurrences',
+    'ranking-semanal',
+    'view-occurrence',
+    'register-occurrence',
+)
+
+# Configuração do app do benchmark: nada de e-mails e sem limite de tentativas no /login
+BENCHMARK_CONFIG = {
+    'MAIL_QUEUE_WORKER': False,
+    'RATE_LIMIT_ENABLED': False,
+    'METRICS_QUERY_BUDGET': 0,
+    'METRICS_SERVER_TIMING': False,
+    # Mede o trabalho de cada endpoint, não o cache de respostas
+    'RESPONSE_CACHE_ENABLED': False,
+}
+
+
+def _imagem_jpeg(rng, lado=640):
+    # Ruído aleatório: cada upload tem conteúdo (e SHA-256) diferente, como fotos reais
+    img = Image.frombytes('RGB', (lado // 8, lado // 8), rng.randbytes(3 * (lado // 8) ** 2))
+    buffer = io.BytesIO()
+    img.resize((lado, lado)).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def _logar(client, usuario_id, perfil):
+    with client.session_transaction() as sess:
+        sess['user_id'] = usuario_id
+        sess['user_name'] = 'Benchmark'
+        sess['user_profile'] = perfil
+
+
+def _cenarios(dados):
+    """
+    Nome -> (perfil da sessão ou None, função(client, rng) que prepara a requisição e
+    retorna uma função sem argumentos que a executa; só a execução é cronometrada).
+    """
+    ocorrencia_ids = dados['ocorrencia_ids']
+
+    def login(client, rng):
+        corpo = {'email': rng.choice(dados['emails']), 'password': dados['senha']}
+        return lambda: client.post('/login', json=corpo)
+
+    def active_bbox(client, rng):
+        # Janela de mapa de ~3 km em volta de um ponto da região da base
+        lat = CENTRO[0] + rng.uniform(-0.1, 0.1)
+        lon = CENTRO[1] + rng.uniform(-0.1, 0.1)
+        url = f'/active-occurrences?bbox={lon - 0.015},{lat - 0.015},{lon + 0.015},{lat + 0.015}&zoom=15'
+        return lambda: client.get(url)
+
+    def register(client, rng):
+        data = {
+            'titulo': 'Ocorrência do benchmark',
+            'endereco': 'Rua do Benchmark, 1 - Centro',
+            'descricao': 'Registrada pelo teste de carga da API.',
+            'latitude': str(CENTRO[0] + rng.uniform(-0.1, 0.1)),
+            'longitude': str(CENTRO[1] + rng.uniform(-0.1, 0.1)),
+            'imagens': (io.BytesIO(_imagem_jpeg(rng)), 'foto.jpg'),
+        }
+        return lambda: client.post('/register-occurrence', data=data, content_type='multipart/form-data')
+
+    def get(url):
+        return lambda client, rng: (lambda: client.get(url))
+
+    def view(client, rng):
+        url = f'/view-occurrence/{rng.choice(ocorrencia_ids)}'
+        return lambda: client.get(url)
+
+    return {
+        'login': (None, login),
+        'active-occurrences': ('Usuario', get('/active-occurrences')),
+        'active-occurrences-bbox': ('Usuario', active_bbox),
+        'occurrences': ('Moderador', get('/occurrences')),
+        'my-occurrences': ('Usuario', get('/my-occurrences')),
+        'ranking-semanal': (None, get('/ranking-semanal')),
+        'view-occurrence': ('Usuario', view),
+        'register-occurrence': ('Usuario', register),
+    }
+
+
+def _percentis(tempos):
+    ordenados = sorted(tempos)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))], 3)
+
+    return {
+        'media_ms': round(statistics.fmean(ordenados), 3),
+        'p50_ms': p(0.50),
+        'p90_ms': p(0.90),
+        'p95_ms': p(0.95),
+        'p99_ms': p(0.99),
+        'max_ms': round(ordenados[-1], 3),
+    }
+
+
+def _medir(app, dados, perfil, fazer, requests, workers, seed, aquecimento):
+    usuario_por_perfil = {'Usuario': dados['usuario_ids'], 'Moderador': [dados['moderador_id']]}
+    proximo = iter(range(requests))
+    lock = threading.Lock()
+    tempos = []
+    erros = {}
+
+    def worker(indice):
+        rng = random.Random(seed * 1000 + indice)
+        client = app.test_client()
+        if perfil:
+            _logar(client, rng.choice(usuario_por_perfil[perfil]), perfil)
+        for _ in range(aquecimento if indice == 0 else 0):
+            fazer(client, rng)()
+        locais = []
+        while True:
+            with lock:
+                if next(proximo, None) is None:
+                    break
+            requisicao = fazer(client, rng)
+            t0 = time.perf_counter()
+            response = requisicao()
+            locais.append((time.perf_counter() - t0) * 1000)
+            if response.status_code >= 400:
+                with lock:
+                    erros[response.status_code] = erros.get(response.status_code, 0) + 1
+        with lock:
+            tempos.extend(locais)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - t0
+
+    resultado = {
+        'requisicoes': len(tempos),
+        'erros': {str(status): total for status, total in sorted(erros.items())},
+        'req_por_s': round(len(tempos) / duracao, 1) if duracao else None,
+    }
+    if tempos:
+        resultado.update(_percentis(tempos))
+    return resultado
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_api_benchmark(users=200, occurrences=5000, orgaos=20, requests=200, workers=1, seed=42,
+                      endpoints=ENDPOINTS, database_url=None):
+    """
+    Cria uma base sintética (seed_dataset) em um SQLite temporário, ou no banco vazio de
+    'database_url', e mede 'requests' requisições por endpoint divididas entre 'workers'
+    threads. Retorna o relatório em um dicionário serializável em JSON, com chaves
+    estáveis para comparar execuções (ver compare_reports).
+    """
+    desconhecidos = set(endpoints) - set(ENDPOINTS)
+    if desconhecidos:
+        raise ValueError(f"Endpoints desconhecidos: {', '.join(sorted(desconhecidos))}.")
+
+    pasta = tempfile.mkdtemp(prefix='svca-benchmark-')
+    url = database_url or f"sqlite:///{os.path.join(pasta, 'benchmark.db')}"
+    app = create_app(dict(BENCHMARK_CONFIG, SQLALCHEMY_DATABASE_URI=url))
+    imagens_geradas = []
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                create_search_index(connection)
+                create_spatial_index(connection)
+            dados = seed_dataset(users=users, occurrences=occurrences, orgaos=orgaos, seed=seed)
+            dados['emails'] = [email for (email,) in db.session.query(Usuario.email).filter(
+                Usuario.id.in_(list(dados['usuario_ids'][:500]))
+            )]
+            maior_imagem_id = db.session.query(db.func.max(Imagem.id)).scalar() or 0
+            db.session.remove()
+
+        cenarios = _cenarios(dados)
+        resultados = {}
+        for nome in ENDPOINTS:
+            if nome not in endpoints:
+                continue
+            perfil, fazer = cenarios[nome]
+            resultados[nome] = _medir(app, dados, perfil, fazer, requests, workers, seed, aquecimento=min(5, requests))
+
+        with app.app_context():
+            # Espera as imagens enviadas pelo register-occurrence para apagar os arquivos gerados
+            app.extensions['image_pipeline'].shutdown()
+            imagens_geradas = [nome for (nome,) in db.session.query(Imagem.nome_arquivo).filter(
+                Imagem.id > maior_imagem_id, Imagem.nome_arquivo.isnot(None)
+            )]
+            banco = db.engine.dialect.name
+            db.session.remove()
+    finally:
+        with app.app_context():
+            pasta_saida = output_dir()
+            for nome_arquivo in imagens_geradas:
+                for filename in rendition_filenames(nome_arquivo):
+                    caminho = os.path.join(pasta_saida, filename)
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                    # Remove também a subpasta do prefixo do hash, se ficou vazia
+                    subpasta = os.path.dirname(caminho)
+                    if os.path.isdir(subpasta) and not os.listdir(subpasta):
+                        os.rmdir(subpasta)
+            app.extensions['password_hasher'].shutdown()
+            db.engine.dispose()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'banco': banco,
+        'parametros': {
+            'usuarios': users,
+            'ocorrencias': occurrences,
+            'orgaos': orgaos,
+            'requisicoes_por_endpoint': requests,
+            'workers': workers,
+            'seed': seed,
+        },
+        'base': {chave: dados[chave] for chave in ('usuarios', 'orgaos', 'ocorrencias', 'imagens',
+                                                   'notificacoes', 'historico_pontuacao', 'tempo_s')},
+        'endpoints': resultados,
+    }
+
+
+def compare_reports(anterior, atual, metricas=('p50_ms', 'p95_ms', 'req_por_s')):
+    """
+    Variação percentual de cada métrica por endpoint entre dois relatórios.
+    """
+    comparacao = {}
+    for nome, resultado in atual['endpoints'].items():
+        base = anterior.get('endpoints', {}).get(nome)
+        if not base:
+            continue
+        comparacao[nome] = {}
+        for metrica in metricas:
+            antes, depois = base.get(metrica), resultado.get(metrica)
+            variacao = round((depois - antes) / antes * 100, 1) if antes and depois is not None else None
+            comparacao[nome][metrica] = {'antes': antes, 'depois': depois, 'variacao_pct': variacao}
+    return comparacao
@@ -0,0 +1,336 @@
+# SVCA/app/benchmarks/dataset.py
+# Base sintética (usuários, órgãos, ocorrências com coordenadas, imagens, notificações
+# e histórico de pontos) para benchmarks, testes de carga e dimensionamento do banco.
+# As linhas são gravadas direto nas tabelas dos modelos, em lotes com executemany.
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import bindparam
+
+from .. import db
+from ..analytics import add_contributions, contributions, summary_rows, upsert_summary
+from ..models.coordenada import Coordenada
+from ..models.historico_pontuacao import HistoricoPontuacao
+from ..models.imagem import Imagem
+from ..models.notificacao import Notificacao
+from ..models.ocorrencia import Ocorrencia, StatusOcorrencia
+from ..models.orgao_responsavel import OrgaoResponsavel
+from ..models.perfil import Perfil
+from ..models.tipo_pontuacao import TipoPontuacao
+from ..models.usuario import Usuario
+from ..passwords import get_password_hasher
+from ..scoring import aggregate_rows, upsert_aggregates
+from ..search import create_search_index, drop_search_index, search_index_available
+from ..spatial import create_spatial_index, drop_spatial_index, spatial_index_available
+from .search import BAIRROS, COMPLEMENTOS, NOMES, PALAVRAS, SOBRENOMES, _frase
+
+PERFIS = ('Administrador', 'Moderador', 'Usuario')
+STATUS = ('Em andamento', 'Fechada com solução', 'Fechada sem solução', 'Recusada', 'Registrada')
+TIPOS_PONTUACAO = ('OcorrenciaValidada', 'OcorrenciaSolucionada', 'OcorrenciaFalsa')
+
+# Distribuição dos status: as ocorrências recentes ainda aguardam moderação, as antigas já foram tratadas
+PESOS_STATUS_RECENTES = {'Registrada': 70, 'Em andamento': 20, 'Recusada': 10}
+PESOS_STATUS_ANTIGAS = {'Registrada': 15, 'Em andamento': 25, 'Fechada com solução': 40, 'Fechada sem solução': 10, 'Recusada': 10}
+DIAS_RECENTES = 14
+
+# Pontos do autor por status (as mesmas regras da moderação em main_controller.py)
+PONTOS_POR_STATUS = {
+    'Em andamento': (25, 'OcorrenciaValidada'),
+    'Fechada com solução': (50, 'OcorrenciaSolucionada'),
+}
+
+# Cidade das coordenadas (Recife): as ocorrências se concentram em volta dos centros de bairro
+CENTRO = (-8.05, -34.90)
+RAIO_CIDADE_GRAUS = 0.06
+BAIRROS_EXTRAS = [
+    'Boa Vista', 'Derby', 'Aflitos', 'Casa Forte', 'Poço', 'Iputinga', 'Cordeiro', 'Imbiribeira',
+    'Pina', 'Jardim São Paulo', 'Tejipió', 'Campo Grande', 'Arruda', 'Beberibe', 'Água Fria', 'Jaqueira',
+]
+# Fração das ocorrências espalhadas pela cidade, fora dos bairros
+FRACAO_DISPERSA = 0.1
+
+PROBLEMAS = [
+    'Buraco', 'Poste sem iluminação', 'Lixo acumulado', 'Vazamento de água', 'Semáforo quebrado',
+    'Calçada danificada', 'Esgoto a céu aberto', 'Árvore caída', 'Entulho', 'Alagamento',
+    'Bueiro entupido', 'Sinalização apagada', 'Pichação', 'Asfalto cedendo',
+]
+LOGRADOUROS = ['Rua', 'Avenida', 'Travessa', 'Praça', 'Estrada']
+
+# Senha de todos os usuários sintéticos
+SENHA_SINTETICA = 'senha123'
+
+# Tabelas que recebem IDs explícitos (ver _ajustar_sequencias)
+MODELOS_SINTETICOS = (Usuario, OrgaoResponsavel, Coordenada, Ocorrencia, Imagem, Notificacao, HistoricoPontuacao)
+
+
+def _garantir_referencias():
+    """
+    Cria perfis, status e tipos de pontuação ausentes (os mesmos do seed-db) e retorna
+    os IDs por nome.
+    """
+    ids = {}
+    for modelo, nomes in ((Perfil, PERFIS), (StatusOcorrencia, STATUS), (TipoPontuacao, TIPOS_PONTUACAO)):
+        existentes = {linha.nome: linha.id for linha in modelo.query.all()}
+        novos = [modelo(nome=nome) for nome in nomes if nome not in existentes]
+        if novos:
+            db.session.add_all(novos)
+            db.session.flush()
+            existentes.update({linha.nome: linha.id for linha in novos})
+        ids[modelo.__tablename__] = existentes
+    db.session.commit()
+    return ids
+
+
+def _aglomerados(rng):
+    """
+    Centros de bairro com pesos de Zipf (poucos bairros concentram a maioria das
+    ocorrências), cada um com seu raio: (bairro, latitude, longitude, desvio).
+    """
+    bairros = BAIRROS + BAIRROS_EXTRAS
+    rng.shuffle(bairros)
+    centros = [(
+        bairro,
+        rng.gauss(CENTRO[0], RAIO_CIDADE_GRAUS),
+        rng.gauss(CENTRO[1], RAIO_CIDADE_GRAUS),
+        rng.uniform(0.003, 0.012),
+    ) for bairro in bairros]
+    return centros, list(accumulate(1 / posicao for posicao in range(1, len(centros) + 1)))
+
+
+def _inserir(connection, modelo, linhas):
+    if linhas:
+        connection.execute(modelo.__table__.insert(), linhas)
+
+
+def _ajustar_sequencias(connection):
+    # IDs explícitos não avançam as sequências do PostgreSQL
+    if connection.dialect.name != 'postgresql':
+        return
+    for modelo in MODELOS_SINTETICOS:
+        tabela = modelo.__tablename__
+        connection.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {tabela}))"
+        ))
+
+
+def seed_dataset(users=200, occurrences=5000, orgaos=20, images_per_occurrence=1, seed=42,
+                 batch_size=20000, rebuild_indexes=True, progress=None):
+    """
+    Popula o banco atual com uma base sintética reprodutível (mesma 'seed', mesmos dados).
+
+    Cria, além dos usuários comuns, um administrador e um moderador
+    (admin-sintetico-s<seed>@example.com e moderador-sintetico-s<seed>@example.com);
+    todos usam a senha SENHA_SINTETICA. As coordenadas se concentram em bairros da
+    cidade, os autores seguem uma distribuição de Zipf e cada ocorrência tem em média
+    'images_per_occurrence' imagens (só os registros, sem arquivos). Ocorrências
+    moderadas recebem órgão e notificação ao órgão e, quando validadas, o histórico
+    de pontos do autor.
+
+    As linhas recebem IDs explícitos e são gravadas com executemany, 'batch_size'
+    ocorrências por transação; progress(feitas, total) é chamado após cada lote. Com
+    'rebuild_indexes', os índices FTS5/R*Tree do SQLite são removidos durante a carga
+    e reconstruídos de uma vez no fim, em vez de atualizados linha a linha pelos triggers.
+    Retorna as quantidades criadas e os intervalos de IDs gerados.
+    """
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    ids = _garantir_referencias()
+    perfis, status, tipos = ids['perfil'], ids['status_ocorrencia'], ids['tipo_pontuacao']
+
+    # Os e-mails levam a semente: bases com sementes diferentes podem coexistir no mesmo banco
+    sufixo = f"s{seed}"
+    if Usuario.query.filter_by(email=f'admin-sintetico-{sufixo}@example.com').first():
+        raise ValueError(f"Já existe uma base sintética com a semente {seed}; use outra semente.")
+
+    # Um único hash para todas as contas: o custo do hash não faz parte da carga da base
+    senha_hash = get_password_hasher().hash(SENHA_SINTETICA)
+    primeiro = {modelo: (db.session.query(db.func.max(modelo.id)).scalar() or 0) + 1 for modelo in MODELOS_SINTETICOS}
+    db.session.remove()
+
+    engine = db.engine
+    indices = []
+    if rebuild_indexes and search_index_available():
+        indices.append(create_search_index)
+    if rebuild_indexes and spatial_index_available():
+        indices.append(create_spatial_index)
+    if indices:
+        with engine.begin() as connection:
+            drop_search_index(connection)
+            drop_spatial_index(connection)
+
+    admin_id = primeiro[Usuario]
+    moderador_id = admin_id + 1
+    usuario_ids = range(moderador_id + 1, moderador_id + 1 + users)
+    orgao_ids = range(primeiro[OrgaoResponsavel], primeiro[OrgaoResponsavel] + orgaos)
+    orgao_emails = {orgao_id: f"orgao{i + 1}-{sufixo}@example.com" for i, orgao_id in enumerate(orgao_ids)}
+    ocorrencia_ids = range(primeiro[Ocorrencia], primeiro[Ocorrencia] + occurrences)
+
+    with engine.begin() as connection:
+        usuario_padrao = dict(telefone=None, senha=senha_hash, avatar_url='/avatar.svg',
+                              ocorrencias_recusadas_count=0, is_blocked=False, pontos=0)
+        linhas = [
+            dict(usuario_padrao, id=admin_id, nome='Administrador Sintético',
+                 email=f'admin-sintetico-{sufixo}@example.com', perfil_id=perfis['Administrador']),
+            dict(usuario_padrao, id=moderador_id, nome='Moderador Sintético',
+                 email=f'moderador-sintetico-{sufixo}@example.com', perfil_id=perfis['Moderador']),
+        ]
+        for i, usuario_id in enumerate(usuario_ids):
+            linhas.append(dict(
+                usuario_padrao, id=usuario_id, nome=f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+                email=f"usuario{i + 1}-{sufixo}@example.com",
+                telefone=f"(81)9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                perfil_id=perfis['Usuario'],
+            ))
+            if len(linhas) >= batch_size:
+                _inserir(connection, Usuario, linhas)
+                linhas = []
+        _inserir(connection, Usuario, linhas)
+
+        _inserir(connection, OrgaoResponsavel, [{
+            'id': orgao_id,
+            'nome': f"Secretaria de {rng.choice(PALAVRAS).capitalize()} - {rng.choice(BAIRROS)}",
+            'email': email,
+            'telefone': f"(81)3{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+        } for orgao_id, email in orgao_emails.items()])
+
+    # Poucos usuários muito ativos e muitos com uma ou duas ocorrências (pesos de Zipf)
+    autores = list(usuario_ids) or [admin_id]
+    rng.shuffle(autores)
+    pesos_autores = list(accumulate(1 / posicao for posicao in range(1, len(autores) + 1)))
+    aglomerados, pesos_aglomerados = _aglomerados(rng)
+    distribuicoes = {
+        recente: (list(pesos), list(accumulate(pesos.values())))
+        for recente, pesos in ((True, PESOS_STATUS_RECENTES), (False, PESOS_STATUS_ANTIGAS))
+    }
+
+    agora = datetime.now()
+    proximo = {modelo: primeiro[modelo] for modelo in (Imagem, Notificacao, HistoricoPontuacao)}
+    pontos_por_usuario = {}
+    recusadas_por_usuario = {}
+    contagem = {'imagens': 0, 'notificacoes': 0, 'historico_pontuacao': 0}
+
+    for inicio in range(0, occurrences, batch_size):
+        coordenadas, ocorrencias, imagens, notificacoes, historico = [], [], [], [], []
+        for n in range(inicio, min(occurrences, inicio + batch_size)):
+            ocorrencia_id = primeiro[Ocorrencia] + n
+            coordenada_id = primeiro[Coordenada] + n
+
+            bairro, lat, lon, desvio = rng.choices(aglomerados, cum_weights=pesos_aglomerados)[0]
+            if rng.random() < FRACAO_DISPERSA:
+                lat, lon, desvio = CENTRO[0], CENTRO[1], RAIO_CIDADE_GRAUS * 1.5
+            coordenadas.append({'id': coordenada_id, 'latitude': rng.gauss(lat, desvio), 'longitude': rng.gauss(lon, desvio)})
+
+            # Mais ocorrências recentes que antigas (uso crescente ao longo do último ano)
+            idade = timedelta(days=rng.triangular(0, 365, 0))
+            registrada_em = agora - idade
+            nomes_status, pesos_status = distribuicoes[idade.days < DIAS_RECENTES]
+            nome_status = rng.choices(nomes_status, cum_weights=pesos_status)[0]
+            autor = rng.choices(autores, cum_weights=pesos_autores)[0]
+            moderada_em = min(agora, registrada_em + timedelta(hours=rng.uniform(2, 96)))
+            orgao_id = rng.choice(orgao_ids) if nome_status not in ('Registrada', 'Recusada') and orgao_ids else None
+            pontos = PONTOS_POR_STATUS.get(nome_status)
+            problema = rng.choice(PROBLEMAS)
+
+            ocorrencias.append({
+                'id': ocorrencia_id,
+                'titulo': f"{problema} na {rng.choice(LOGRADOUROS)} {rng.choice(SOBRENOMES)}",
+                'descricao': f"{problema} {_frase(rng, rng.randint(8, 20), COMPLEMENTOS)}.",
+                'data_registro': registrada_em.date(),
+                'data_finalizacao': (moderada_em + timedelta(days=rng.uniform(1, 45))).date()
+                if nome_status.startswith('Fechada') else None,
+                'endereco': f"{rng.choice(LOGRADOUROS)} {rng.choice(SOBRENOMES)}, {rng.randint(1, 3000)} - {bairro}",
+                'status_id': status[nome_status],
+                'usuario_id': autor,
+                'orgao_responsavel_id': orgao_id,
+                'coordenada_id': coordenada_id,
+                'tipo_pontuacao_id': tipos[pontos[1]] if pontos else None,
+                'justificativa_recusa': 'Ocorrência duplicada ou sem evidências.' if nome_status == 'Recusada' else None,
+            })
+
+            for _ in range(rng.randint(0, 2 * images_per_occurrence)):
+                base = f"/static/uploads/ocorrencias/sintetica/{rng.getrandbits(128):032x}"
+                imagens.append({
+                    'id': proximo[Imagem], 'url': f"{base}.jpg", 'url_media': f"{base}_medium.jpg",
+                    'url_thumbnail': f"{base}_thumb.jpg", 'largura': 1600, 'altura': 1200,
+                    'nome_arquivo': None, 'status': Imagem.STATUS_PRONTA, 'erro': None, 'ocorrencia_id': ocorrencia_id,
+                })
+                proximo[Imagem] += 1
+
+            if orgao_id:
+                notificacoes.append({
+                    'id': proximo[Notificacao],
+                    'mensagem': "Notificação enviada ao Órgão Responsável.",
+                    'data_envio': moderada_em.strftime("%Y-%m-%d %H:%M:%S"),
+                    'email_destino': orgao_emails[orgao_id],
+                    'ocorrencia_id': ocorrencia_id,
+                })
+                proximo[Notificacao] += 1
+
+            if pontos:
+                delta, tipo = pontos
+                historico.append({
+                    'id': proximo[HistoricoPontuacao], 'usuario_id': autor, 'ocorrencia_id': ocorrencia_id,
+                    'tipo_pontuacao_id': tipos[tipo], 'delta': delta, 'criado_em': moderada_em,
+                })
+                proximo[HistoricoPontuacao] += 1
+                pontos_por_usuario[autor] = pontos_por_usuario.get(autor, 0) + delta
+            elif nome_status == 'Recusada':
+                recusadas_por_usuario[autor] = recusadas_por_usuario.get(autor, 0) + 1
+
+        with engine.begin() as connection:
+            _inserir(connection, Coordenada, coordenadas)
+            _inserir(connection, Ocorrencia, ocorrencias)
+            _inserir(connection, Imagem, imagens)
+            _inserir(connection, Notificacao, notificacoes)
+            _inserir(connection, HistoricoPontuacao, historico)
+            # Somas por semana/mês do ranking, como o motor de pontuação faria a cada lançamento
+            upsert_aggregates(connection, aggregate_rows((h['usuario_id'], h['delta'], h['criado_em']) for h in historico))
+            # Resumo dos painéis, como o flush do ORM faria para cada ocorrência
+            resumo = {}
+            for o, c in zip(ocorrencias, coordenadas):
+                add_contributions(resumo, contributions(o['status_id'], o['orgao_responsavel_id'], o['data_registro'],
+                                                             o['data_finalizacao'], (c['latitude'], c['longitude'])))
+            upsert_summary(connection, summary_rows(resumo))
+        contagem['imagens'] += len(imagens)
+        contagem['notificacoes'] += len(notificacoes)
+        contagem['historico_pontuacao'] += len(historico)
+        if progress:
+            progress(min(occurrences, inicio + batch_size), occurrences)
+
+    with engine.begin() as connection:
+        totais = [
+            {'b_id': usuario_id, 'b_pontos': pontos_por_usuario.get(usuario_id, 0),
+             'b_recusadas': recusadas_por_usuario.get(usuario_id, 0)}
+            for usuario_id in pontos_por_usuario.keys() | recusadas_por_usuario.keys()
+        ]
+        if totais:
+            tabela = Usuario.__table__
+            connection.execute(
+                tabela.update().where(tabela.c.id == bindparam('b_id')).values(
+                    pontos=bindparam('b_pontos'), ocorrencias_recusadas_count=bindparam('b_recusadas'),
+                ),
+                totais,
+            )
+        _ajustar_sequencias(connection)
+
+    t_indices = time.perf_counter()
+    if indices:
+        with engine.begin() as connection:
+            for criar in indices:
+                criar(connection)
+
+    return {
+        'usuarios': users + 2,
+        'orgaos': orgaos,
+        'ocorrencias': occurrences,
+        **contagem,
+        'tempo_s': round(time.perf_counter() - t0, 2),
+        'tempo_indices_s': round(time.perf_counter() - t_indices, 2),
+        'admin_id': admin_id,
+        'moderador_id': moderador_id,
+        'usuario_ids': usuario_ids,
+        'ocorrencia_ids': ocorrencia_ids,
+        'senha': SENHA_SINTETICA,
+    }
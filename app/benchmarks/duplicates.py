@@ -0,0 +1,100 @@
+# SVCA/app/benchmarks/duplicates.py
+# Latência da busca de duplicatas do registro (find_duplicate_candidates) sobre uma base
+# sintética grande: pontos em cima de ocorrências existentes e pontos soltos pela cidade.
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from .. import create_app, db
+from ..duplicates import find_duplicate_candidates, nearby_open_query
+from ..models.coordenada import Coordenada
+from ..models.ocorrencia import Ocorrencia
+from ..search import create_search_index
+from ..spatial import create_spatial_index, occurrence_index_available
+from .api import BENCHMARK_CONFIG, _percentis
+from .dataset import CENTRO, PROBLEMAS, RAIO_CIDADE_GRAUS, seed_dataset
+
+# Latência-alvo (p95) de uma busca de duplicatas
+META_MS = 10
+
+
+def _relatos(rng, pontos):
+    # O mesmo tipo de problema que a base usa nos títulos, com descrição curta
+    return [(lat, lon, f"{problema} na rua", f"{problema} perto da esquina") for (lat, lon), problema in
+            zip(pontos, (rng.choice(PROBLEMAS) for _ in pontos))]
+
+
+def _medir(relatos):
+    tempos = []
+    avaliadas = 0
+    com_candidatas = 0
+    for latitude, longitude, titulo, descricao in relatos:
+        t0 = time.perf_counter()
+        candidatas = find_duplicate_candidates(latitude, longitude, titulo, descricao)
+        tempos.append((time.perf_counter() - t0) * 1000)
+        com_candidatas += bool(candidatas)
+    # Fora do cronômetro: quantas ocorrências próximas cada busca leu do banco
+    for latitude, longitude, _, _ in relatos:
+        avaliadas += len(db.session.execute(nearby_open_query(latitude, longitude)).all())
+    return dict(
+        _percentis(tempos),
+        buscas=len(relatos),
+        com_candidatas=com_candidatas,
+        avaliadas_por_busca=round(avaliadas / len(relatos), 1),
+    )
+
+
+def run_duplicates_benchmark(occurrences=1_000_000, users=20000, lookups=500, seed=42):
+    """
+    Cria uma base sintética (seed_dataset, sem imagens) em um SQLite temporário e mede
+    'lookups' chamadas de find_duplicate_candidates em dois cenários: pontos de
+    ocorrências já registradas (onde há candidatas) e pontos aleatórios na cidade.
+    Retorna os percentis de latência (ms) por cenário e se o p95 ficou abaixo de META_MS.
+    """
+    rng = random.Random(seed)
+    pasta = tempfile.mkdtemp(prefix='svca-benchmark-')
+    app = create_app(dict(BENCHMARK_CONFIG, SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(pasta, 'benchmark.db')}"))
+    try:
+        with app.app_context():
+            db.create_all()
+            with db.engine.begin() as connection:
+                create_search_index(connection)
+                create_spatial_index(connection)
+            t0 = time.perf_counter()
+            dados = seed_dataset(users=users, occurrences=occurrences, orgaos=20, images_per_occurrence=0, seed=seed)
+            carga_s = time.perf_counter() - t0
+            db.session.remove()
+
+            ids = rng.sample(dados['ocorrencia_ids'], min(lookups, occurrences))
+            perto = db.session.query(Coordenada.latitude, Coordenada.longitude).join(
+                Ocorrencia, Ocorrencia.coordenada_id == Coordenada.id
+            ).filter(Ocorrencia.id.in_(ids)).all()
+            soltos = [(rng.uniform(CENTRO[0] - RAIO_CIDADE_GRAUS, CENTRO[0] + RAIO_CIDADE_GRAUS),
+                       rng.uniform(CENTRO[1] - RAIO_CIDADE_GRAUS, CENTRO[1] + RAIO_CIDADE_GRAUS))
+                      for _ in range(lookups)]
+
+            # Aquecimento: cache de páginas do SQLite e dos lookups de status
+            _medir(_relatos(rng, perto[:20]))
+            cenarios = {
+                'perto_de_ocorrencias': _medir(_relatos(rng, perto)),
+                'pontos_aleatorios': _medir(_relatos(rng, soltos)),
+            }
+            indice = occurrence_index_available()
+            db.session.remove()
+    finally:
+        with app.app_context():
+            app.extensions['password_hasher'].shutdown()
+            db.engine.dispose()
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return {
+        'ocorrencias': occurrences,
+        'usuarios': users,
+        'indice_espaco_temporal': indice,
+        'carga_s': round(carga_s, 1),
+        'meta_p95_ms': META_MS,
+        'dentro_da_meta': all(cenario['p95_ms'] < META_MS for cenario in cenarios.values()),
+        'cenarios': cenarios,
+    }
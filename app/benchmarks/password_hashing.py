@@ -0,0 +1,94 @@
+# SVCA/app/benchmarks/password_hashing.py
+# Mede a vazão de logins simultâneos com o hash calculado na requisição e no pool de processos.
+import statistics
+import threading
+import time
+
+from flask import current_app
+
+from ..passwords import get_password_hasher
+from .sqlite_concurrency import _percentil
+
+
+def _requisicao_leve():
+    # Trabalho em Python puro equivalente a uma requisição simples (ex.: /status-ocorrencias)
+    return sum(i * i for i in range(2000))
+
+
+def _executar(app, senha_hash, concurrency, duration):
+    parar = threading.Event()
+    lock = threading.Lock()
+    logins = []
+    leves = []
+
+    def login():
+        tempos = []
+        with app.app_context():
+            hasher = get_password_hasher()
+            while not parar.is_set():
+                t0 = time.perf_counter()
+                hasher.verify(senha_hash, 'senha-do-benchmark')
+                tempos.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            logins.extend(tempos)
+
+    def sonda():
+        # Requisições leves atendidas enquanto os logins estão em andamento
+        while not parar.is_set():
+            t0 = time.perf_counter()
+            _requisicao_leve()
+            leves.append((time.perf_counter() - t0) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login) for _ in range(concurrency)]
+    threads.append(threading.Thread(target=sonda))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'logins_por_s': round(len(logins) / duration, 1),
+        'login_p50_ms': round(statistics.median(logins), 1) if logins else None,
+        'login_p95_ms': _percentil(logins, 0.95),
+        'requisicao_leve_p50_ms': round(statistics.median(leves), 3) if leves else None,
+        'requisicao_leve_p95_ms': _percentil(leves, 0.95),
+    }
+
+
+def run_login_benchmark(concurrency=8, duration=5.0):
+    """
+    Simula 'concurrency' logins simultâneos por 'duration' segundos, verificando a
+    senha com a política atual: primeiro na própria thread (PASSWORD_HASH_ASYNC = False)
+    e depois no pool de processos. Mede também a latência de uma requisição leve
+    concorrente, que mostra se as threads do servidor ficam presas no hash.
+    """
+    app = current_app._get_current_object()
+    hasher = get_password_hasher()
+    async_original = app.config['PASSWORD_HASH_ASYNC']
+    resultados = {}
+    try:
+        app.config['PASSWORD_HASH_ASYNC'] = False
+        t0 = time.perf_counter()
+        senha_hash = hasher.hash('senha-do-benchmark')
+        custo_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        for modo, usar_pool in (('na_requisicao', False), ('pool_de_processos', True)):
+            app.config['PASSWORD_HASH_ASYNC'] = usar_pool
+            if usar_pool:
+                # Aquece o pool para não medir a criação dos processos
+                hasher.hash_many(['aquecimento'] * app.config['PASSWORD_HASH_WORKERS'] * 2)
+            resultados[modo] = _executar(app, senha_hash, concurrency, duration)
+    finally:
+        app.config['PASSWORD_HASH_ASYNC'] = async_original
+
+    return {
+        'politica': hasher.method,
+        'hash_unico_ms': custo_ms,
+        'logins_simultaneos': concurrency,
+        'workers_do_pool': app.config['PASSWORD_HASH_WORKERS'],
+        'duracao_s': duration,
+        'resultados': resultados,
+    }
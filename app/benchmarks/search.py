@@ -0,0 +1,145 @@
+# SVCA/app/benchmarks/search.py
+# Compara a busca por ILIKE '%termo%' com o índice FTS5 em uma base sintética.
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+
+from .. import db
+from ..models.ocorrencia import Ocorrencia
+from ..models.usuario import Usuario
+from ..search import build_match_query, create_search_index, ranked_occurrence_matches
+
+PALAVRAS = [
+    'buraco', 'rua', 'avenida', 'iluminação', 'poste', 'lixo', 'calçada', 'esgoto',
+    'árvore', 'semáforo', 'praça', 'vazamento', 'água', 'entulho', 'sinalização',
+    'alagamento', 'ônibus', 'ciclovia', 'pichação', 'bueiro', 'asfalto', 'queimado',
+]
+BAIRROS = [
+    'Centro', 'Boa Viagem', 'São José', 'Casa Amarela', 'Espinheiro', 'Graças',
+    'Madalena', 'Várzea', 'Ibura', 'Afogados', 'Encruzilhada', 'Torre',
+]
+COMPLEMENTOS = [
+    'próximo', 'ao', 'mercado', 'escola', 'esquina', 'há', 'semanas', 'moradores', 'reclamam',
+    'risco', 'de', 'acidente', 'durante', 'noite', 'trecho', 'perigoso', 'para', 'pedestres',
+    'em', 'frente', 'posto', 'saúde', 'igreja', 'muito', 'grande', 'desde', 'chuva', 'última',
+]
+NOMES = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Francisca', 'Luís', 'Márcia', 'Conceição', 'Sebastião']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Araújo', 'Gonçalves', 'Ribeiro']
+
+TERMOS = ['buraco', 'semaforo', 'sao jose', 'iluminacao centro', 'conceicao', 'ag']
+
+
+def _frase(rng, n, vocabulario=PALAVRAS):
+    return ' '.join(rng.choice(vocabulario) for _ in range(n))
+
+
+def _popular(connection, rows, rng, batch_size=10000):
+    connection.execute(db.text("INSERT INTO perfil (id, nome) VALUES (1, 'Usuario')"))
+    connection.execute(db.text("INSERT INTO status_ocorrencia (id, nome) VALUES (1, 'Registrada')"))
+
+    n_usuarios = max(1, rows // 10)
+    usuarios = [{
+        'id': i + 1,
+        'nome': f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}",
+        'email': f"usuario{i + 1}@example.com",
+        'telefone': f"(81)9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        'senha': 'x',
+        'perfil_id': 1,
+        'ocorrencias_recusadas_count': 0,
+        'is_blocked': False,
+        'pontos': 0,
+    } for i in range(n_usuarios)]
+    connection.execute(Usuario.__table__.insert(), usuarios)
+
+    inicio = date.today() - timedelta(days=365)
+    for start in range(0, rows, batch_size):
+        batch = [{
+            'titulo': _frase(rng, 2).capitalize(),
+            'descricao': f"{_frase(rng, 1)} {_frase(rng, 12, COMPLEMENTOS)}",
+            'endereco': f"Rua {rng.choice(SOBRENOMES)}, {rng.randint(1, 2000)} - {rng.choice(BAIRROS)}",
+            'data_registro': inicio + timedelta(days=rng.randint(0, 365)),
+            'status_id': 1,
+            'usuario_id': rng.randint(1, n_usuarios),
+        } for _ in range(start, min(rows, start + batch_size))]
+        connection.execute(Ocorrencia.__table__.insert(), batch)
+
+
+def _primeira_pagina(statement):
+    # Ordenação e tamanho de página de GET /occurrences sem busca no FTS5 (por data de registro)
+    return statement.order_by(Ocorrencia.data_registro.desc(), Ocorrencia.id.desc()).limit(50)
+
+
+def _consulta_ilike(termo):
+    return _primeira_pagina(db.select(Ocorrencia.id).join(Usuario, Usuario.id == Ocorrencia.usuario_id).where(db.or_(
+        Ocorrencia.titulo.ilike(f'%{termo}%'),
+        Ocorrencia.endereco.ilike(f'%{termo}%'),
+        Usuario.nome.ilike(f'%{termo}%')
+    )))
+
+
+def _consulta_fts(termo):
+    # Como GET /occurrences com busca: ordem de relevância (bm25) e, no empate, id decrescente
+    encontradas = ranked_occurrence_matches(build_match_query(termo))
+    return db.select(Ocorrencia.id).join(encontradas, Ocorrencia.id == encontradas.c.id).order_by(
+        encontradas.c.rank, Ocorrencia.id.desc()
+    ).limit(50)
+
+
+def _medir(connection, statement, repeat):
+    tempos = []
+    total = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        total = len(connection.execute(statement).all())
+        tempos.append((time.perf_counter() - t0) * 1000)
+    tempos.sort()
+    return {
+        'resultados': total,
+        'p50_ms': round(statistics.median(tempos), 3),
+        'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+    }
+
+
+def run_search_benchmark(rows=100000, repeat=20, seed=42):
+    """
+    Popula um banco SQLite temporário com 'rows' ocorrências e mede a latência
+    (p50/p95, em ms) da primeira página de GET /occurrences para cada termo,
+    com ILIKE e com o índice FTS5.
+    """
+    rng = random.Random(seed)
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            t0 = time.perf_counter()
+            _popular(connection, rows, rng)
+            carga_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            create_search_index(connection)
+            indexacao_s = time.perf_counter() - t0
+
+        resultados = []
+        with engine.connect() as connection:
+            for termo in TERMOS:
+                resultados.append({
+                    'termo': termo,
+                    'ilike': _medir(connection, _consulta_ilike(termo), repeat),
+                    'fts5': _medir(connection, _consulta_fts(termo), repeat),
+                })
+        return {
+            'linhas': rows,
+            'repeticoes': repeat,
+            'carga_s': round(carga_s, 2),
+            'indexacao_s': round(indexacao_s, 2),
+            'termos': resultados,
+        }
+    finally:
+        engine.dispose()
+        os.remove(path)
@@ -0,0 +1,131 @@
+# SVCA/app/benchmarks/sqlite_concurrency.py
+# Mede leituras e escritas simultâneas no SQLite com a configuração padrão e com o modo de desempenho.
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from .. import db
+from ..database import apply_sqlite_pragmas, sqlite_pragmas
+from ..models.ocorrencia import Ocorrencia
+from ..models.usuario import Usuario
+from .search import _popular
+
+
+def _consulta_listagem():
+    # Primeira página de GET /occurrences filtrada por status (leitura típica do moderador)
+    return db.select(Ocorrencia.id, Ocorrencia.titulo, Usuario.nome).join(
+        Usuario, Usuario.id == Ocorrencia.usuario_id
+    ).order_by(Ocorrencia.data_registro.desc(), Ocorrencia.id.desc()).limit(50)
+
+
+def _percentil(tempos, p):
+    if not tempos:
+        return None
+    tempos = sorted(tempos)
+    return round(tempos[min(len(tempos) - 1, int(len(tempos) * p))], 3)
+
+
+def _executar(engine, rows, readers, writers, duration, seed):
+    parar = threading.Event()
+    lock = threading.Lock()
+    leituras = []
+    escritas = []
+    erros = {'bloqueios': 0}
+
+    def leitor():
+        statement = _consulta_listagem()
+        tempos = []
+        with engine.connect() as connection:
+            while not parar.is_set():
+                t0 = time.perf_counter()
+                try:
+                    connection.execute(statement).all()
+                    connection.rollback()
+                    tempos.append((time.perf_counter() - t0) * 1000)
+                except OperationalError:
+                    connection.rollback()
+                    with lock:
+                        erros['bloqueios'] += 1
+        with lock:
+            leituras.extend(tempos)
+
+    def escritor(indice):
+        rng = random.Random(seed + indice)
+        tempos = []
+        while not parar.is_set():
+            t0 = time.perf_counter()
+            try:
+                # Mesma forma da atualização de status feita na moderação, um commit por alteração
+                with engine.begin() as connection:
+                    connection.execute(
+                        Ocorrencia.__table__.update()
+                        .where(Ocorrencia.id == rng.randint(1, rows))
+                        .values(status_id=rng.randint(1, 2))
+                    )
+                tempos.append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                with lock:
+                    erros['bloqueios'] += 1
+        with lock:
+            escritas.extend(tempos)
+
+    threads = [threading.Thread(target=leitor) for _ in range(readers)]
+    threads += [threading.Thread(target=escritor, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'leituras_por_s': round(len(leituras) / duration, 1),
+        'escritas_por_s': round(len(escritas) / duration, 1),
+        'leitura_p50_ms': round(statistics.median(leituras), 3) if leituras else None,
+        'leitura_p95_ms': _percentil(leituras, 0.95),
+        'escrita_p50_ms': round(statistics.median(escritas), 3) if escritas else None,
+        'escrita_p95_ms': _percentil(escritas, 0.95),
+        'erros_bloqueio': erros['bloqueios'],
+    }
+
+
+def run_sqlite_concurrency_benchmark(rows=20000, readers=4, writers=2, duration=5.0, seed=42, directory=None):
+    """
+    Popula um banco SQLite temporário (em 'directory', para usar o mesmo disco do banco
+    real) e mede, por 'duration' segundos, a vazão e a latência de leitores e escritores
+    simultâneos: primeiro com a configuração padrão e depois com os PRAGMAs de
+    SQLITE_PERFORMANCE_MODE.
+    """
+    resultados = {}
+    for modo, pragmas in (('padrao', None), ('desempenho', sqlite_pragmas())):
+        fd, path = tempfile.mkstemp(suffix='.db', dir=directory)
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{path}', pool_size=readers + writers, max_overflow=0)
+        if pragmas:
+            apply_sqlite_pragmas(engine, pragmas)
+        try:
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                _popular(connection, rows, random.Random(seed))
+                connection.execute(db.text("INSERT INTO status_ocorrencia (id, nome) VALUES (2, 'Em andamento')"))
+            resultados[modo] = _executar(engine, rows, readers, writers, duration, seed)
+        finally:
+            engine.dispose()
+            for sufixo in ('', '-wal', '-shm'):
+                if os.path.exists(path + sufixo):
+                    os.remove(path + sufixo)
+
+    return {
+        'linhas': rows,
+        'leitores': readers,
+        'escritores': writers,
+        'duracao_s': duration,
+        'pragmas': dict(sqlite_pragmas()),
+        'resultados': resultados,
+    }
@@ -1,8 +1,22 @@
 # SVCA/app/cli_commands.py
+import json
+import time
+
 import click
 from flask.cli import with_appcontext
+from flask_migrate import stamp, upgrade
 
 from . import db
+from .analytics import rebuild_summary
+from .database import run_sqlite_maintenance
+from .heatmap import get_heatmap_tiles
+from .images import migrate_to_content_addressed, process_pending_images
+from .monitoring import rebuild_monitoring_links
+from .passwords import get_password_hasher
+from .query_plans import check_query_plans
+from .scoring import rebuild_aggregates
+from .search import create_search_index
+from .spatial import create_spatial_index
 
 from .models.perfil import Perfil
 from .models.ocorrencia import StatusOcorrencia
@@ -14,6 +28,9 @@ from .models.notificacao import Notificacao
 from .models.coordenada import Coordenada
 from .models.tipo_pontuacao import TipoPontuacao
 
+# Revisão que corresponde ao esquema criado pelo antigo db.create_all()
+BASELINE_REVISION = '0001'
+
 
 @click.group()
 def cli():
@@ -23,9 +40,236 @@ def cli():
 @cli.command('create-db')
 @with_appcontext
 def create_db():
-    """Cria todas as tabelas do banco de dados."""
-    db.create_all()
-    click.echo('Tabelas do banco de dados criadas.')
+    """Cria ou atualiza o banco de dados aplicando as migrações pendentes (flask db upgrade)."""
+    tabelas = db.inspect(db.engine).get_table_names()
+    if 'usuario' in tabelas and 'alembic_version' not in tabelas:
+        # Banco criado pelo antigo create-db (db.create_all): o esquema inicial já existe
+        stamp(revision=BASELINE_REVISION)
+        click.echo(f'Banco existente marcado com a migração inicial ({BASELINE_REVISION}).')
+    upgrade()
+    click.echo('Banco de dados atualizado para a última migração.')
+
+@cli.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    """Cria ou reconstrói o índice de busca textual (FTS5) a partir dos dados existentes."""
+    with db.engine.begin() as connection:
+        if create_search_index(connection):
+            click.echo('Índice de busca textual reconstruído.')
+        else:
+            click.echo('O banco de dados atual não é SQLite; a busca continuará usando ILIKE.')
+
+@cli.command('rebuild-spatial-index')
+@with_appcontext
+def rebuild_spatial_index():
+    """Cria ou reconstrói os índices espaciais (R*Tree) a partir das coordenadas e ocorrências existentes."""
+    with db.engine.begin() as connection:
+        if create_spatial_index(connection):
+            click.echo('Índices espaciais reconstruídos.')
+        else:
+            click.echo('O banco de dados atual não é SQLite; o mapa continuará filtrando por latitude/longitude.')
+
+@cli.command('rebuild-point-aggregates')
+@with_appcontext
+def rebuild_point_aggregates():
+    """Recalcula as somas de pontos por semana/mês a partir do histórico de pontuação."""
+    linhas = rebuild_aggregates()
+    click.echo(f'{linhas} soma(s) de pontos por período recalculada(s).')
+
+@cli.command('rebuild-analytics')
+@with_appcontext
+def rebuild_analytics():
+    """Recalcula o resumo das ocorrências usado pelos painéis (/analytics)."""
+    linhas = rebuild_summary()
+    click.echo(f'{linhas} linha(s) do resumo de ocorrências recalculada(s).')
+
+@cli.command('backfill-monitoring-points')
+@click.option('--batch-size', default=50000, show_default=True, help='Ocorrências lidas e cruzadas com os pontos por lote.')
+@with_appcontext
+def backfill_monitoring_points(batch_size):
+    """Recalcula os vínculos entre ocorrências e pontos de monitoramento ativos próximos."""
+    inicio = time.perf_counter()
+    vinculos = rebuild_monitoring_links(batch_size=batch_size)
+    click.echo(f'{vinculos} vínculo(s) entre ocorrências e pontos de monitoramento em {time.perf_counter() - inicio:.1f}s.')
+
+@cli.command('clear-heatmap-cache')
+@with_appcontext
+def clear_heatmap_cache():
+    """Apaga os tiles do mapa de calor em cache (são gerados de novo sob demanda)."""
+    get_heatmap_tiles().clear()
+    click.echo('Cache de tiles do mapa de calor apagado.')
+
+@cli.command('process-mail-queue')
+@click.option('--watch', is_flag=True, help='Continua processando a fila indefinidamente (worker dedicado).')
+@with_appcontext
+def process_mail_queue_command(watch):
+    """Envia os e-mails pendentes da fila assíncrona."""
+    from flask import current_app
+    queue = current_app.extensions['mail_queue']
+    app = current_app._get_current_object()
+    if watch:
+        click.echo('Worker da fila de e-mails iniciado. Pressione Ctrl+C para encerrar.')
+        queue.run_forever(app)
+    else:
+        enviados, falhas = queue.process(app)
+        click.echo(f'{enviados} e-mail(s) enviado(s), {falhas} falha(s).')
+
+@cli.command('process-images')
+@click.option('--limit', default=None, type=int, help='Número máximo de imagens a processar.')
+@with_appcontext
+def process_images_command(limit):
+    """Processa as imagens pendentes (uploads não processados antes de o servidor parar)."""
+    processadas, falhas = process_pending_images(limit)
+    click.echo(f'{processadas} imagem(ns) processada(s), {falhas} falha(s).')
+
+@cli.command('migrate-images')
+@click.option('--dry-run', is_flag=True, help='Apenas mostra o que seria migrado, sem alterar arquivos nem o banco.')
+@with_appcontext
+def migrate_images_command(dry_run):
+    """Migra as imagens antigas para o armazenamento endereçado por conteúdo, unificando arquivos idênticos."""
+    resultado = migrate_to_content_addressed(dry_run=dry_run)
+    click.echo(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if dry_run:
+        click.echo('Simulação: nenhuma alteração foi gravada.')
+
+@cli.command('benchmark-search')
+@click.option('--rows', default=100000, show_default=True, help='Número de ocorrências sintéticas.')
+@click.option('--repeat', default=20, show_default=True, help='Repetições por termo.')
+@with_appcontext
+def benchmark_search(rows, repeat):
+    """Mede a latência da busca com ILIKE e com o índice FTS5 em uma base sintética."""
+    from .benchmarks.search import run_search_benchmark
+    click.echo(json.dumps(run_search_benchmark(rows=rows, repeat=repeat), indent=2, ensure_ascii=False))
+
+@cli.command('sqlite-maintenance')
+@click.option('--vacuum', is_flag=True, help='Executa também VACUUM (bloqueia o banco durante a execução).')
+@click.option('--interval', default=0, type=int, help='Repete a manutenção a cada N segundos (0 executa uma vez).')
+@with_appcontext
+def sqlite_maintenance_command(vacuum, interval):
+    """Checkpoint do WAL, ANALYZE e VACUUM opcional no banco SQLite."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo('O banco de dados atual não é SQLite; nada a fazer.')
+        return
+    while True:
+        click.echo(json.dumps(run_sqlite_maintenance(db.engine, vacuum=vacuum), indent=2, ensure_ascii=False))
+        if not interval:
+            break
+        time.sleep(interval)
+
+@cli.command('benchmark-sqlite')
+@click.option('--rows', default=20000, show_default=True, help='Número de ocorrências sintéticas.')
+@click.option('--readers', default=4, show_default=True, help='Threads de leitura simultâneas.')
+@click.option('--writers', default=2, show_default=True, help='Threads de escrita simultâneas.')
+@click.option('--duration', default=5.0, show_default=True, help='Segundos de medição por configuração.')
+@with_appcontext
+def benchmark_sqlite_command(rows, readers, writers, duration):
+    """Compara leituras/escritas simultâneas no SQLite com a configuração padrão e com o modo de desempenho."""
+    from flask import current_app
+    from .benchmarks.sqlite_concurrency import run_sqlite_concurrency_benchmark
+    resultado = run_sqlite_concurrency_benchmark(
+        rows=rows, readers=readers, writers=writers, duration=duration, directory=current_app.instance_path
+    )
+    click.echo(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+@cli.command('benchmark-login')
+@click.option('--concurrency', default=8, show_default=True, help='Logins simultâneos.')
+@click.option('--duration', default=5.0, show_default=True, help='Segundos de medição por modo.')
+@click.option('--algorithm', type=click.Choice(['scrypt', 'pbkdf2']), help='Algoritmo a medir (padrão: o configurado).')
+@click.option('--cost', type=int, help='Custo a medir (N do scrypt ou iterações do PBKDF2).')
+@with_appcontext
+def benchmark_login_command(concurrency, duration, algorithm, cost):
+    """Compara a vazão de logins simultâneos com o hash na requisição e no pool de processos."""
+    from flask import current_app
+    from .benchmarks.password_hashing import run_login_benchmark
+    if algorithm:
+        current_app.config['PASSWORD_HASH_ALGORITHM'] = algorithm
+        current_app.config['PASSWORD_HASH_COST'] = cost
+    elif cost:
+        current_app.config['PASSWORD_HASH_COST'] = cost
+    resultado = run_login_benchmark(concurrency=concurrency, duration=duration)
+    click.echo(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+@cli.command('benchmark-api')
+@click.option('--users', default=200, show_default=True, help='Usuários sintéticos.')
+@click.option('--occurrences', default=5000, show_default=True, help='Ocorrências sintéticas.')
+@click.option('--orgaos', default=20, show_default=True, help='Órgãos responsáveis sintéticos.')
+@click.option('--requests', 'requests_', default=200, show_default=True, help='Requisições medidas por endpoint.')
+@click.option('--workers', default=1, show_default=True, help='Threads fazendo requisições simultâneas.')
+@click.option('--seed', default=42, show_default=True, help='Semente da base sintética e das requisições.')
+@click.option('--endpoint', 'endpoints', multiple=True, help='Mede apenas este endpoint (pode repetir).')
+@click.option('--database-url', help='Banco VAZIO a usar no lugar do SQLite temporário (ex.: PostgreSQL).')
+@click.option('--output', type=click.Path(dir_okay=False), help='Grava o relatório JSON neste arquivo.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Relatório anterior para comparar.')
+@with_appcontext
+def benchmark_api_command(users, occurrences, orgaos, requests_, workers, seed, endpoints, database_url, output, baseline):
+    """Teste de carga dos principais endpoints da API sobre uma base sintética."""
+    from .benchmarks.api import ENDPOINTS, compare_reports, run_api_benchmark
+    try:
+        relatorio = run_api_benchmark(
+            users=users, occurrences=occurrences, orgaos=orgaos, requests=requests_, workers=workers,
+            seed=seed, endpoints=endpoints or ENDPOINTS, database_url=database_url,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+        click.echo(f'Relatório gravado em {output}.')
+    else:
+        click.echo(texto)
+
+    if baseline:
+        with open(baseline, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        click.echo(f"Comparação com {baseline} (commit {anterior.get('commit')}):")
+        for nome, metricas in compare_reports(anterior, relatorio).items():
+            partes = [
+                f"{metrica} {valores['antes']} -> {valores['depois']} ({valores['variacao_pct']:+}%)"
+                if valores['variacao_pct'] is not None else f"{metrica} {valores['antes']} -> {valores['depois']}"
+                for metrica, valores in metricas.items()
+            ]
+            click.echo(f"  {nome}: " + '; '.join(partes))
+
+@cli.command('benchmark-duplicates')
+@click.option('--occurrences', default=1000000, show_default=True, help='Ocorrências sintéticas.')
+@click.option('--users', default=20000, show_default=True, help='Usuários sintéticos.')
+@click.option('--lookups', default=500, show_default=True, help='Buscas medidas por cenário.')
+@click.option('--seed', default=42, show_default=True, help='Semente da base sintética e dos pontos buscados.')
+@with_appcontext
+def benchmark_duplicates_command(occurrences, users, lookups, seed):
+    """Mede a busca de ocorrências duplicadas do registro em uma base sintética grande."""
+    from .benchmarks.duplicates import run_duplicates_benchmark
+    resultado = run_duplicates_benchmark(occurrences=occurrences, users=users, lookups=lookups, seed=seed)
+    click.echo(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+@cli.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Mostra o plano completo das consultas com varredura.')
+@with_appcontext
+def check_query_plans_command(verbose):
+    """Roda EXPLAIN nas consultas dos endpoints e falha se alguma varrer uma tabela inteira."""
+    from flask import current_app
+    app = current_app._get_current_object()
+    app.config['MAIL_QUEUE_WORKER'] = False
+    try:
+        relatorio = check_query_plans(app)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    for erro in relatorio['erros_http']:
+        click.echo(f"AVISO: {erro['origem']} respondeu {erro['status']}; as consultas podem estar incompletas.")
+    for origem in relatorio['ignoradas']:
+        click.echo(f"IGNORADA: {origem} (busca textual sem índice FTS5 neste banco).")
+    for varredura in relatorio['varreduras']:
+        click.echo(f"VARREDURA COMPLETA em {', '.join(varredura['tabelas'])} -- {varredura['origem']}")
+        click.echo(f"  {varredura['sql']}")
+        if verbose:
+            for linha in varredura['plano']:
+                click.echo(f"    {linha}")
+    click.echo(f"{relatorio['consultas']} consulta(s) verificada(s), {len(relatorio['varreduras'])} com varredura completa.")
+    if relatorio['varreduras']:
+        raise SystemExit(1)
 
 @cli.command('seed-db')
 @with_appcontext
@@ -64,6 +308,11 @@ def seed_db():
         db.session.commit()
         click.echo('Tipos de Pontuação básicos adicionados.')
 
+    # Hashes das senhas iniciais calculados em paralelo no pool de processos
+    emails_iniciais = ['admin@example.com', 'moderador@example.com', 'usuario@example.com']
+    faltando = [email for email in emails_iniciais if not Usuario.query.filter_by(email=email).first()]
+    senhas_iniciais = dict(zip(faltando, get_password_hasher().hash_many(['123456'] * len(faltando))))
+
     if not Usuario.query.filter_by(email='admin@example.com').first():
         admin_perfil = Perfil.query.filter_by(nome='Administrador').first()
         if admin_perfil:
@@ -72,6 +321,7 @@ def seed_db():
                 email='admin@example.com',
                 telefone='(XX)YYYYY-YYYY',
                 senha_plana='123456',
+                senha_hash=senhas_iniciais.get('admin@example.com'),
                 perfil_id=admin_perfil.id
             )
             click.echo('Usuário administrador inicial adicionado.')
@@ -86,6 +336,7 @@ def seed_db():
                 email='moderador@example.com',
                 telefone='(XX)YYYYY-YYYY',
                 senha_plana='123456',
+                senha_hash=senhas_iniciais.get('moderador@example.com'),
                 perfil_id=moderador_perfil.id
             )
             click.echo('Usuário moderador inicial adicionado.')
@@ -100,6 +351,7 @@ def seed_db():
                 email='usuario@example.com',
                 telefone='(XX)YYYYY-YYYY',
                 senha_plana='123456',
+                senha_hash=senhas_iniciais.get('usuario@example.com'),
                 perfil_id=usuario_perfil.id
             )
             click.echo('Usuário padrão inicial adicionado.')
@@ -107,4 +359,41 @@ def seed_db():
             click.echo('Erro: Perfil Usuário não encontrado para criar usuário inicial.')
             
     db.session.commit()
-    click.echo('Dados iniciais inseridos com sucesso.')
\ No newline at end of file
+    click.echo('Dados iniciais inseridos com sucesso.')
+
+
+@cli.command('seed-synthetic')
+@click.option('--users', default=1000, show_default=True, help='Usuários sintéticos.')
+@click.option('--occurrences', default=10000, show_default=True, help='Ocorrências sintéticas.')
+@click.option('--orgaos', default=20, show_default=True, help='Órgãos responsáveis sintéticos.')
+@click.option('--images-per-occurrence', default=1, show_default=True, help='Média de imagens por ocorrência.')
+@click.option('--seed', default=42, show_default=True, help='Semente (a mesma semente gera os mesmos dados).')
+@click.option('--batch-size', default=20000, show_default=True, help='Ocorrências gravadas por transação.')
+@click.option('--rebuild-indexes/--no-rebuild-indexes', default=True, show_default=True,
+              help='Remove os índices FTS5/R*Tree durante a carga e os reconstrói no fim (SQLite).')
+@with_appcontext
+def seed_synthetic_command(users, occurrences, orgaos, images_per_occurrence, seed, batch_size, rebuild_indexes):
+    """Popula o banco atual com uma base sintética realista, em lotes (para testes de volume)."""
+    from .benchmarks.dataset import seed_dataset
+    inicio = time.perf_counter()
+
+    def progresso(feitas, total):
+        decorrido = time.perf_counter() - inicio
+        click.echo(f'{feitas}/{total} ocorrências ({feitas / decorrido:.0f}/s)')
+
+    try:
+        dados = seed_dataset(
+            users=users, occurrences=occurrences, orgaos=orgaos, images_per_occurrence=images_per_occurrence,
+            seed=seed, batch_size=batch_size, rebuild_indexes=rebuild_indexes, progress=progresso,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    # A carga não passa pelo ORM: os tiles em cache não sabem das novas ocorrências
+    get_heatmap_tiles().clear()
+
+    resumo = {chave: dados[chave] for chave in ('usuarios', 'orgaos', 'ocorrencias', 'imagens', 'notificacoes',
+                                                'historico_pontuacao', 'tempo_s', 'tempo_indices_s')}
+    resumo['admin'] = f'admin-sintetico-s{seed}@example.com'
+    resumo['moderador'] = f'moderador-sintetico-s{seed}@example.com'
+    resumo['senha'] = dados['senha']
+    click.echo(json.dumps(resumo, indent=2, ensure_ascii=False))
@@ -1,28 +1,43 @@
 # SVCA/app/controllers/main_controller.py
-import os
-import uuid
-from datetime import datetime
-from flask import Blueprint, current_app, request, jsonify, session, url_for
+from datetime import date, datetime
+from flask import Blueprint, current_app, request, jsonify, session
 
 from app.models.notificacao import Notificacao
 from ..models.usuario import Usuario
-from ..models.ocorrencia import Ocorrencia, StatusOcorrencia
+from ..models.ocorrencia import Ocorrencia, ocorrencia_ponto_monitoramento
 from ..models.coordenada import Coordenada
 from ..models.imagem import Imagem
-from ..models.perfil import Perfil
-from ..models.tipo_pontuacao import TipoPontuacao
 from ..models.orgao_responsavel import OrgaoResponsavel
+from ..models.ponto_monitoramento import PontoMonitoramento
 from .. import db
 from ..decorators import login_required, roles_required
-from flask_mail import Message 
-from .. import mail
+from ..duplicates import find_duplicate_candidates, open_status_ids
+from ..heatmap import get_heatmap_tiles, parse_heatmap_filters, validate_tile
+from ..images import UploadTooLarge, discard_staged, get_image_pipeline, new_image_for_upload, stage_upload
+from ..identity import current_identity, get_current_user, invalidate_identity
+from ..lookups import get_lookups
+from ..mail_queue import enqueue_email, wake_mail_worker
+from ..analytics import SEMANAS_PADRAO, build_dashboard
+from ..metrics import metrics_response
+from ..moderation import BulkModerationError, apply_bulk_moderation, invalidate_moderated_users
+from ..passwords import PasswordHashTimeout
+from ..rate_limit import get_rate_limiter, rate_limited
+from ..response_cache import cached_response
 from itsdangerous import BadTimeSignature, SignatureExpired, URLSafeTimedSerializer 
-from sqlalchemy.orm import joinedload # Esta importação está correta!
+from sqlalchemy.orm import contains_eager
+from ..pagination import keyset_page, parse_limit, ranked_page
+from ..search import build_match_query, ranked_occurrence_matches, ranked_search, search_index_available
+from ..spatial import occurrences_in_bbox, parse_bbox
+from ..scoring import add_points, set_points, status_transition_points, top_scores
+from ..serializers import occurrence_load_options, serialize_occurrence, serialize_occurrence_detail
 
 main_bp = Blueprint('main', __name__)
 
+RANKING_SIZE = 5
+
 @main_bp.route('/')
 @main_bp.route('/login', methods=['GET', 'POST'])
+@rate_limited('login')
 def login():
     if request.method == 'POST':
         data = request.get_json()
@@ -35,7 +50,13 @@ def login():
         if user and user.is_blocked:
             return jsonify({'error': 'Sua conta foi bloqueada devido a violação das políticas de uso. Por favor, entre em contato para mais informações.'}), 403
         
-        if user and user.autenticar(password):
+        try:
+            autenticado = user is not None and user.autenticar(password)
+        except PasswordHashTimeout as e:
+            print(f"Erro ao verificar a senha de {email}: {e}")
+            return jsonify({'error': 'O servidor está sobrecarregado. Tente novamente em instantes.'}), 503
+
+        if autenticado:
             session['user_id'] = user.id
             session['user_name'] = user.nome
             session['user_profile'] = user.perfil.nome
@@ -50,6 +71,7 @@ def login():
     return "Backend em funcionamento. Acesse o frontend React."
 
 @main_bp.route('/register', methods=['POST'])
+@rate_limited('register')
 def register():
     data = request.get_json()
     nome = data.get('nome')
@@ -73,8 +95,8 @@ def register():
         return jsonify({'error': 'Este e-mail já está cadastrado.'}), 409
 
     try:
-        perfil_usuario = Perfil.query.filter_by(nome='Usuario').first()
-        if not perfil_usuario:
+        perfil_usuario_id = get_lookups().id_for('perfil', 'Usuario')
+        if not perfil_usuario_id:
             return jsonify({'error': 'Perfil de usuário padrão não encontrado. Contate o administrador.'}), 500
         
         nome_completo = f"{nome} {sobrenome}".strip()
@@ -84,9 +106,13 @@ def register():
             email=email,
             telefone=telefone,
             senha_plana=senha,
-            perfil_id=perfil_usuario.id
+            perfil_id=perfil_usuario_id
         )
         return jsonify({'message': 'Usuário registrado com sucesso!'}), 201
+    except PasswordHashTimeout as e:
+        db.session.rollback()
+        print(f"Erro ao registrar usuário: {e}")
+        return jsonify({'error': 'O servidor está sobrecarregado. Tente novamente em instantes.'}), 503
     except Exception as e:
         db.session.rollback()
         print(f"Erro ao registrar usuário: {e}")
@@ -110,8 +136,7 @@ def logout():
 @main_bp.route('/register-occurrence', methods=['POST'])
 @login_required
 def register_occurrence():
-    user_id = session.get('user_id')
-    current_user = Usuario.query.get(user_id)
+    current_user = current_identity()
     if not current_user:
         return jsonify({'error': 'Usuário não encontrado.'}), 404
 
@@ -123,14 +148,38 @@ def register_occurrence():
     
     if not titulo or not endereco or not descricao or not latitude or not longitude:
         return jsonify({'error': 'Título, Endereço, Descrição, Latitude e Longitude são obrigatórios.'}), 400
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+        duplicata_de = int(request.form['duplicata_de']) if request.form.get('duplicata_de') else None
+    except ValueError:
+        return jsonify({'error': 'Latitude, Longitude e duplicata_de devem ser números.'}), 400
+
+    # Mesmo problema já registrado por perto: com duplicata_de o relato é ligado à ocorrência
+    # original; sem ele, as candidatas voltam para o usuário confirmar (ignorar_duplicatas=1
+    # registra assim mesmo). Verificado antes de gravar qualquer arquivo (ver app/duplicates.py)
+    original = None
+    if duplicata_de is not None:
+        original = db.session.get(Ocorrencia, duplicata_de)
+        if not original:
+            return jsonify({'error': 'Ocorrência original não encontrada.'}), 404
+        if original.status_id not in open_status_ids():
+            return jsonify({'error': 'A ocorrência original já foi encerrada; registre uma nova ocorrência.'}), 400
+    elif request.form.get('ignorar_duplicatas') not in ('1', 'true'):
+        candidatos = find_duplicate_candidates(latitude, longitude, titulo, descricao)
+        if candidatos:
+            return jsonify({
+                'error': 'Já existem ocorrências abertas parecidas perto deste local. Confirme se é o mesmo problema.',
+                'candidatos': candidatos
+            }), 409
 
+    staged_files = []
     try:
-        new_coordenada = Coordenada(latitude=float(latitude), longitude=float(longitude))
+        new_coordenada = Coordenada(latitude=latitude, longitude=longitude)
         db.session.add(new_coordenada)
         db.session.flush()
 
-        status_registrada = StatusOcorrencia.query.filter_by(nome='Registrada').first()
-        if not status_registrada:
+        status_registrada_id = get_lookups().id_for('status', 'Registrada')
+        if not status_registrada_id:
             return jsonify({'error': "Status 'Registrada' não encontrado. Contate o administrador."}), 500
 
         nova_ocorrencia = Ocorrencia(
@@ -138,79 +187,72 @@ def register_occurrence():
             descricao=descricao,
             data_registro=datetime.now().date(),
             endereco=endereco,
-            status_id=status_registrada.id,
-            usuario_id=current_user.id,
+            status_id=status_registrada_id,
+            usuario_id=current_user.user_id,
             coordenada_id=new_coordenada.id
         )
+        if original:
+            nova_ocorrencia.duplicata_de.append(original)
         db.session.add(nova_ocorrencia)
         db.session.flush()
 
-        uploaded_images = []
-        if 'imagens' in request.files:
-            files = request.files.getlist('imagens') 
-            UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'uploads', 'ocorrencias')
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-            for file in files:
-                if file and file.filename:
-                    filename_ext = os.path.splitext(file.filename)
-                    unique_filename = f"{uuid.uuid4().hex}{filename_ext[1]}"
-                    file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-                    file.save(file_path)
+        # Os arquivos são gravados em disco em blocos; validação, remoção de EXIF e
+        # geração das versões reduzidas ficam para o pipeline em segundo plano
+        files = [file for file in request.files.getlist('imagens') if file and file.filename]
+        if len(files) > current_app.config['IMAGE_MAX_FILES']:
+            db.session.rollback()
+            return jsonify({'error': f"Envie no máximo {current_app.config['IMAGE_MAX_FILES']} imagens."}), 400
 
-                    image_url = url_for('static', filename=f'uploads/ocorrencias/{unique_filename}', _external=True)
-                    new_image = Imagem(url=image_url, ocorrencia_id=nova_ocorrencia.id)
-                    db.session.add(new_image)
-                    uploaded_images.append(image_url)
+        new_images = []
+        for file in files:
+            nome_arquivo, caminho_pendente = stage_upload(file)
+            staged_files.append(caminho_pendente)
+            new_image = new_image_for_upload(nome_arquivo, caminho_pendente, nova_ocorrencia.id)
+            db.session.add(new_image)
+            new_images.append(new_image)
 
+        db.session.flush()
+        image_ids = [image.id for image in new_images if image.status == Imagem.STATUS_PENDENTE]
         db.session.commit()
-        return jsonify({'message': 'Ocorrência registrada com sucesso! Aguardando validação do moderador.'}), 201
+        get_image_pipeline().submit(image_ids)
+        return jsonify({
+            'message': 'Ocorrência registrada com sucesso! Aguardando validação do moderador.',
+            'imagens_em_processamento': len(image_ids),
+            'duplicata_de': original.id if original else None
+        }), 201
 
+    except UploadTooLarge as e:
+        db.session.rollback()
+        for caminho_pendente in staged_files:
+            discard_staged(caminho_pendente)
+        return jsonify({'error': str(e)}), 413
     except Exception as e:
         db.session.rollback()
+        for caminho_pendente in staged_files:
+            discard_staged(caminho_pendente)
         print(f"Erro ao registrar ocorrência: {e}")
         return jsonify({'error': f'Ocorreu um erro ao registrar a ocorrência: {str(e)}'}), 500
     
 @main_bp.route('/my-occurrences', methods=['GET'])
 @login_required
 def get_my_occurrences():
-    user_id = session.get('user_id')
-    current_user = Usuario.query.get(user_id)
+    current_user = current_identity()
     if not current_user:
         return jsonify({'error': 'Usuário não encontrado.'}), 404
 
-    occurrences = current_user.ocorrencias
+    occurrences = Ocorrencia.query \
+        .options(*occurrence_load_options()) \
+        .filter(Ocorrencia.usuario_id == current_user.user_id) \
+        .all()
 
-    occurrences_data = []
-    for occ in occurrences:
-        images_urls = [img.url for img in occ.imagens]
-        orgao_nome = occ.orgao_responsavel.nome if occ.orgao_responsavel else None
-        
-        latitude = None
-        longitude = None
-        if occ.coordenada:
-            latitude = occ.coordenada.latitude
-            longitude = occ.coordenada.longitude
-
-        occurrences_data.append({
-            'id': occ.id,
-            'titulo': occ.titulo,
-            'descricao': occ.descricao,
-            'endereco': occ.endereco,
-            'data_registro': occ.data_registro.strftime('%Y-%m-%d'),
-            'status': occ.status_ocorrencia.nome if occ.status_ocorrencia else 'N/A',
-            'imagens': images_urls,
-            'latitude': latitude,
-            'longitude': longitude,
-        })
+    occurrences_data = [serialize_occurrence(occ) for occ in occurrences]
 
     return jsonify(occurrences_data), 200
 
 @main_bp.route('/user-profile', methods=['GET', 'PUT'])
 @login_required
 def user_profile():
-    user_id = session.get('user_id')
-    user = Usuario.query.get(user_id)
+    user = get_current_user()
     if not user:
         return jsonify({'error': 'Usuário não encontrado.'}), 404
 
@@ -280,127 +322,90 @@ def user_profile():
 
 @main_bp.route('/view-occurrence/<int:occurrence_id>', methods=['GET'])
 @login_required
+@cached_response('ocorrencias')
 def view_occurrence_public(occurrence_id):
-    occurrence = Ocorrencia.query.options(joinedload(Ocorrencia.historico_notificacoes)).get(occurrence_id)
+    occurrence = db.session.get(Ocorrencia, occurrence_id, options=occurrence_load_options(with_history=True))
     if not occurrence:
         return jsonify({'error': 'Ocorrência não encontrada.'}), 404
 
-    images_urls = [img.url for img in occurrence.imagens]
-    orgao_nome = occurrence.orgao_responsavel.nome if occurrence.orgao_responsavel else None
-    
-    latitude = None
-    longitude = None
-    if occurrence.coordenada:
-        latitude = occurrence.coordenada.latitude
-        longitude = occurrence.coordenada.longitude
-
-    historico_notificacoes = []
-    for notificacao in occurrence.historico_notificacoes:
-        historico_notificacoes.append({
-            'mensagem': notificacao.mensagem,
-            'data_envio': notificacao.data_envio, # REMOVIDO .strftime()
-            'email_destino': notificacao.email_destino
-        })
-    historico_notificacoes.sort(key=lambda x: x['data_envio'], reverse=True)
-
-    return jsonify({
-        'id': occurrence.id,
-        'titulo': occurrence.titulo,
-        'descricao': occurrence.descricao,
-        'endereco': occurrence.endereco,
-        'data_registro': occurrence.data_registro.strftime('%Y-%m-%d'),
-        'data_finalizacao': occurrence.data_finalizacao.strftime('%Y-%m-%d') if occurrence.data_finalizacao else None,
-        'status_id': occurrence.status_id,
-        'status_nome': occurrence.status_ocorrencia.nome if occurrence.status_ocorrencia else 'N/A',
-        'usuario_id': occurrence.usuario_id,
-        'usuario_nome': occurrence.usuario.nome if occurrence.usuario else 'N/A',
-        'orgao_responsavel_id': occurrence.orgao_responsavel_id,
-        'orgao_responsavel_nome': orgao_nome,
-        'tipo_pontuacao_id': occurrence.tipo_pontuacao_id,
-        'imagens': images_urls,
-        'latitude': latitude,
-        'longitude': longitude,
-        'historico_notificacoes': historico_notificacoes,
-    }), 200
+    return jsonify(serialize_occurrence_detail(occurrence)), 200
 
 @main_bp.route('/occurrences', methods=['GET'])
 @roles_required(['Administrador', 'Moderador'])
 def get_all_occurrences():
     search_term = request.args.get('search', '').strip()
     occurrences_query = Ocorrencia.query
+    # Com busca no índice FTS5 a listagem vem por relevância (bm25); sem ela, por data de registro
+    relevancia = None
 
     if search_term:
-        occurrences_query = occurrences_query.join(Usuario).filter(db.or_(
-            Ocorrencia.titulo.ilike(f'%{search_term}%'),
-            Ocorrencia.endereco.ilike(f'%{search_term}%'),
-            Usuario.nome.ilike(f'%{search_term}%')
-        ))
-
-    occurrences = occurrences_query.all()
-    occurrences_data = []
-    for occ in occurrences:
-        images_urls = [img.url for img in occ.imagens]
-        occurrences_data.append({
-            'id': occ.id,
-            'titulo': occ.titulo,
-            'descricao': occ.descricao,
-            'endereco': occ.endereco,
-            'data_registro': occ.data_registro.strftime('%Y-%m-%d'),
-            'status': occ.status_ocorrencia.nome if occ.status_ocorrencia else 'N/A',
-            'usuario_nome': occ.usuario.nome if occ.usuario else 'N/A',
-            'imagens': images_urls,
-        })
-    return jsonify(occurrences_data), 200
+        if search_index_available():
+            match_query = build_match_query(search_term)
+            if match_query:
+                # Casa com o texto da ocorrência ou com o nome/e-mail de quem a registrou
+                encontradas = ranked_occurrence_matches(match_query)
+                occurrences_query = occurrences_query.join(encontradas, Ocorrencia.id == encontradas.c.id)
+                relevancia = encontradas.c.rank
+        else:
+            occurrences_query = occurrences_query.join(Usuario).filter(db.or_(
+                Ocorrencia.titulo.ilike(f'%{search_term}%'),
+                Ocorrencia.endereco.ilike(f'%{search_term}%'),
+                Usuario.nome.ilike(f'%{search_term}%')
+            ))
+
+    # Filtros server-side: status, órgão, usuário e intervalo de datas de registro
+    try:
+        status_id = request.args.get('status_id', type=int)
+        orgao_id = request.args.get('orgao_id', type=int)
+        usuario_id = request.args.get('usuario_id', type=int)
+        data_inicio = request.args.get('data_inicio')
+        data_fim = request.args.get('data_fim')
+        if status_id is not None:
+            occurrences_query = occurrences_query.filter(Ocorrencia.status_id == status_id)
+        if orgao_id is not None:
+            occurrences_query = occurrences_query.filter(Ocorrencia.orgao_responsavel_id == orgao_id)
+        if usuario_id is not None:
+            occurrences_query = occurrences_query.filter(Ocorrencia.usuario_id == usuario_id)
+        if data_inicio:
+            occurrences_query = occurrences_query.filter(Ocorrencia.data_registro >= date.fromisoformat(data_inicio))
+        if data_fim:
+            occurrences_query = occurrences_query.filter(Ocorrencia.data_registro <= date.fromisoformat(data_fim))
+
+        limit = parse_limit(request.args.get('limit'))
+        if relevancia is not None:
+            occurrences, next_cursor = ranked_page(
+                occurrences_query.options(*occurrence_load_options()),
+                relevancia,
+                Ocorrencia.id,
+                request.args.get('cursor'),
+                limit
+            )
+        else:
+            occurrences, next_cursor = keyset_page(
+                occurrences_query.options(*occurrence_load_options()),
+                Ocorrencia.data_registro,
+                Ocorrencia.id,
+                request.args.get('cursor'),
+                limit
+            )
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetros de consulta inválidos: {str(e)}'}), 400
+
+    return jsonify({
+        'items': [serialize_occurrence(occ) for occ in occurrences],
+        'next_cursor': next_cursor
+    }), 200
 
 @main_bp.route('/occurrence/<int:occurrence_id>', methods=['GET', 'PUT', 'DELETE'])
 @roles_required(['Administrador', 'Moderador'])
 def manage_occurrence(occurrence_id):
-    # APLICADO joinedload AQUI PARA GARANTIR O CARREGAMENTO DO HISTÓRICO EM TODAS AS OPERAÇÕES DESTA ROTA
-    occurrence = Ocorrencia.query.options(joinedload(Ocorrencia.historico_notificacoes)).get(occurrence_id)
+    # Carrega relacionamentos e histórico antecipadamente para todas as operações desta rota
+    occurrence = db.session.get(Ocorrencia, occurrence_id, options=occurrence_load_options(with_history=True))
     if not occurrence:
         return jsonify({'error': 'Ocorrência não encontrada.'}), 404
 
     if request.method == 'GET':
-        images_urls = [img.url for img in occurrence.imagens]
-        orgao_nome = occurrence.orgao_responsavel.nome if occurrence.orgao_responsavel else None
-        
-        latitude = None
-        longitude = None
-        if occurrence.coordenada:
-            latitude = occurrence.coordenada.latitude
-            longitude = occurrence.coordenada.longitude
-
-        # Constrói o histórico de notificações para a resposta JSON GET
-        historico_notificacoes = []
-        for notificacao in occurrence.historico_notificacoes:
-            historico_notificacoes.append({
-                'mensagem': notificacao.mensagem,
-                'data_envio': notificacao.data_envio, # REMOVIDO .strftime()
-                'email_destino': notificacao.email_destino
-            })
-        historico_notificacoes.sort(key=lambda x: x['data_envio'], reverse=True)
-
-
-        return jsonify({
-            'id': occurrence.id,
-            'titulo': occurrence.titulo,
-            'descricao': occurrence.descricao,
-            'endereco': occurrence.endereco,
-            'data_registro': occurrence.data_registro.strftime('%Y-%m-%d'),
-            'data_finalizacao': occurrence.data_finalizacao.strftime('%Y-%m-%d') if occurrence.data_finalizacao else None,
-            'status_id': occurrence.status_id,
-            'status_nome': occurrence.status_ocorrencia.nome if occurrence.status_ocorrencia else 'N/A',
-            'usuario_id': occurrence.usuario_id,
-            'usuario_nome': occurrence.usuario.nome if occurrence.usuario else 'N/A',
-            'orgao_responsavel_id': occurrence.orgao_responsavel_id,
-            'orgao_responsavel_nome': orgao_nome,
-            'tipo_pontuacao_id': occurrence.tipo_pontuacao_id,
-            'imagens': images_urls,
-            'latitude': latitude,
-            'longitude': longitude,
-            'justificativa_recusa': occurrence.justificativa_recusa,
-            'historico_notificacoes': historico_notificacoes, # ADICIONADO AO JSON DE RESPOSTA
-        }), 200
+        return jsonify(serialize_occurrence_detail(occurrence, include_justificativa=True)), 200
 
     elif request.method == 'PUT':
         data = request.get_json()
@@ -418,38 +423,24 @@ def manage_occurrence(occurrence_id):
             if 'status_id' in data:
                 new_status_id = int(data['status_id'])
                 if new_status_id != old_status_id:
+                    lookups = get_lookups()
+                    new_status_nome = lookups.name_for('status', new_status_id)
+                    if not new_status_nome:
+                        return jsonify({'error': 'Status de ocorrência inválido.'}), 400
                     occurrence.status_id = new_status_id
-                    new_status = StatusOcorrencia.query.get(new_status_id)
                     user_who_registered = Usuario.query.get(occurrence.usuario_id)
 
                     if user_who_registered:
-                        old_status = StatusOcorrencia.query.get(old_status_id)
-                        if old_status:
-                            if old_status.nome == 'Em andamento':
-                                user_who_registered.pontos -= 25
-                            elif old_status.nome == 'Fechada com solução':
-                                user_who_registered.pontos -= 50
-                            elif old_status.nome == 'Recusada':
-                                pass 
-                        
-                        if new_status.nome == 'Em andamento':
-                            user_who_registered.pontos += 25
-                        elif new_status.nome == 'Fechada com solução':
-                            user_who_registered.pontos += 50 
-                        elif new_status.nome == 'Recusada':
-                            user_who_registered.pontos -= 10
-                        
-                        if user_who_registered.pontos < 0:
-                            user_who_registered.pontos = 0
-                        db.session.add(user_who_registered)
+                        # Incremento atômico no banco; a variação efetiva vai para o histórico e as somas do período
+                        delta, tipo_nome = status_transition_points(lookups.name_for('status', old_status_id), new_status_nome)
+                        add_points(user_who_registered, delta, ocorrencia_id=occurrence.id, tipo_nome=tipo_nome)
 
-                    if new_status and new_status.nome == 'Fechada com solução':
+                    if new_status_nome == 'Fechada com solução':
                         occurrence.data_finalizacao = datetime.now().date()
-                        tipo_pontuacao_solucionada = TipoPontuacao.query.filter_by(nome='OcorrenciaSolucionada').first()
-                        if tipo_pontuacao_solucionada:
-                            occurrence.tipo_pontuacao_id = tipo_pontuacao_solucionada.id
-                        recusada_status_obj = StatusOcorrencia.query.filter_by(nome='Recusada').first()
-                        if old_status_id == recusada_status_obj.id and user_who_registered and user_who_registered.ocorrencias_recusadas_count > 0:
+                        tipo_pontuacao_solucionada_id = lookups.id_for('tipo_pontuacao', 'OcorrenciaSolucionada')
+                        if tipo_pontuacao_solucionada_id:
+                            occurrence.tipo_pontuacao_id = tipo_pontuacao_solucionada_id
+                        if old_status_id == lookups.id_for('status', 'Recusada') and user_who_registered and user_who_registered.ocorrencias_recusadas_count > 0:
                             user_who_registered.ocorrencias_recusadas_count -= 1
                             if user_who_registered.ocorrencias_recusadas_count < 3 and user_who_registered.is_blocked:
                                 user_who_registered.is_blocked = False
@@ -457,7 +448,7 @@ def manage_occurrence(occurrence_id):
 
                         occurrence.justificativa_recusa = None 
 
-                    elif new_status and new_status.nome == 'Recusada':
+                    elif new_status_nome == 'Recusada':
                         justificativa = data.get('justificativa_recusa')
                         if not justificativa:
                             return jsonify({'error': 'Justificativa é obrigatória para recusar a ocorrência.'}), 400
@@ -477,7 +468,7 @@ def manage_occurrence(occurrence_id):
                                 f"Prezado(a) {user_who_registered.nome},\n\n"
                                 f"Sua ocorrência '{occurrence.titulo}' foi recusada.\n\n"
                                 f"Justificativa: {justificativa}\n\n"
-                                f"Status atual: {new_status.nome}\n\n"
+                                f"Status atual: {new_status_nome}\n\n"
                             )
                             if user_who_registered.is_blocked:
                                 msg_body += (
@@ -487,18 +478,14 @@ def manage_occurrence(occurrence_id):
                                 )
                             msg_body += f"Atenciosamente,\nSua equipe SVCA"
 
-                            msg = Message(
+                            # Enfileirado na mesma transação; o worker envia após o commit
+                            enqueue_email(
                                 f"Sua Ocorrência '{occurrence.titulo}' Foi Recusada",
-                                recipients=[user_who_registered.email],
-                                body=msg_body
+                                user_who_registered.email,
+                                msg_body
                             )
-                            try:
-                                mail.send(msg)
-                                print(f"E-mail de recusa/bloqueio enviado para {user_who_registered.email}")
-                            except Exception as mail_e:
-                                print(f"ERRO ao enviar e-mail de recusa/bloqueio: {mail_e}")
 
-                    elif new_status and new_status.nome == 'Em andamento':
+                    elif new_status_nome == 'Em andamento':
                         occurrence.data_finalizacao = None
                         occurrence.justificativa_recusa = None
 
@@ -515,6 +502,9 @@ def manage_occurrence(occurrence_id):
                     occurrence.orgao_responsavel_id = None
             
             db.session.commit()
+            wake_mail_worker()
+            # O bloqueio automático pode ter mudado: descarta a identidade em cache
+            invalidate_identity(occurrence.usuario_id)
 
             return jsonify({'message': 'Ocorrência atualizada com sucesso!'}), 200
         except Exception as e:
@@ -533,6 +523,65 @@ def manage_occurrence(occurrence_id):
 
             return jsonify({'error': f'Erro ao deletar ocorrência: {str(e)}'}), 500
 
+@main_bp.route('/occurrences/bulk', methods=['PATCH'])
+@roles_required(['Administrador', 'Moderador'])
+def bulk_update_occurrences():
+    # Muda status/órgão de várias ocorrências em uma transação (ver app/moderation.py)
+    data = request.get_json(silent=True)
+    try:
+        resumo = apply_bulk_moderation(data)
+        db.session.commit()
+    except BulkModerationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erro na moderação em lote: {e}")
+        return jsonify({'error': f'Ocorreu um erro ao atualizar as ocorrências: {str(e)}'}), 500
+
+    # Os e-mails do lote saem juntos pelo worker, em uma única conexão SMTP
+    wake_mail_worker()
+    invalidate_moderated_users(resumo)
+    return jsonify(dict(resumo, message=f"{resumo['alteradas']} ocorrência(s) atualizada(s) com sucesso!")), 200
+
+@main_bp.route('/monitoring-points/<int:ponto_id>/occurrences', methods=['GET'])
+@roles_required(['Administrador', 'Moderador'])
+def get_monitoring_point_occurrences(ponto_id):
+    # Ocorrências ligadas ao ponto pelo motor de proximidade (ver app/monitoring.py), mais recentes primeiro
+    ponto = db.session.get(PontoMonitoramento, ponto_id)
+    if not ponto:
+        return jsonify({'error': 'Ponto de monitoramento não encontrado.'}), 404
+
+    occurrences_query = Ocorrencia.query.join(
+        ocorrencia_ponto_monitoramento, ocorrencia_ponto_monitoramento.c.ocorrencia_id == Ocorrencia.id
+    ).filter(ocorrencia_ponto_monitoramento.c.ponto_monitoramento_id == ponto_id)
+    try:
+        status_id = request.args.get('status_id', type=int)
+        if status_id is not None:
+            occurrences_query = occurrences_query.filter(Ocorrencia.status_id == status_id)
+        limit = parse_limit(request.args.get('limit'))
+        occurrences, next_cursor = keyset_page(
+            occurrences_query.options(*occurrence_load_options()),
+            Ocorrencia.data_registro,
+            Ocorrencia.id,
+            request.args.get('cursor'),
+            limit
+        )
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetros de consulta inválidos: {str(e)}'}), 400
+
+    return jsonify({
+        'ponto': {
+            'id': ponto.id,
+            'endereco': ponto.endereco,
+            'status': ponto.status,
+            'latitude': ponto.coordenada.latitude if ponto.coordenada else None,
+            'longitude': ponto.coordenada.longitude if ponto.coordenada else None,
+        },
+        'items': [serialize_occurrence(occ) for occ in occurrences],
+        'next_cursor': next_cursor
+    }), 200
+
 @main_bp.route('/users', methods=['GET'])
 @roles_required(['Administrador'])
 def get_all_users():
@@ -540,11 +589,16 @@ def get_all_users():
     users_query = Usuario.query
 
     if search_term:
-        users_query = users_query.filter(db.or_(
-            Usuario.nome.ilike(f'%{search_term}%'),
-            Usuario.email.ilike(f'%{search_term}%'),
-            Usuario.telefone.ilike(f'%{search_term}%')
-        ))
+        if search_index_available():
+            match_query = build_match_query(search_term)
+            if match_query:
+                users_query = ranked_search(users_query, Usuario, 'usuario_fts', match_query)
+        else:
+            users_query = users_query.filter(db.or_(
+                Usuario.nome.ilike(f'%{search_term}%'),
+                Usuario.email.ilike(f'%{search_term}%'),
+                Usuario.telefone.ilike(f'%{search_term}%')
+            ))
     
     users = users_query.all()
     users_data = []
@@ -613,9 +667,10 @@ def manage_user(user_id):
                 user.ocorrencias_recusadas_count = int(data['ocorrencias_recusadas_count'])
 
             if 'pontos' in data:
-                user.pontos = int(data['pontos'])
+                set_points(user, data['pontos'])
 
             db.session.commit()
+            invalidate_identity(user.id)
             return jsonify({'message': 'Usuário atualizado com sucesso!'}), 200
         except Exception as e:
             db.session.rollback()
@@ -625,6 +680,7 @@ def manage_user(user_id):
         try:
             db.session.delete(user)
             db.session.commit()
+            invalidate_identity(user_id)
             return jsonify({'message': 'Usuário deletado com sucesso!'}), 200
         except Exception as e:
             db.session.rollback()
@@ -632,15 +688,21 @@ def manage_user(user_id):
 
 @main_bp.route('/orgaos-responsaveis', methods=['GET'])
 @roles_required(['Administrador', 'Moderador'])
+@cached_response('orgaos')
 def get_all_orgaos():
     search_term = request.args.get('search', '').strip()
     orgaos_query = OrgaoResponsavel.query
 
     if search_term:
-        orgaos_query = orgaos_query.filter(db.or_(
-            OrgaoResponsavel.nome.ilike(f'%{search_term}%'),
-            OrgaoResponsavel.email.ilike(f'%{search_term}%')
-        ))
+        if search_index_available():
+            match_query = build_match_query(search_term)
+            if match_query:
+                orgaos_query = ranked_search(orgaos_query, OrgaoResponsavel, 'orgao_responsavel_fts', match_query)
+        else:
+            orgaos_query = orgaos_query.filter(db.or_(
+                OrgaoResponsavel.nome.ilike(f'%{search_term}%'),
+                OrgaoResponsavel.email.ilike(f'%{search_term}%')
+            ))
 
     orgaos = orgaos_query.all()
     orgaos_data = []
@@ -719,52 +781,142 @@ def manage_orgao(orgao_id):
             db.session.rollback()
             return jsonify({'error': f'Erro ao deletar órgão responsável: {str(e)}'}), 500
 
+def lookup_response(key):
+    """
+    Resposta de uma tabela de referência com ETag: clientes que enviam
+    If-None-Match com a versão atual recebem 304 sem corpo.
+    """
+    lookups = get_lookups()
+    response = jsonify(lookups.items(key))
+    response.set_etag(lookups.etag(key))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @main_bp.route('/status-ocorrencias', methods=['GET'])
 @login_required 
 def get_status_options():
-    status_list = StatusOcorrencia.query.all()
-    return jsonify([{'id': s.id, 'nome': s.nome} for s in status_list]), 200
+    return lookup_response('status')
 
 @main_bp.route('/perfis', methods=['GET'])
 @roles_required(['Administrador'])
 def get_profile_options():
-    profiles = Perfil.query.all()
-    return jsonify([{'id': p.id, 'nome': p.nome} for p in profiles]), 200
+    return lookup_response('perfil')
+
+@main_bp.route('/rate-limit-stats', methods=['GET'])
+@roles_required(['Administrador'])
+def get_rate_limit_stats():
+    # Requisições de login/cadastro/recuperação de senha aceitas e rejeitadas neste processo
+    limiter = get_rate_limiter()
+    return jsonify({
+        'armazenamento': current_app.config['RATE_LIMIT_STORAGE'],
+        'limites': current_app.config['RATE_LIMITS'],
+        'regras': limiter.stats(),
+    }), 200
+
+@main_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Formato texto do Prometheus; protegido por METRICS_TOKEN quando configurado
+    return metrics_response()
+
+def _analytics_response(incluir_orgaos):
+    try:
+        semanas = int(request.args.get('semanas', SEMANAS_PADRAO))
+        if not 1 <= semanas <= 520:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'Parâmetro semanas inválido (1 a 520).'}), 400
+    try:
+        return jsonify(build_dashboard(incluir_orgaos=incluir_orgaos, semanas=semanas)), 200
+    except Exception as e:
+        print(f"Erro ao calcular os indicadores: {e}")
+        return jsonify({'error': f'Ocorreu um erro ao calcular os indicadores: {str(e)}'}), 500
+
+@main_bp.route('/analytics', methods=['GET'])
+@roles_required(['Administrador', 'Moderador'])
+def get_analytics():
+    # Painel da moderação: agregados lidos do resumo materializado (ver app/analytics.py)
+    return _analytics_response(incluir_orgaos=True)
+
+@main_bp.route('/analytics/public', methods=['GET', 'OPTIONS'])
+def get_public_analytics():
+    if request.method == 'OPTIONS':
+        return '', 200
+    # Painel público: os mesmos agregados, sem a divisão por órgão responsável
+    return _analytics_response(incluir_orgaos=False)
 
 @main_bp.route('/ranking-semanal', methods=['GET', 'OPTIONS'])
+@cached_response('ranking')
 def get_ranking_semanal():
     if request.method == 'OPTIONS':
         return '', 200
 
-    users = Usuario.query.all()
+    # ?periodo=semana (padrão) ou mes lê as somas do período; total usa a pontuação acumulada
+    periodo = request.args.get('periodo', 'semana')
+    if periodo not in ('semana', 'mes', 'total'):
+        return jsonify({'error': "Período inválido. Use 'semana', 'mes' ou 'total'."}), 400
 
-    users_with_scores = []
-    for user in users:
-        users_with_scores.append({
-            'id': user.id,
-            'nome': user.nome,
-            'pontos': user.pontos,
-            'avatar_url': user.avatar_url if hasattr(user, 'avatar_url') else '/avatar.svg',
-        })
-    
-    sorted_ranking = sorted(users_with_scores, key=lambda x: x['pontos'], reverse=True)[:5]
+    return jsonify([{
+        'id': user.id,
+        'nome': user.nome,
+        'pontos': pontos,
+        'avatar_url': user.avatar_url or '/avatar.svg',
+    } for user, pontos in top_scores(periodo, RANKING_SIZE)]), 200
+
+@main_bp.route('/tiles/heatmap/<int:z>/<int:x>/<int:y>.<formato>', methods=['GET', 'OPTIONS'])
+def get_heatmap_tile(z, x, y, formato):
+    if request.method == 'OPTIONS':
+        return '', 200
 
-    return jsonify(sorted_ranking), 200
+    # Densidade das ocorrências no tile: PNG colorido ou JSON com as contagens por célula (ver app/heatmap.py)
+    if formato not in ('png', 'json'):
+        return jsonify({'error': "Formato inválido. Use 'png' ou 'json'."}), 404
+    try:
+        validate_tile(z, x, y, current_app.config['HEATMAP_MAX_ZOOM'])
+        filtros = parse_heatmap_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Parâmetros de consulta inválidos: {str(e)}'}), 400
+
+    try:
+        conteudo = get_heatmap_tiles().tile(z, x, y, formato, filtros)
+    except Exception as e:
+        print(f"Erro ao gerar o tile {z}/{x}/{y} do mapa de calor: {e}")
+        return jsonify({'error': f'Ocorreu um erro ao gerar o tile: {str(e)}'}), 500
+
+    response = current_app.response_class(conteudo, mimetype='image/png' if formato == 'png' else 'application/json')
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config['HEATMAP_CACHE_MAX_AGE']}"
+    return response
 
 @main_bp.route('/active-occurrences', methods=['GET', 'OPTIONS'])
+@cached_response('ocorrencias')
 def get_active_occurrences():
     if request.method == 'OPTIONS':
         return '', 200
 
     try:
-        status_em_andamento = StatusOcorrencia.query.filter_by(nome='Em andamento').first()
+        status_em_andamento_id = get_lookups().id_for('status', 'Em andamento')
         
-        if not status_em_andamento:
+        if not status_em_andamento_id:
             return jsonify({'error': "Status 'Em andamento' não encontrado. Contate o administrador."}), 500
 
-        active_occurrences = Ocorrencia.query \
-            .filter_by(status_id=status_em_andamento.id) \
+        active_query = Ocorrencia.query.filter_by(status_id=status_em_andamento_id)
+
+        # Modo viewport: ?bbox=minLon,minLat,maxLon,maxLat&zoom=z (clusters em zoom baixo)
+        bbox_param = request.args.get('bbox')
+        if bbox_param:
+            try:
+                bbox = parse_bbox(bbox_param)
+                zoom = request.args.get('zoom')
+                zoom = int(zoom) if zoom not in (None, '') else None
+            except ValueError as e:
+                return jsonify({'error': f'Parâmetros de consulta inválidos: {str(e)}'}), 400
+
+            clustered, items, truncated = occurrences_in_bbox(active_query, bbox, zoom)
+            return jsonify({'zoom': zoom, 'clustered': clustered, 'items': items, 'truncated': truncated}), 200
+
+        active_occurrences = active_query \
             .join(Coordenada) \
+            .options(contains_eager(Ocorrencia.coordenada)) \
             .all()
 
         occurrences_data = []
@@ -776,7 +928,7 @@ def get_active_occurrences():
                     'endereco': occ.endereco,
                     'latitude': occ.coordenada.latitude,
                     'longitude': occ.coordenada.longitude,
-                    'status': occ.status_ocorrencia.nome
+                    'status': 'Em andamento'
                 })
         
         return jsonify(occurrences_data), 200
@@ -813,23 +965,24 @@ def send_notification_to_orgao(occurrence_id):
             f"Para mais detalhes, acesse o sistema.\n\n"
             f"Atenciosamente,\nSua equipe SVCA"
         )
-        msg = Message(
-            f"Notificação de Ocorrência: {occurrence.titulo}",
-            recipients=[orgao.email],
-            body=msg_body
-        )
-        mail.send(msg)
-
+        # O histórico é atualizado pelo worker da fila quando o envio for confirmado
         new_notification = Notificacao(
-            mensagem="Notificação enviada ao Órgão Responsável.",
+            mensagem="Notificação enfileirada para envio ao Órgão Responsável.",
             data_envio=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             email_destino=orgao.email,
             ocorrencia_id=occurrence.id
         )
         db.session.add(new_notification)
+        enqueue_email(
+            f"Notificação de Ocorrência: {occurrence.titulo}",
+            orgao.email,
+            msg_body,
+            notificacao=new_notification
+        )
         db.session.commit()
+        wake_mail_worker()
 
-        return jsonify({'message': 'Notificação enviada com sucesso e registrada no histórico!'}), 200
+        return jsonify({'message': 'Notificação enfileirada para envio e registrada no histórico!'}), 200
 
     except Exception as e:
         db.session.rollback()
@@ -837,6 +990,7 @@ def send_notification_to_orgao(occurrence_id):
         return jsonify({'error': f'Erro ao enviar notificação ou registrar histórico: {str(e)}'}), 500
 
 @main_bp.route('/forgot-password', methods=['POST'])
+@rate_limited('forgot-password')
 def forgot_password_request():
     email = request.json.get('email')
     if not email:
@@ -853,20 +1007,24 @@ def forgot_password_request():
 
         reset_url = f"http://localhost:5173/reset-password/{token}"
 
-        msg = Message(
+        # Pedidos repetidos antes do envio substituem o e-mail pendente pelo link mais recente
+        enqueue_email(
             "Redefinição de Senha para SVCA",
-            recipients=[user.email],
-            body=f"Olá {user.nome},\n\n"
-                 f"Você solicitou uma redefinição de senha para sua conta SVCA.\n"
-                 f"Clique no link a seguir para redefinir sua senha: {reset_url}\n\n"
-                 f"Este link é válido por 1 hora. Se você não solicitou isso, por favor, ignore este e-mail.\n\n"
-                 f"Atenciosamente,\nSua equipe SVCA"
+            user.email,
+            f"Olá {user.nome},\n\n"
+            f"Você solicitou uma redefinição de senha para sua conta SVCA.\n"
+            f"Clique no link a seguir para redefinir sua senha: {reset_url}\n\n"
+            f"Este link é válido por 1 hora. Se você não solicitou isso, por favor, ignore este e-mail.\n\n"
+            f"Atenciosamente,\nSua equipe SVCA",
+            chave_dedup=f"redefinir-senha:{user.id}"
         )
-        mail.send(msg)
+        db.session.commit()
+        wake_mail_worker()
 
         return jsonify({'message': 'Um link para redefinir sua senha foi enviado para seu e-mail.'}), 200
 
     except Exception as e:
+        db.session.rollback()
         print(f"ERRO ao enviar e-mail de redefinição de senha para {email}: {e}")
         return jsonify({'error': 'Ocorreu um erro ao enviar o e-mail de redefinição de senha.'}), 500
     
@@ -906,6 +1064,10 @@ def reset_password(token):
         user.redefinir_senha(new_password)
         db.session.commit()
         return jsonify({'message': 'Sua senha foi redefinida com sucesso!'}), 200
+    except PasswordHashTimeout as e:
+        db.session.rollback()
+        print(f"Erro ao redefinir senha do usuário {user_id}: {e}")
+        return jsonify({'error': 'O servidor está sobrecarregado. Tente novamente em instantes.'}), 503
     except Exception as e:
         db.session.rollback()
         print(f"Erro ao redefinir senha do usuário {user_id}: {e}")
@@ -0,0 +1,148 @@
+# SVCA/app/database.py
+# Configuração do banco de dados a partir de variáveis de ambiente (SQLite local ou PostgreSQL).
+import os
+import time
+
+from sqlalchemy import event, text
+
+DEFAULT_DATABASE_URL = 'sqlite:///../instance/site.db'
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'sim', 'on')
+
+
+def database_url():
+    """
+    URL do banco em DATABASE_URL (padrão: SQLite em instance/site.db).
+    O prefixo antigo postgres:// é aceito e convertido para postgresql://.
+    """
+    url = os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """
+    Opções do engine do SQLAlchemy para a URL informada.
+
+    Variáveis de ambiente:
+      DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT  tamanho e espera do pool (exceto SQLite)
+      DB_POOL_RECYCLE                                  segundos até reabrir uma conexão
+      DB_POOL_PRE_PING                                 testa a conexão antes de usá-la
+      DB_STATEMENT_TIMEOUT_MS                          tempo máximo por comando (PostgreSQL; 0 desativa)
+    """
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    }
+    if url.startswith('sqlite'):
+        # SQLite não usa pool de tamanho fixo nem statement_timeout
+        return options
+
+    options['pool_size'] = _env_int('DB_POOL_SIZE', 5)
+    options['max_overflow'] = _env_int('DB_MAX_OVERFLOW', 10)
+    options['pool_timeout'] = _env_int('DB_POOL_TIMEOUT', 30)
+
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+    if url.startswith('postgresql') and statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def sqlite_pragmas():
+    """
+    PRAGMAs do modo de desempenho do SQLite, na ordem em que são aplicados.
+
+    WAL permite leituras simultâneas a uma escrita (os leitores não bloqueiam durante
+    o commit da moderação); com WAL, synchronous=NORMAL só perde as últimas transações
+    em queda de energia, sem corromper o banco. Tamanhos ajustáveis por:
+      SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE_MB
+    """
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('busy_timeout', _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Valor negativo: tamanho do cache em KiB (por conexão)
+        ('cache_size', -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+        ('mmap_size', _env_int('SQLITE_MMAP_SIZE_MB', 256) * 1024 * 1024),
+        ('temp_store', 'MEMORY'),
+        ('foreign_keys', 'ON'),
+    ]
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """
+    Registra no engine um listener que aplica os PRAGMAs em cada conexão nova do pool.
+    """
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def configure_database(app, url=None):
+    """
+    Preenche SQLALCHEMY_DATABASE_URI e SQLALCHEMY_ENGINE_OPTIONS no app
+    (com a URL informada ou, sem ela, a de DATABASE_URL).
+    """
+    url = url or database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    # Modo de desempenho do SQLite (opcional): SQLITE_PERFORMANCE_MODE=1
+    app.config['SQLITE_PERFORMANCE_MODE'] = _env_bool('SQLITE_PERFORMANCE_MODE', False)
+
+
+def init_engine(app, db):
+    """
+    Ajustes no engine já criado pelo Flask-SQLAlchemy (chamar após db.init_app).
+    """
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite' and app.config.get('SQLITE_PERFORMANCE_MODE'):
+        apply_sqlite_pragmas(engine, sqlite_pragmas())
+
+
+def run_sqlite_maintenance(engine, vacuum=False, checkpoint_mode='TRUNCATE'):
+    """
+    Manutenção periódica do SQLite: checkpoint do WAL, ANALYZE (estatísticas do
+    planejador) e, opcionalmente, VACUUM. Retorna os tempos de cada etapa.
+    """
+    resultado = {}
+    # VACUUM e wal_checkpoint não podem rodar dentro de uma transação
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+        resultado['journal_mode'] = journal_mode
+        if journal_mode == 'wal':
+            t0 = time.perf_counter()
+            busy, wal_pages, checkpointed = connection.execute(
+                text(f"PRAGMA wal_checkpoint({checkpoint_mode})")
+            ).one()
+            resultado['checkpoint'] = {
+                'modo': checkpoint_mode,
+                'bloqueado': bool(busy),
+                'paginas_wal': wal_pages,
+                'paginas_copiadas': checkpointed,
+                'tempo_s': round(time.perf_counter() - t0, 3),
+            }
+        t0 = time.perf_counter()
+        connection.execute(text("ANALYZE"))
+        resultado['analyze_s'] = round(time.perf_counter() - t0, 3)
+        if vacuum:
+            t0 = time.perf_counter()
+            connection.execute(text("VACUUM"))
+            resultado['vacuum_s'] = round(time.perf_counter() - t0, 3)
+    return resultado
@@ -1,9 +1,8 @@
 # app/decorators.py
-from flask import session, jsonify, redirect, url_for, request
+from flask import session, jsonify, redirect, url_for, request, g
 from functools import wraps
 
-from app.models.usuario import Usuario
-from .models.perfil import Perfil
+from .identity import load_identity
 
 def login_required(f):
     """
@@ -15,10 +14,12 @@ def login_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Não autorizado. Faça login para acessar esta funcionalidade.'}), 401
         
-        # *** MUDANÇA AQUI: Verificação de bloqueio em todas as rotas protegidas ***
+        # Verificação de bloqueio em todas as rotas protegidas. A identidade vem de um
+        # cache curto por processo e fica em g para a view (ver app/identity.py).
         user_id = session.get('user_id')
-        user = Usuario.query.get(user_id)
-        if user and user.is_blocked:
+        identity = load_identity(user_id)
+        g.identity = identity
+        if identity and identity.is_blocked:
             session.pop('user_id', None) # Limpa a sessão para forçar novo login/reautenticação
             session.pop('user_name', None)
             session.pop('user_profile', None)
@@ -35,7 +36,9 @@ def roles_required(roles):
         @wraps(f)
         @login_required # Garante que o usuário esteja logado antes de verificar o perfil
         def decorated_function(*args, **kwargs):
-            user_profile_name = session.get('user_profile')
+            # Usa o perfil atual do usuário (e não o gravado na sessão no momento do login)
+            identity = g.get('identity')
+            user_profile_name = identity.perfil if identity else session.get('user_profile')
             if not user_profile_name or user_profile_name not in roles:
                 return jsonify({'error': 'Acesso negado. Você não tem permissão para acessar esta funcionalidade.'}), 403
             return f(*args, **kwargs)
@@ -0,0 +1,136 @@
+# SVCA/app/duplicates.py
+# Detecção de ocorrências duplicadas no registro: ocorrências abertas e recentes a poucos
+# metros (R*Tree espaço-temporal) comparadas ao novo relato por semelhança de texto.
+import math
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime, timedelta
+
+from . import db
+from .lookups import get_lookups
+from .models.coordenada import Coordenada
+from .models.ocorrencia import Ocorrencia
+from .spatial import occurrence_index_available, recent_in_bbox_filter
+
+# Raio da busca, em metros, e janela de dias de data_registro
+RAIO_DUPLICATA_M = 75
+JANELA_DUPLICATA_DIAS = 30
+
+# Status em que a ocorrência ainda pode receber relatos duplicados
+STATUS_ABERTOS = ('Registrada', 'Em andamento')
+
+# Semelhança mínima de texto (0 a 1) para sugerir a ocorrência; abaixo de
+# DISTANCIA_MESMO_LOCAL_M ela é sugerida mesmo com textos diferentes
+SIMILARIDADE_MINIMA = 0.2
+DISTANCIA_MESMO_LOCAL_M = 10
+
+# Ocorrências próximas avaliadas (as mais recentes) e candidatas devolvidas
+MAX_AVALIADAS = 200
+MAX_CANDIDATAS = 5
+
+METROS_POR_GRAU = 111_320
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Palavras sem conteúdo (já sem acentos) ignoradas na comparação
+STOPWORDS = frozenset(
+    'para com sem por pela pelo pelas pelos uma umas uns que nao mais muito esta este essa esse '
+    'isso isto ali aqui ate desde entre sobre sob como quando onde tem ter foi sao estao '
+    'das dos nas nos ela ele elas eles seu sua seus suas meu minha rua avenida'.split()
+)
+
+
+def text_tokens(titulo, descricao):
+    """
+    Termos normalizados do relato (minúsculos, sem acentos, sem plural simples) com peso:
+    os do título contam em dobro.
+    """
+    termos = Counter()
+    for texto, peso in ((titulo or '', 2), (descricao or '', 1)):
+        normalizado = unicodedata.normalize('NFKD', texto.lower()).encode('ascii', 'ignore').decode()
+        for token in _TOKEN_RE.findall(normalizado):
+            if len(token) < 3 or token in STOPWORDS or token.isdigit():
+                continue
+            if len(token) > 4 and token.endswith('s'):
+                token = token[:-1]
+            termos[token] += peso
+    return termos
+
+
+def text_similarity(termos_a, termos_b):
+    """
+    Jaccard ponderado entre dois conjuntos de termos: 0 (nada em comum) a 1 (iguais).
+    """
+    if not termos_a or not termos_b:
+        return 0.0
+    comum = sum((termos_a & termos_b).values())
+    return comum / sum((termos_a | termos_b).values())
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    # Aproximação equirretangular: exata o bastante para algumas centenas de metros
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return math.hypot(x, y) * 6_371_000
+
+
+def open_status_ids():
+    lookups = get_lookups()
+    return [status_id for status_id in (lookups.id_for('status', nome) for nome in STATUS_ABERTOS) if status_id]
+
+
+def nearby_open_query(latitude, longitude, hoje=None):
+    """
+    Consulta das ocorrências abertas mais recentes (até MAX_AVALIADAS) registradas nos
+    últimos JANELA_DUPLICATA_DIAS dias no retângulo de RAIO_DUPLICATA_M metros em volta
+    do ponto: posição e data saem juntas do R*Tree de ocorrências.
+    """
+    hoje = hoje or datetime.now().date()
+    delta_lat = RAIO_DUPLICATA_M / METROS_POR_GRAU
+    delta_lon = RAIO_DUPLICATA_M / (METROS_POR_GRAU * max(0.01, math.cos(math.radians(latitude))))
+    bbox = (max(-180.0, longitude - delta_lon), max(-90.0, latitude - delta_lat),
+            min(180.0, longitude + delta_lon), min(90.0, latitude + delta_lat))
+
+    # "+ 0": a consulta parte do R*Tree, não do índice de status (ver density_grid em app/heatmap.py)
+    status_id = Ocorrencia.status_id + 0 if occurrence_index_available() else Ocorrencia.status_id
+    return db.select(
+        Ocorrencia.id, Ocorrencia.titulo, Ocorrencia.descricao, Ocorrencia.data_registro,
+        Ocorrencia.status_id, Coordenada.latitude, Coordenada.longitude,
+    ).join(Coordenada, Ocorrencia.coordenada_id == Coordenada.id).where(
+        recent_in_bbox_filter(bbox, hoje - timedelta(days=JANELA_DUPLICATA_DIAS)),
+        status_id.in_(open_status_ids()),
+    ).order_by(Ocorrencia.data_registro.desc(), Ocorrencia.id.desc()).limit(MAX_AVALIADAS)
+
+
+def find_duplicate_candidates(latitude, longitude, titulo, descricao, hoje=None):
+    """
+    Ocorrências abertas e recentes a até RAIO_DUPLICATA_M metros que parecem descrever
+    o mesmo problema, da mais provável para a menos provável. Uma consulta (ver
+    nearby_open_query); a semelhança de texto é calculada em memória sobre as poucas
+    ocorrências próximas.
+    """
+    proximas = db.session.execute(nearby_open_query(latitude, longitude, hoje)).all()
+
+    termos = text_tokens(titulo, descricao)
+    lookups = get_lookups()
+    candidatas = []
+    for occ in proximas:
+        distancia = distance_m(latitude, longitude, occ.latitude, occ.longitude)
+        if distancia > RAIO_DUPLICATA_M:
+            continue
+        similaridade = text_similarity(termos, text_tokens(occ.titulo, occ.descricao))
+        if similaridade < SIMILARIDADE_MINIMA and distancia > DISTANCIA_MESMO_LOCAL_M:
+            continue
+        candidatas.append({
+            'id': occ.id,
+            'titulo': occ.titulo,
+            'status': lookups.name_for('status', occ.status_id),
+            'data_registro': occ.data_registro.strftime('%Y-%m-%d'),
+            'distancia_m': round(distancia, 1),
+            'similaridade': round(similaridade, 3),
+            # Texto e proximidade pesam igual na ordem das sugestões
+            'pontuacao': round((similaridade + 1 - distancia / RAIO_DUPLICATA_M) / 2, 3),
+        })
+    candidatas.sort(key=lambda candidata: candidata['pontuacao'], reverse=True)
+    return candidatas[:MAX_CANDIDATAS]
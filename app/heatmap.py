@@ -0,0 +1,349 @@
+# SVCA/app/heatmap.py
+# Tiles de mapa de calor (/tiles/heatmap/z/x/y.png ou .json): as coordenadas das ocorrências
+# são agregadas em grades de densidade com NumPy e os tiles dos filtros mais usados ficam em
+# cache em disco, invalidados tile a tile quando ocorrências são registradas, moderadas ou removidas.
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import date
+from itertools import chain, groupby
+
+import numpy as np
+from flask import current_app
+from PIL import Image
+from sqlalchemy import event, inspect
+
+from . import db
+from .lookups import get_lookups
+from .models.coordenada import Coordenada
+from .models.ocorrencia import Ocorrencia
+from .spatial import bbox_filter, spatial_index_available
+
+FORMATOS = ('png', 'json')
+
+# Campos de Ocorrencia que mudam o conteúdo dos tiles filtrados
+CAMPOS_TILE = ('status_id', 'data_registro', 'coordenada_id')
+
+# Latitude máxima da projeção Web Mercator
+LATITUDE_MAXIMA = 85.05112878
+
+# Suavização binomial (separável) aplicada à grade antes de colorir; PAD células de
+# margem em volta do tile entram na suavização para não haver emendas entre tiles
+KERNEL = np.array([1, 4, 6, 4, 1], dtype=np.float64) / 16
+PAD = len(KERNEL) // 2
+
+# Paleta: intensidade de 0 a 1 -> RGBA (transparente, azul, verde, amarelo, vermelho)
+PALETA = (
+    (0.0, (0, 0, 255, 0)),
+    (0.25, (0, 90, 255, 120)),
+    (0.5, (0, 200, 120, 170)),
+    (0.75, (255, 220, 0, 200)),
+    (1.0, (230, 30, 0, 230)),
+)
+CORES = np.stack([
+    np.interp(np.linspace(0, 1, 256), [posicao for posicao, _ in PALETA], [cor[canal] for _, cor in PALETA])
+    for canal in range(4)
+], axis=1).astype(np.uint8)
+
+
+class HeatmapTiles:
+    """
+    Extensão dos tiles de densidade. Cada tile é dividido em HEATMAP_GRID x HEATMAP_GRID
+    células; o PNG tem HEATMAP_TILE_SIZE pixels de lado e o JSON traz as contagens das
+    células não vazias. Os arquivos ficam em HEATMAP_CACHE_DIR/<filtros>/<z>/<x>/<y>.<formato>,
+    só para os filtros com pasta em filters_key (o padrão e cada status sozinho, sem datas):
+    a rota é pública e as demais combinações são geradas sem gravar nada em disco.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('HEATMAP_CACHE_DIR', os.path.join(app.instance_path, 'heatmap_tiles'))
+        app.config.setdefault('HEATMAP_TILE_SIZE', 256)
+        app.config.setdefault('HEATMAP_GRID', 64)
+        app.config.setdefault('HEATMAP_MAX_ZOOM', 18)
+        # Ocorrências por célula que saturam a cor no zoom de referência; a cada nível
+        # de zoom a menos o limite dobra (as células cobrem uma área 4x maior)
+        app.config.setdefault('HEATMAP_SATURATION', 4)
+        app.config.setdefault('HEATMAP_REFERENCE_ZOOM', 15)
+        app.config.setdefault('HEATMAP_CACHE_MAX_AGE', 60)
+        app.extensions['heatmap_tiles'] = self
+
+    def tile(self, z, x, y, formato, filtros):
+        """
+        Conteúdo do tile (bytes), lido do cache em disco ou gerado e gravado nele
+        (se os filtros tiverem pasta no cache).
+        """
+        caminho = self._caminho(filtros, z, x, y, formato)
+        if caminho is not None:
+            try:
+                with open(caminho, 'rb') as arquivo:
+                    return arquivo.read()
+            except FileNotFoundError:
+                pass
+
+        config = current_app.config
+        contagens, densidade = density_grid(z, x, y, filtros, config['HEATMAP_GRID'])
+        if formato == 'json':
+            conteudo = _tile_json(z, x, y, contagens)
+        else:
+            saturacao = max(1.0, config['HEATMAP_SATURATION'] * 2 ** (config['HEATMAP_REFERENCE_ZOOM'] - z))
+            conteudo = _tile_png(densidade, saturacao, config['HEATMAP_TILE_SIZE'])
+        if caminho is None:
+            return conteudo
+
+        # Escrita atômica: requisições concorrentes nunca leem um tile pela metade
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+        return conteudo
+
+    def invalidate(self, pontos):
+        """
+        Remove do cache, em todos os filtros, os tiles que contêm os pontos (latitude,
+        longitude). Os tiles afetados são calculados uma vez, com NumPy, só para os zooms
+        que existem no cache, e só as pastas de coluna existentes são visitadas.
+        Retorna o número de arquivos removidos.
+        """
+        raiz = current_app.config['HEATMAP_CACHE_DIR']
+        if not pontos or not os.path.isdir(raiz):
+            return 0
+        pastas_zoom = {}
+        for pasta in os.scandir(raiz):
+            if pasta.is_dir():
+                for zoom in os.scandir(pasta.path):
+                    if zoom.is_dir() and zoom.name.isdigit():
+                        pastas_zoom.setdefault(int(zoom.name), []).append(zoom.path)
+        if not pastas_zoom:
+            return 0
+
+        latitudes, longitudes = np.array(pontos, dtype=np.float64).reshape(-1, 2).T
+        tiles = affected_tiles(latitudes, longitudes, sorted(pastas_zoom), PAD / current_app.config['HEATMAP_GRID'])
+        removidos = 0
+        for z, pares in tiles.items():
+            # Pares (x, y) ordenados por x: uma verificação de pasta por coluna
+            colunas = [(x, [y for _, y in grupo]) for x, grupo in groupby(pares.tolist(), key=lambda par: par[0])]
+            for pasta in pastas_zoom[z]:
+                for x, linhas in colunas:
+                    pasta_x = os.path.join(pasta, str(x))
+                    if not os.path.isdir(pasta_x):
+                        continue
+                    for y in linhas:
+                        for formato in FORMATOS:
+                            try:
+                                os.remove(os.path.join(pasta_x, f"{y}.{formato}"))
+                                removidos += 1
+                            except FileNotFoundError:
+                                pass
+        return removidos
+
+    def clear(self):
+        """
+        Apaga todo o cache (ex.: após cargas em massa feitas fora do ORM).
+        """
+        shutil.rmtree(current_app.config['HEATMAP_CACHE_DIR'], ignore_errors=True)
+
+    def _caminho(self, filtros, z, x, y, formato):
+        pasta = filters_key(filtros)
+        if pasta is None:
+            return None
+        return os.path.join(current_app.config['HEATMAP_CACHE_DIR'], pasta, str(z), str(x), f"{y}.{formato}")
+
+
+def get_heatmap_tiles():
+    return current_app.extensions['heatmap_tiles']
+
+
+def parse_heatmap_filters(args):
+    """
+    Filtros do mapa de calor a partir da query string: status_id (um ou mais, separados
+    por vírgula; por padrão todos menos 'Recusada'), data_inicio e data_fim (data de
+    registro, AAAA-MM-DD). Lança ValueError se algum valor for inválido.
+    """
+    valor = args.get('status_id')
+    if valor:
+        status_ids = sorted({int(parte) for parte in valor.split(',')})
+    else:
+        status_ids = default_status_ids()
+    data_inicio = date.fromisoformat(args['data_inicio']) if args.get('data_inicio') else None
+    data_fim = date.fromisoformat(args['data_fim']) if args.get('data_fim') else None
+    return {'status_ids': status_ids, 'data_inicio': data_inicio, 'data_fim': data_fim}
+
+
+def default_status_ids():
+    recusada_id = get_lookups().id_for('status', 'Recusada')
+    return sorted(item['id'] for item in get_lookups().items('status') if item['id'] != recusada_id)
+
+
+def filters_key(filtros):
+    """
+    Nome da pasta do cache para a combinação de filtros, ou None se ela não fica em
+    disco. Só as combinações de uma lista fixa têm pasta ('padrao' e 'status-<id>'
+    para cada status cadastrado, sem datas): o cache não cresce com filtros arbitrários.
+    """
+    if filtros['data_inicio'] or filtros['data_fim']:
+        return None
+    if filtros['status_ids'] == default_status_ids():
+        return 'padrao'
+    cadastrados = {item['id'] for item in get_lookups().items('status')}
+    if len(filtros['status_ids']) == 1 and filtros['status_ids'][0] in cadastrados:
+        return f"status-{filtros['status_ids'][0]}"
+    return None
+
+
+def validate_tile(z, x, y, max_zoom):
+    if not 0 <= z <= max_zoom:
+        raise ValueError(f'Zoom deve estar entre 0 e {max_zoom}.')
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError('Tile fora dos limites do zoom.')
+
+
+def _mundo(latitude, longitude):
+    # Posição Web Mercator normalizada (0 a 1) de arrays de latitude/longitude
+    latitude = np.radians(np.clip(latitude, -LATITUDE_MAXIMA, LATITUDE_MAXIMA))
+    return (longitude + 180.0) / 360.0, (1.0 - np.arcsinh(np.tan(latitude)) / math.pi) / 2.0
+
+
+def affected_tiles(latitudes, longitudes, zooms, margem):
+    """
+    Tiles cujo conteúdo depende de algum dos pontos (arrays de latitude/longitude), nos
+    zooms informados: o que contém cada ponto e os vizinhos a menos de 'margem' (fração
+    do lado) da borda, pela suavização. Retorna {z: array de pares (x, y) únicos, ordenados}.
+    """
+    mundo_x, mundo_y = _mundo(np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64))
+    deslocamentos = np.array([-margem, 0.0, margem])
+    tiles = {}
+    for z in zooms:
+        n = 2 ** z
+        xs = np.clip(np.floor(mundo_x[:, None] * n + deslocamentos), 0, n - 1).astype(np.int64)
+        ys = np.clip(np.floor(mundo_y[:, None] * n + deslocamentos), 0, n - 1).astype(np.int64)
+        # As 3 x 3 combinações de deslocamentos de cada ponto, como x * n + y (unique em 1D é bem mais rápido)
+        chaves = np.unique(np.repeat(xs, 3, axis=1).ravel() * n + np.tile(ys, (1, 3)).ravel())
+        tiles[z] = np.stack([chaves // n, chaves % n], axis=1)
+    return tiles
+
+
+def tile_bbox(z, x, y, margem=0.0):
+    """
+    (minLon, minLat, maxLon, maxLat) do tile, ampliado por 'margem' (fração do lado).
+    """
+    n = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (
+        max(-180.0, (x - margem) / n * 360.0 - 180.0),
+        max(-90.0, latitude(y + 1 + margem)),
+        min(180.0, (x + 1 + margem) / n * 360.0 - 180.0),
+        min(90.0, latitude(y - margem)),
+    )
+
+
+def density_grid(z, x, y, filtros, grade):
+    """
+    Contagens de ocorrências por célula do tile (grade x grade, inteiros) e a densidade
+    suavizada, calculada com a margem de PAD células dos tiles vizinhos.
+    """
+    # Com o R*Tree o planejador do SQLite preferiria o índice de status, pouco seletivo
+    # (o filtro padrão inclui quase todos); o "+ 0" o descarta e a consulta parte do R*Tree
+    status_id = Ocorrencia.status_id + 0 if spatial_index_available() else Ocorrencia.status_id
+    statement = db.select(Coordenada.latitude, Coordenada.longitude).join(
+        Ocorrencia, Ocorrencia.coordenada_id == Coordenada.id
+    ).where(
+        bbox_filter(tile_bbox(z, x, y, margem=PAD / grade)),
+        status_id.in_(filtros['status_ids']),
+    )
+    if filtros['data_inicio']:
+        statement = statement.where(Ocorrencia.data_registro >= filtros['data_inicio'])
+    if filtros['data_fim']:
+        statement = statement.where(Ocorrencia.data_registro <= filtros['data_fim'])
+
+    # fromiter sobre as tuplas: np.array() sobre objetos Row é dezenas de vezes mais lento
+    pontos = np.fromiter(chain.from_iterable(db.session.execute(statement).tuples()), dtype=np.float64).reshape(-1, 2)
+    lado = grade + 2 * PAD
+    if not len(pontos):
+        return np.zeros((grade, grade), dtype=np.int64), np.zeros((grade, grade))
+
+    mundo_x, mundo_y = _mundo(pontos[:, 0], pontos[:, 1])
+    colunas = (mundo_x * 2 ** z - x) * grade + PAD
+    linhas = (mundo_y * 2 ** z - y) * grade + PAD
+    histograma, _, _ = np.histogram2d(linhas, colunas, bins=lado, range=((0, lado), (0, lado)))
+
+    contagens = histograma[PAD:PAD + grade, PAD:PAD + grade].astype(np.int64)
+    suavizada = sum(peso * histograma[i:i + grade, :] for i, peso in enumerate(KERNEL))
+    suavizada = sum(peso * suavizada[:, i:i + grade] for i, peso in enumerate(KERNEL))
+    return contagens, suavizada
+
+
+def _tile_json(z, x, y, contagens):
+    linhas, colunas = np.nonzero(contagens)
+    return json.dumps({
+        'z': z, 'x': x, 'y': y,
+        'grid': contagens.shape[0],
+        'total': int(contagens.sum()),
+        'max': int(contagens.max()),
+        # [coluna, linha, ocorrências], com a linha 0 no topo do tile
+        'cells': [[int(coluna), int(linha), int(contagens[linha, coluna])] for linha, coluna in zip(linhas, colunas)],
+    }, separators=(',', ':')).encode()
+
+
+def _tile_png(densidade, saturacao, tamanho):
+    # Escala logarítmica: poucas ocorrências ainda aparecem ao lado dos focos
+    intensidade = np.clip(np.log1p(densidade) / math.log1p(saturacao), 0, 1)
+    indices = Image.fromarray(np.round(intensidade * 255).astype(np.uint8), 'L').resize((tamanho, tamanho), Image.BILINEAR)
+    # PNG com paleta RGBA (1 byte por pixel): ~6x mais rápido e menor que gravar RGBA
+    imagem = indices.convert('P')
+    imagem.putpalette(CORES.tobytes(), rawmode='RGBA')
+    buffer = io.BytesIO()
+    imagem.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_tiles_alterados(session, flush_context):
+    # Coordenadas (antigas e novas) das ocorrências que entram ou saem de algum tile
+    coordenada_ids = set()
+    for occ in session.new:
+        if isinstance(occ, Ocorrencia):
+            coordenada_ids.add(occ.coordenada_id)
+    for occ in session.deleted:
+        if isinstance(occ, Ocorrencia):
+            coordenada_ids.add(occ.coordenada_id)
+    for occ in session.dirty:
+        if isinstance(occ, Ocorrencia):
+            estado = inspect(occ)
+            for campo in CAMPOS_TILE:
+                historico = estado.attrs[campo].history
+                if historico.has_changes():
+                    coordenada_ids.add(occ.coordenada_id)
+                    if campo == 'coordenada_id':
+                        coordenada_ids.update(historico.deleted)
+    coordenada_ids.discard(None)
+    if coordenada_ids:
+        pontos = session.execute(
+            db.select(Coordenada.latitude, Coordenada.longitude).where(Coordenada.id.in_(coordenada_ids))
+        ).all()
+        session.info.setdefault('heatmap_pontos', []).extend(tuple(ponto) for ponto in pontos)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_tiles(session):
+    pontos = session.info.pop('heatmap_pontos', None)
+    if pontos and current_app and 'heatmap_tiles' in current_app.extensions:
+        try:
+            get_heatmap_tiles().invalidate(pontos)
+        except Exception as e:
+            print(f"ERRO ao invalidar tiles do mapa de calor: {e}")
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _descartar_tiles_alterados(session, previous_transaction):
+    session.info.pop('heatmap_pontos', None)
@@ -0,0 +1,78 @@
+# SVCA/app/identity.py
+# Identidade do usuário logado: carregada uma vez por requisição e com cache curto por processo.
+import threading
+import time
+
+from flask import current_app, g
+from sqlalchemy.orm import joinedload
+
+from . import db
+from .models.usuario import Usuario
+
+# usuario_id -> (is_blocked, perfil_nome, expira_em)
+_cache = {}
+_lock = threading.Lock()
+
+
+class Identity:
+    """
+    Dados de autorização do usuário logado. O objeto Usuario completo só é
+    carregado se a view precisar dele, e no máximo uma vez por requisição.
+    """
+
+    def __init__(self, user_id, perfil, is_blocked, usuario=None):
+        self.user_id = user_id
+        self.perfil = perfil
+        self.is_blocked = is_blocked
+        self._usuario = usuario
+
+    @property
+    def usuario(self):
+        if self._usuario is None:
+            self._usuario = db.session.get(Usuario, self.user_id, options=[joinedload(Usuario.perfil)])
+        return self._usuario
+
+
+def load_identity(user_id):
+    """
+    Retorna a identidade do usuário, consultando o banco apenas se ela não estiver
+    no cache (ou se tiver expirado). Retorna None se o usuário não existir.
+    """
+    agora = time.monotonic()
+    with _lock:
+        cached = _cache.get(user_id)
+    if cached and cached[2] > agora:
+        return Identity(user_id, cached[1], cached[0])
+
+    # Cache expirado: carrega o usuário completo, que fica disponível para a view
+    usuario = Usuario.query.options(joinedload(Usuario.perfil)).filter(Usuario.id == user_id).first()
+    if not usuario:
+        invalidate_identity(user_id)
+        return None
+    perfil = usuario.perfil.nome if usuario.perfil else None
+    with _lock:
+        _cache[user_id] = (usuario.is_blocked, perfil, agora + current_app.config['IDENTITY_CACHE_TTL'])
+    return Identity(user_id, perfil, usuario.is_blocked, usuario)
+
+
+def invalidate_identity(user_id):
+    """
+    Remove o usuário do cache; chamar após alterar bloqueio ou perfil.
+    """
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def current_identity():
+    """
+    Identidade carregada por login_required para a requisição atual.
+    """
+    return g.get('identity')
+
+
+def get_current_user():
+    """
+    Objeto Usuario do usuário logado (carregado no máximo uma vez por requisição).
+    """
+    identity = current_identity()
+    return identity.usuario if identity else None
@@ -0,0 +1,547 @@
+# SVCA/app/images.py
+# Pipeline de imagens das ocorrências: o upload é gravado em disco em blocos e o
+# processamento (validação, remoção de EXIF, versões reduzidas) roda fora da requisição.
+# Os arquivos são endereçados pelo SHA-256 do upload, então fotos idênticas são gravadas uma vez.
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from urllib.parse import urlsplit, urlunsplit
+
+from flask import current_app, request, url_for
+from sqlalchemy import event, func, or_, select
+from PIL import Image, ImageOps
+
+from . import db
+from .models.imagem import Imagem
+
+CHUNK_SIZE = 64 * 1024
+
+# Caminho (relativo a static/) das versões endereçadas por conteúdo: uploads/ocorrencias/ab/abcd...ef_thumb.jpg
+CONTENT_ADDRESSED_PATH = re.compile(r'^uploads/ocorrencias/[0-9a-f]{2}/[0-9a-f]{64}(_medium|_thumb)?\.jpg$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Cópias pendentes de conteúdo sem referência só são apagadas depois deste tempo (segundos):
+# as mais novas podem ser de um envio do mesmo conteúdo cuja transação ainda não terminou
+STAGED_GRACE_SECONDS = 3600
+
+# (sufixo do arquivo, chave de configuração com o lado máximo), da maior versão para a menor
+RENDITIONS = (
+    ('', 'IMAGE_FULL_MAX_SIDE'),
+    ('_medium', 'IMAGE_MEDIUM_MAX_SIDE'),
+    ('_thumb', 'IMAGE_THUMBNAIL_MAX_SIDE'),
+)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def staging_dir():
+    """
+    Diretório (fora de static/) onde os uploads aguardam processamento.
+    """
+    path = os.path.join(current_app.instance_path, 'uploads_pendentes')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def output_dir():
+    path = os.path.join(current_app.root_path, 'static', 'uploads', 'ocorrencias')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def staged_path(nome_arquivo):
+    # Cada envio tem a sua cópia (hash + sufixo único): envios simultâneos da mesma foto
+    # não compartilham o arquivo pendente, e descartar uma cópia não afeta as outras
+    return os.path.join(staging_dir(), f"{nome_arquivo}.{uuid.uuid4().hex}.upload")
+
+
+def staged_copies(nome_arquivo):
+    """
+    Cópias pendentes (de qualquer envio) do conteúdo com este hash, incluindo as
+    gravadas sem sufixo por versões anteriores.
+    """
+    return sorted(glob.glob(os.path.join(staging_dir(), f"{nome_arquivo}*.upload")))
+
+
+def rendition_filenames(nome_arquivo):
+    """
+    Caminhos (relativos à pasta de saída) dos arquivos gerados:
+    (original reduzida, média, miniatura).
+    """
+    return tuple(f"{nome_arquivo[:2]}/{nome_arquivo}{sufixo}.jpg" for sufixo, _ in RENDITIONS)
+
+
+def renditions_exist(nome_arquivo):
+    pasta = output_dir()
+    return all(os.path.exists(os.path.join(pasta, filename)) for filename in rendition_filenames(nome_arquivo))
+
+
+def stage_upload(file_storage, max_bytes=None):
+    """
+    Copia o arquivo enviado para o diretório de espera em blocos de CHUNK_SIZE,
+    sem carregá-lo inteiro em memória, calculando o SHA-256 do conteúdo.
+    Retorna (hash, caminho da cópia pendente); o hash é o nome base dos arquivos da imagem.
+
+    Levanta UploadTooLarge se o arquivo passar de max_bytes.
+    """
+    max_bytes = max_bytes or current_app.config['IMAGE_MAX_BYTES']
+    tmp_path = os.path.join(staging_dir(), f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > max_bytes:
+                    raise UploadTooLarge(
+                        f"A imagem '{file_storage.filename}' excede o limite de {max_bytes // (1024 * 1024)} MB."
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        nome_arquivo = digest.hexdigest()
+        caminho = staged_path(nome_arquivo)
+        os.replace(tmp_path, caminho)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return nome_arquivo, caminho
+
+
+def discard_staged(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+def _remove_renditions(nome_arquivo):
+    pasta = output_dir()
+    for filename in rendition_filenames(nome_arquivo):
+        try:
+            os.remove(os.path.join(pasta, filename))
+        except OSError:
+            pass
+
+
+def _save_jpeg(img, path, quality):
+    # Grava em arquivo temporário e renomeia: quem lê nunca vê um JPEG pela metade.
+    # Sem o parâmetro exif o Pillow não copia metadados (GPS, câmera) para a saída.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    img.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def render_image(source_path, nome_arquivo, config):
+    """
+    Valida a imagem e grava as versões JPEG sem EXIF. Retorna (largura, altura)
+    da versão principal. Levanta ValueError se o arquivo não for uma imagem válida.
+    """
+    try:
+        with Image.open(source_path) as img:
+            if img.width * img.height > config['IMAGE_MAX_PIXELS']:
+                raise ValueError('Imagem com resolução acima do permitido.')
+            img.verify()
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError('Arquivo enviado não é uma imagem válida.') from e
+
+    # verify() invalida o objeto; reabre para processar
+    with Image.open(source_path) as img:
+        lado = config['IMAGE_FULL_MAX_SIDE']
+        # Para JPEG, decodifica já reduzido (potências de 2) quando a imagem é muito maior
+        img.draft('RGB', (lado, lado))
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            rgba = img.convert('RGBA')
+            fundo = Image.new('RGB', rgba.size, (255, 255, 255))
+            fundo.paste(rgba, mask=rgba.split()[-1])
+            img = fundo
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        pasta = output_dir()
+        dimensoes = None
+        # Cada versão é reduzida a partir da anterior (maior), que já está em memória
+        for (sufixo, chave), filename in zip(RENDITIONS, rendition_filenames(nome_arquivo)):
+            lado = config[chave]
+            img.thumbnail((lado, lado), Image.LANCZOS)
+            _save_jpeg(img, os.path.join(pasta, filename), config['IMAGE_JPEG_QUALITY'])
+            if dimensoes is None:
+                dimensoes = img.size
+    return dimensoes
+
+
+def process_image(imagem):
+    """
+    Processa uma Imagem pendente e atualiza seu status (sem commit).
+
+    Nunca apaga as versões geradas: elas são compartilhadas por todas as imagens com o
+    mesmo conteúdo e só são removidas pela contagem de referências após o commit (ver
+    remove_unreferenced). Versões parciais de uma falha ficam para essa limpeza.
+    """
+    copias = staged_copies(imagem.nome_arquivo)
+    source_path = None
+    try:
+        if renditions_exist(imagem.nome_arquivo):
+            # Mesmo conteúdo já processado (outro envio da mesma foto)
+            with Image.open(os.path.join(output_dir(), rendition_filenames(imagem.nome_arquivo)[0])) as img:
+                imagem.largura, imagem.altura = img.size
+            imagem.status = Imagem.STATUS_PRONTA
+            imagem.erro = None
+            return True
+        if not copias:
+            raise ValueError('Arquivo enviado não encontrado para processamento.')
+        source_path = copias[0]
+        imagem.largura, imagem.altura = render_image(source_path, imagem.nome_arquivo, current_app.config)
+        imagem.status = Imagem.STATUS_PRONTA
+        imagem.erro = None
+    except Exception as e:
+        imagem.status = Imagem.STATUS_FALHOU
+        imagem.erro = str(e)[:255]
+        print(f"ERRO ao processar imagem {imagem.id}: {e}")
+    finally:
+        # Com as versões prontas, nenhuma cópia pendente do mesmo conteúdo é mais necessária
+        # (as outras imagens pendentes dele as reaproveitam); numa falha, só a cópia usada sai
+        for caminho in (copias if imagem.status == Imagem.STATUS_PRONTA else [source_path]):
+            if caminho:
+                discard_staged(caminho)
+    return imagem.status == Imagem.STATUS_PRONTA
+
+
+def new_image_for_upload(nome_arquivo, caminho_pendente, ocorrencia_id):
+    """
+    Cria (sem adicionar à sessão) a Imagem de um upload gravado com stage_upload.
+
+    Se o mesmo conteúdo já foi processado, a nova Imagem aponta para os arquivos
+    existentes e já nasce pronta; caso contrário fica pendente para o pipeline. A cópia
+    pendente de um envio reaproveitado só é descartada no fim da transação: até lá é ela
+    que impede remove_unreferenced de apagar as versões (ver _copias_recentes).
+    """
+    url_principal, url_media, url_thumbnail = [
+        url_for('static', filename=f'uploads/ocorrencias/{filename}', _external=True)
+        for filename in rendition_filenames(nome_arquivo)
+    ]
+    imagem = Imagem(
+        url=url_principal,
+        url_media=url_media,
+        url_thumbnail=url_thumbnail,
+        nome_arquivo=nome_arquivo,
+        status=Imagem.STATUS_PENDENTE,
+        ocorrencia_id=ocorrencia_id
+    )
+    existente = Imagem.query.filter_by(nome_arquivo=nome_arquivo, status=Imagem.STATUS_PRONTA).first()
+    if existente and renditions_exist(nome_arquivo):
+        db.session.info.setdefault('copias_reaproveitadas', []).append(caminho_pendente)
+        imagem.status = Imagem.STATUS_PRONTA
+        imagem.largura = existente.largura
+        imagem.altura = existente.altura
+    return imagem
+
+
+def _copias_recentes(nome_arquivo, limite):
+    """
+    Cópias pendentes do hash gravadas depois de 'limite' (timestamp): pertencem a envios
+    cuja transação pode não ter terminado e que vão referenciar as versões desse conteúdo.
+    """
+    recentes = []
+    for caminho in staged_copies(nome_arquivo):
+        try:
+            if os.path.getmtime(caminho) >= limite:
+                recentes.append(caminho)
+        except OSError:
+            pass
+    return recentes
+
+
+def remove_unreferenced(nomes_arquivo):
+    """
+    Remove os arquivos dos hashes que não são mais referenciados por nenhuma Imagem.
+    A contagem de referências é feita sobre a coluna indexada imagem.nome_arquivo.
+
+    Enquanto houver cópia pendente com menos de STAGED_GRACE_SECONDS nada do hash é
+    apagado: ela é de um envio recente que ainda pode ser gravado apontando para as
+    versões. Um envio que chegue entre a verificação e a remoção tem as versões refeitas
+    a partir da sua cópia.
+    """
+    tabela = Imagem.__table__
+    limite = time.time() - STAGED_GRACE_SECONDS
+    removidos = 0
+    with db.engine.connect() as connection:
+        for nome_arquivo in set(nomes_arquivo):
+            referencias = connection.execute(
+                select(func.count()).select_from(tabela).where(tabela.c.nome_arquivo == nome_arquivo)
+            ).scalar()
+            if referencias or _copias_recentes(nome_arquivo, limite):
+                continue
+            _remove_renditions(nome_arquivo)
+            recentes = _copias_recentes(nome_arquivo, limite)
+            if recentes:
+                try:
+                    render_image(recentes[0], nome_arquivo, current_app.config)
+                except Exception as e:
+                    print(f"ERRO ao refazer as versões da imagem {nome_arquivo}: {e}")
+                continue
+            for caminho in staged_copies(nome_arquivo):
+                discard_staged(caminho)
+            removidos += 1
+    return removidos
+
+
+def process_pending_images(limit=None):
+    """
+    Processa as imagens ainda pendentes (por exemplo, após reiniciar o servidor).
+    Retorna a tupla (processadas, falhas).
+    """
+    query = Imagem.query.filter_by(status=Imagem.STATUS_PENDENTE).order_by(Imagem.id)
+    if limit:
+        query = query.limit(limit)
+    processadas = 0
+    falhas = 0
+    for imagem in query.all():
+        if process_image(imagem):
+            processadas += 1
+        else:
+            falhas += 1
+        db.session.commit()
+    return processadas, falhas
+
+
+class ImagePipeline:
+    """
+    Extensão que processa as imagens enviadas em um pool de threads.
+
+    O Pillow libera o GIL durante a decodificação e o redimensionamento, então
+    algumas threads bastam para não bloquear as requisições. Com
+    IMAGE_PROCESS_ASYNC = False o processamento ocorre na própria requisição.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_PROCESS_ASYNC', True)
+        app.config.setdefault('IMAGE_WORKERS', 2)
+        app.config.setdefault('IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('IMAGE_MAX_FILES', 10)
+        app.config.setdefault('IMAGE_MAX_PIXELS', 50_000_000)
+        app.config.setdefault('IMAGE_FULL_MAX_SIDE', 2048)
+        app.config.setdefault('IMAGE_MEDIUM_MAX_SIDE', 1024)
+        app.config.setdefault('IMAGE_THUMBNAIL_MAX_SIDE', 320)
+        app.config.setdefault('IMAGE_JPEG_QUALITY', 85)
+        if app.config.get('MAX_CONTENT_LENGTH') is None:
+            # Corpo máximo da requisição: todas as imagens no limite + campos do formulário
+            app.config['MAX_CONTENT_LENGTH'] = app.config['IMAGE_MAX_BYTES'] * app.config['IMAGE_MAX_FILES'] + 1024 * 1024
+        app.extensions['image_pipeline'] = self
+
+        @app.after_request
+        def _cache_imagens_imutaveis(response):
+            # O nome do arquivo é o hash do conteúdo: a URL nunca muda de conteúdo
+            if request.endpoint == 'static' and response.status_code in (200, 304):
+                filename = (request.view_args or {}).get('filename', '')
+                if CONTENT_ADDRESSED_PATH.match(filename):
+                    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            return response
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='svca-images'
+                )
+            return self._executor
+
+    def submit(self, imagem_ids):
+        """
+        Agenda o processamento das imagens; chamar após o commit que as criou.
+        """
+        if not imagem_ids:
+            return
+        app = current_app._get_current_object()
+        if not app.config['IMAGE_PROCESS_ASYNC']:
+            for imagem_id in imagem_ids:
+                self._process_one(imagem_id)
+            return
+        executor = self._get_executor(app)
+        for imagem_id in imagem_ids:
+            executor.submit(self._run, app, imagem_id)
+
+    def shutdown(self, wait=True):
+        """
+        Encerra o pool, esperando (por padrão) as imagens já agendadas.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _process_one(self, imagem_id):
+        imagem = db.session.get(Imagem, imagem_id)
+        if imagem is None or imagem.status != Imagem.STATUS_PENDENTE:
+            return
+        process_image(imagem)
+        db.session.commit()
+
+    def _run(self, app, imagem_id):
+        with app.app_context():
+            try:
+                self._process_one(imagem_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"ERRO no processamento da imagem {imagem_id}: {e}")
+            finally:
+                db.session.remove()
+
+
+def get_image_pipeline():
+    return current_app.extensions['image_pipeline']
+
+
+def _static_relpath(url):
+    """
+    Caminho relativo a static/ de uma URL gerada por url_for('static', ...), ou None.
+    """
+    path = urlsplit(url).path
+    marcador = '/static/'
+    if marcador not in path:
+        return None
+    return path.split(marcador, 1)[1]
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrate_to_content_addressed(dry_run=False):
+    """
+    Move as imagens gravadas com nome aleatório para o armazenamento endereçado
+    por conteúdo, gerando as versões reduzidas e unificando arquivos idênticos.
+    Os arquivos antigos que deixam de ser referenciados são apagados.
+
+    Retorna um dicionário com as contagens da migração.
+    """
+    pasta_static = os.path.join(current_app.root_path, 'static')
+    resultado = {'migradas': 0, 'reaproveitadas': 0, 'ausentes': 0, 'falhas': 0, 'arquivos_removidos': 0}
+    hashes = {}
+    antigos = set()
+    gerados = set()
+
+    imagens = Imagem.query.filter(
+        Imagem.status == Imagem.STATUS_PRONTA,
+        or_(Imagem.nome_arquivo.is_(None), func.length(Imagem.nome_arquivo) != 64)
+    ).order_by(Imagem.id).all()
+
+    for imagem in imagens:
+        relpath = _static_relpath(imagem.url)
+        caminho = os.path.join(pasta_static, relpath) if relpath else None
+        if not caminho or not os.path.isfile(caminho):
+            resultado['ausentes'] += 1
+            continue
+
+        nome_arquivo = hashes.get(caminho) or _hash_file(caminho)
+        hashes[caminho] = nome_arquivo
+        if nome_arquivo in gerados or renditions_exist(nome_arquivo):
+            resultado['reaproveitadas'] += 1
+            if not dry_run:
+                with Image.open(os.path.join(output_dir(), rendition_filenames(nome_arquivo)[0])) as img:
+                    largura, altura = img.size
+        elif dry_run:
+            gerados.add(nome_arquivo)
+            largura, altura = None, None
+        else:
+            try:
+                largura, altura = render_image(caminho, nome_arquivo, current_app.config)
+            except Exception as e:
+                print(f"ERRO ao migrar imagem {imagem.id}: {e}")
+                resultado['falhas'] += 1
+                continue
+            gerados.add(nome_arquivo)
+        resultado['migradas'] += 1
+
+        for url in (imagem.url, imagem.url_media, imagem.url_thumbnail):
+            if url and _static_relpath(url):
+                antigos.add(_static_relpath(url))
+
+        # Mantém esquema e host das URLs já gravadas (url_for externo exige requisição)
+        partes = urlsplit(imagem.url)
+        prefixo = partes.path.split('/static/', 1)[0]
+        url_principal, url_media, url_thumbnail = [
+            urlunsplit((partes.scheme, partes.netloc, f"{prefixo}/static/uploads/ocorrencias/{filename}", '', ''))
+            for filename in rendition_filenames(nome_arquivo)
+        ]
+        imagem.url = url_principal
+        imagem.url_media = url_media
+        imagem.url_thumbnail = url_thumbnail
+        imagem.nome_arquivo = nome_arquivo
+        imagem.largura = largura
+        imagem.altura = altura
+
+    if dry_run:
+        db.session.rollback()
+        return resultado
+    db.session.commit()
+
+    # Apaga os arquivos antigos que nenhuma imagem referencia mais
+    referenciados = set()
+    for urls in db.session.query(Imagem.url, Imagem.url_media, Imagem.url_thumbnail):
+        referenciados.update(_static_relpath(url) for url in urls if url)
+    for relpath in antigos - referenciados:
+        try:
+            os.remove(os.path.join(pasta_static, relpath))
+            resultado['arquivos_removidos'] += 1
+        except OSError:
+            pass
+    return resultado
+
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_imagens_removidas(session, flush_context):
+    # Inclui as imagens removidas em cascata ao apagar uma Ocorrencia
+    nomes = [obj.nome_arquivo for obj in session.deleted if isinstance(obj, Imagem) and obj.nome_arquivo]
+    if nomes:
+        session.info.setdefault('imagens_removidas', []).extend(nomes)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _remover_arquivos_sem_referencia(session):
+    nomes = session.info.pop('imagens_removidas', None)
+    if nomes and current_app:
+        try:
+            remove_unreferenced(nomes)
+        except Exception as e:
+            print(f"ERRO ao remover arquivos de imagens sem referência: {e}")
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _descartar_imagens_removidas(session, previous_transaction):
+    session.info.pop('imagens_removidas', None)
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_soft_rollback')
+def _descartar_copias_reaproveitadas(session, *args):
+    # Gravada ou desfeita a Imagem que reaproveitou as versões, a cópia do envio não serve mais
+    for caminho in session.info.pop('copias_reaproveitadas', ()):
+        discard_staged(caminho)
@@ -0,0 +1,87 @@
+# SVCA/app/lookups.py
+# Registro em memória das tabelas de referência criadas pelo seed-db (status, perfis, tipos de pontuação).
+import hashlib
+import json
+import threading
+
+from flask import current_app
+
+from .models.ocorrencia import StatusOcorrencia
+from .models.perfil import Perfil
+from .models.tipo_pontuacao import TipoPontuacao
+
+LOOKUP_MODELS = {
+    'status': StatusOcorrencia,
+    'perfil': Perfil,
+    'tipo_pontuacao': TipoPontuacao,
+}
+
+
+class LookupRegistry:
+    """
+    Mapas nome <-> id das tabelas de referência, carregados uma única vez
+    (na primeira consulta) e recarregados sob demanda com refresh().
+
+    Uma busca por nome que não é encontrada força um refresh, para incorporar
+    linhas inseridas pelo seed-db depois que o processo subiu.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._tables = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['lookups'] = self
+
+    def refresh(self):
+        """
+        Recarrega todas as tabelas de referência do banco.
+        """
+        tables = {}
+        for key, model in LOOKUP_MODELS.items():
+            rows = [{'id': row.id, 'nome': row.nome} for row in model.query.order_by(model.id).all()]
+            payload = json.dumps(rows, sort_keys=True, ensure_ascii=False)
+            tables[key] = {
+                'items': rows,
+                'por_nome': {row['nome']: row['id'] for row in rows},
+                'por_id': {row['id']: row['nome'] for row in rows},
+                'etag': hashlib.sha256(payload.encode()).hexdigest()[:32],
+            }
+        with self._lock:
+            self._tables = tables
+
+    def _table(self, key):
+        if self._tables is None:
+            self.refresh()
+        return self._tables[key]
+
+    def id_for(self, key, nome):
+        """
+        Id do registro com o nome informado, ou None se não existir.
+        """
+        item_id = self._table(key)['por_nome'].get(nome)
+        if item_id is None:
+            self.refresh()
+            item_id = self._table(key)['por_nome'].get(nome)
+        return item_id
+
+    def name_for(self, key, item_id):
+        """
+        Nome do registro com o id informado, ou None se não existir.
+        """
+        return self._table(key)['por_id'].get(item_id)
+
+    def items(self, key):
+        """
+        Lista [{'id', 'nome'}] da tabela, na ordem dos ids.
+        """
+        return self._table(key)['items']
+
+    def etag(self, key):
+        return self._table(key)['etag']
+
+
+def get_lookups():
+    return current_app.extensions['lookups']
@@ -0,0 +1,306 @@
+# SVCA/app/mail_queue.py
+# Fila persistente de e-mails: os controllers enfileiram na mesma transação e um worker
+# em segundo plano envia em lotes, reaproveitando a conexão SMTP.
+import hashlib
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+
+from . import db, mail
+from .metrics import observe_mail_send
+from .models.fila_email import FilaEmail
+
+# Mensagem da notificação cujo e-mail pendente passou a uma notificação mais recente
+MENSAGEM_SUBSTITUIDA = "Notificação substituída por um envio mais recente ao Órgão Responsável."
+
+
+def _chave_dedup(assunto, destinatario, corpo):
+    return hashlib.sha256(f"{destinatario}\n{assunto}\n{corpo}".encode()).hexdigest()
+
+
+def enqueue_email(assunto, destinatario, corpo, notificacao=None, chave_dedup=None):
+    """
+    Adiciona um e-mail à fila na sessão atual (o envio só ocorre após o commit).
+
+    Se já existir um e-mail pendente com a mesma chave de deduplicação para o
+    destinatário, ele é atualizado com o conteúdo mais recente em vez de duplicado.
+    Por padrão a chave é o hash de destinatário, assunto e corpo. Se o pendente já
+    estava ligado a outra notificação, ela é marcada como substituída (o envio e a
+    falha só atualizam a notificação nova).
+    """
+    if chave_dedup is None:
+        chave_dedup = _chave_dedup(assunto, destinatario, corpo)
+
+    existente = FilaEmail.query.filter_by(
+        chave_dedup=chave_dedup, destinatario=destinatario, status=FilaEmail.STATUS_PENDENTE
+    ).first()
+    if existente:
+        existente.assunto = assunto
+        existente.corpo = corpo
+        if notificacao is not None:
+            anterior = existente.notificacao
+            if anterior is not None and anterior is not notificacao:
+                anterior.mensagem = MENSAGEM_SUBSTITUIDA
+            existente.notificacao = notificacao
+        return existente
+
+    item = FilaEmail(
+        destinatario=destinatario,
+        assunto=assunto,
+        corpo=corpo,
+        chave_dedup=chave_dedup,
+        notificacao=notificacao,
+        status=FilaEmail.STATUS_PENDENTE,
+        tentativas=0,
+        proxima_tentativa=datetime.now(),
+    )
+    db.session.add(item)
+    return item
+
+
+def enqueue_emails(mensagens):
+    """
+    Versão em lote de enqueue_email para (assunto, destinatario, corpo): uma consulta
+    para os pendentes com a mesma chave de deduplicação e um único executemany para os
+    novos. Retorna quantos e-mails ficaram na fila (novos ou atualizados).
+    """
+    por_chave = {}
+    for assunto, destinatario, corpo in mensagens:
+        por_chave[(_chave_dedup(assunto, destinatario, corpo), destinatario)] = (assunto, corpo)
+    if not por_chave:
+        return 0
+
+    existentes = FilaEmail.query.filter(
+        FilaEmail.chave_dedup.in_({chave for chave, _ in por_chave}),
+        FilaEmail.status == FilaEmail.STATUS_PENDENTE
+    ).all()
+    atualizados = 0
+    for item in existentes:
+        conteudo = por_chave.pop((item.chave_dedup, item.destinatario), None)
+        if conteudo:
+            item.assunto, item.corpo = conteudo
+            atualizados += 1
+
+    agora = datetime.now()
+    if por_chave:
+        db.session.execute(db.insert(FilaEmail), [{
+            'destinatario': destinatario,
+            'assunto': assunto,
+            'corpo': corpo,
+            'chave_dedup': chave,
+            'status': FilaEmail.STATUS_PENDENTE,
+            'tentativas': 0,
+            'proxima_tentativa': agora,
+        } for (chave, destinatario), (assunto, corpo) in por_chave.items()])
+    return atualizados + len(por_chave)
+
+
+def _reservar_lote(batch_size, reserva_expira):
+    """
+    Reserva atomicamente até batch_size e-mails prontos para envio e os retorna.
+    O UPDATE condicional garante que dois workers não enviem o mesmo e-mail.
+    """
+    agora = datetime.now()
+    token = uuid.uuid4().hex
+
+    # Libera reservas de workers que morreram no meio do envio
+    FilaEmail.query.filter(
+        FilaEmail.status == FilaEmail.STATUS_ENVIANDO,
+        FilaEmail.reservado_em < agora - reserva_expira
+    ).update({'status': FilaEmail.STATUS_PENDENTE, 'reservado_por': None}, synchronize_session=False)
+
+    ids = [row.id for row in FilaEmail.query.with_entities(FilaEmail.id).filter(
+        FilaEmail.status == FilaEmail.STATUS_PENDENTE,
+        FilaEmail.proxima_tentativa <= agora
+    ).order_by(FilaEmail.proxima_tentativa, FilaEmail.id).limit(batch_size)]
+    if ids:
+        FilaEmail.query.filter(
+            FilaEmail.id.in_(ids),
+            FilaEmail.status == FilaEmail.STATUS_PENDENTE
+        ).update({
+            'status': FilaEmail.STATUS_ENVIANDO,
+            'reservado_por': token,
+            'reservado_em': agora,
+        }, synchronize_session=False)
+    db.session.commit()
+
+    if not ids:
+        return []
+    return FilaEmail.query.filter_by(reservado_por=token, status=FilaEmail.STATUS_ENVIANDO) \
+        .order_by(FilaEmail.id).all()
+
+
+def _registrar_falha(item, erro, max_attempts, backoff_base):
+    item.tentativas += 1
+    item.ultimo_erro = str(erro)
+    item.reservado_por = None
+    item.reservado_em = None
+    if item.tentativas >= max_attempts:
+        item.status = FilaEmail.STATUS_FALHOU
+        if item.notificacao:
+            item.notificacao.mensagem = "Falha ao enviar notificação ao Órgão Responsável."
+        print(f"ERRO definitivo ao enviar e-mail {item.id} para {item.destinatario}: {erro}")
+    else:
+        item.status = FilaEmail.STATUS_PENDENTE
+        # Backoff exponencial: base, 2*base, 4*base, ...
+        item.proxima_tentativa = datetime.now() + timedelta(seconds=backoff_base * (2 ** (item.tentativas - 1)))
+        print(f"ERRO ao enviar e-mail {item.id} para {item.destinatario} (tentativa {item.tentativas}): {erro}")
+
+
+def _registrar_envio(item):
+    agora = datetime.now()
+    item.status = FilaEmail.STATUS_ENVIADO
+    item.enviado_em = agora
+    item.tentativas += 1
+    item.ultimo_erro = None
+    item.reservado_por = None
+    item.reservado_em = None
+    if item.notificacao:
+        item.notificacao.mensagem = "Notificação enviada ao Órgão Responsável."
+        item.notificacao.data_envio = agora.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _liberar(itens):
+    """
+    Devolve à fila, sem contar tentativa, e-mails reservados que não chegaram a ser enviados.
+    """
+    for item in itens:
+        item.status = FilaEmail.STATUS_PENDENTE
+        item.reservado_por = None
+        item.reservado_em = None
+
+
+def process_mail_queue(batch_size=50, max_attempts=5, backoff_base=30, reserva_expira=timedelta(minutes=10)):
+    """
+    Envia um lote de e-mails da fila usando uma única conexão SMTP.
+    Retorna a tupla (enviados, falhas). Deve ser chamado dentro de um app context.
+
+    Se um envio falhar, só esse e-mail conta a tentativa. A conexão pode ter caído
+    junto, então o lote para ali e o restante volta à fila para o próximo ciclo. A
+    exceção é a recusa dos destinatários, em que o servidor segue respondendo.
+    """
+    itens = _reservar_lote(batch_size, reserva_expira)
+    if not itens:
+        return 0, 0
+
+    enviados = 0
+    falhas = 0
+    pendentes = list(itens)
+    try:
+        with mail.connect() as conn:
+            while pendentes:
+                item = pendentes.pop(0)
+                inicio = time.perf_counter()
+                try:
+                    conn.send(Message(item.assunto, recipients=[item.destinatario], body=item.corpo))
+                    observe_mail_send(time.perf_counter() - inicio, True)
+                    _registrar_envio(item)
+                    enviados += 1
+                except Exception as e:
+                    observe_mail_send(time.perf_counter() - inicio, False)
+                    _registrar_falha(item, e, max_attempts, backoff_base)
+                    falhas += 1
+                    if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                        _liberar(pendentes)
+                        pendentes = []
+                db.session.commit()
+    except Exception as e:
+        # Falha ao conectar/autenticar no servidor SMTP: reagenda o restante do lote
+        for item in pendentes:
+            _registrar_falha(item, e, max_attempts, backoff_base)
+            falhas += 1
+        db.session.commit()
+    return enviados, falhas
+
+
+class MailQueue:
+    """
+    Extensão que gerencia o worker em segundo plano da fila de e-mails.
+
+    O worker é iniciado na primeira requisição (e não nos comandos da CLI) e acorda
+    periodicamente ou quando wake() é chamado após o commit de um novo e-mail.
+    """
+
+    def __init__(self, app=None):
+        self._worker = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_QUEUE_WORKER', True)
+        app.config.setdefault('MAIL_QUEUE_POLL_INTERVAL', 15)
+        app.config.setdefault('MAIL_QUEUE_BATCH_SIZE', 50)
+        app.config.setdefault('MAIL_QUEUE_MAX_ATTEMPTS', 5)
+        app.config.setdefault('MAIL_QUEUE_BACKOFF_BASE', 30)
+        app.extensions['mail_queue'] = self
+
+        @app.before_request
+        def _start_mail_worker():
+            if app.config['MAIL_QUEUE_WORKER'] and self._worker is None:
+                self.start(app)
+
+    def start(self, app):
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, args=(app,), name='svca-mail-queue', daemon=True)
+            self._worker.start()
+
+    def wake(self):
+        """
+        Acorda o worker para enviar imediatamente os e-mails recém-enfileirados.
+        """
+        self._event.set()
+
+    def process(self, app):
+        """
+        Processa a fila até esvaziar os e-mails prontos para envio.
+        """
+        total_enviados = 0
+        total_falhas = 0
+        with app.app_context():
+            try:
+                while True:
+                    enviados, falhas = process_mail_queue(
+                        batch_size=app.config['MAIL_QUEUE_BATCH_SIZE'],
+                        max_attempts=app.config['MAIL_QUEUE_MAX_ATTEMPTS'],
+                        backoff_base=app.config['MAIL_QUEUE_BACKOFF_BASE'],
+                    )
+                    total_enviados += enviados
+                    total_falhas += falhas
+                    if enviados + falhas < app.config['MAIL_QUEUE_BATCH_SIZE']:
+                        break
+            finally:
+                db.session.remove()
+        return total_enviados, total_falhas
+
+    def run_forever(self, app):
+        """
+        Executa o laço do worker na thread atual (usado por um processo dedicado da CLI).
+        """
+        self._run(app)
+
+    def _run(self, app):
+        while True:
+            self._event.clear()
+            try:
+                self.process(app)
+            except Exception as e:
+                print(f"ERRO no worker da fila de e-mails: {e}")
+            self._event.wait(app.config['MAIL_QUEUE_POLL_INTERVAL'])
+
+
+def wake_mail_worker():
+    """
+    Acorda o worker da aplicação atual; chamar logo após o commit que enfileirou e-mails.
+    """
+    queue = current_app.extensions.get('mail_queue')
+    if queue is not None:
+        queue.wake()
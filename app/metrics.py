@@ -0,0 +1,255 @@
+# SVCA/app/metrics.py
+# Instrumentação das requisições: latência por endpoint, consultas SQL, tempo de banco,
+# envio de e-mails e tamanho das respostas, expostos em /metrics (Prometheus) e Server-Timing.
+import threading
+import time
+
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from . import db
+
+# Limites (le) dos histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """
+    Histograma cumulativo no formato do Prometheus, com um conjunto de contadores por rótulos.
+    """
+
+    def __init__(self, nome, ajuda, rotulos, buckets):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, valores, valor):
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = {'buckets': [0] * len(self.buckets), 'soma': 0.0, 'contagem': 0}
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie['buckets'][i] += 1
+        serie['soma'] += valor
+        serie['contagem'] += 1
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} histogram']
+        for valores, serie in sorted(self._series.items()):
+            rotulos = _rotulos(self.rotulos, valores)
+            for limite, contagem in zip(self.buckets, serie['buckets']):
+                linhas.append(f'{self.nome}_bucket{{{rotulos}{"," if rotulos else ""}le="{limite}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{rotulos}{"," if rotulos else ""}le="+Inf"}} {serie["contagem"]}')
+            linhas.append(f'{self.nome}_sum{{{rotulos}}} {serie["soma"]:.6f}')
+            linhas.append(f'{self.nome}_count{{{rotulos}}} {serie["contagem"]}')
+        return linhas
+
+
+class Counter:
+    """
+    Contador monotônico no formato do Prometheus.
+    """
+
+    def __init__(self, nome, ajuda, rotulos):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._series = {}
+
+    def inc(self, valores, valor=1):
+        self._series[valores] = self._series.get(valores, 0) + valor
+
+    def render(self):
+        linhas = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} counter']
+        for valores, total in sorted(self._series.items()):
+            linhas.append(f'{self.nome}{{{_rotulos(self.rotulos, valores)}}} {total:g}')
+        return linhas
+
+
+def _rotulos(nomes, valores):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in zip(nomes, valores))
+
+
+class Instrumentation:
+    """
+    Extensão que mede cada requisição (before_request/after_request) e cada comando
+    SQL (eventos do engine) e mantém as métricas agregadas em memória, por processo.
+
+    METRICS_ENABLED           liga/desliga a coleta
+    METRICS_SERVER_TIMING     adiciona o cabeçalho Server-Timing às respostas
+    METRICS_QUERY_BUDGET      registra no log as requisições com mais consultas SQL que isso (0 desativa)
+    METRICS_TOKEN             se definido, /metrics exige 'Authorization: Bearer <token>'
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.duracao = Histogram(
+            'svca_http_request_duration_seconds', 'Latência das requisições por endpoint.',
+            ('method', 'endpoint'), LATENCY_BUCKETS,
+        )
+        self.requisicoes = Counter(
+            'svca_http_requests_total', 'Requisições atendidas por endpoint e status.',
+            ('method', 'endpoint', 'status'),
+        )
+        self.consultas = Histogram(
+            'svca_http_sql_queries', 'Comandos SQL executados por requisição.',
+            ('method', 'endpoint'), QUERY_COUNT_BUCKETS,
+        )
+        self.tempo_banco = Counter(
+            'svca_http_sql_duration_seconds_total', 'Tempo total gasto em comandos SQL por endpoint.',
+            ('method', 'endpoint'),
+        )
+        self.tamanho = Histogram(
+            'svca_http_response_size_bytes', 'Tamanho do corpo das respostas por endpoint.',
+            ('method', 'endpoint'), SIZE_BUCKETS,
+        )
+        self.acima_do_orcamento = Counter(
+            'svca_http_query_budget_exceeded_total', 'Requisições acima de METRICS_QUERY_BUDGET consultas SQL.',
+            ('method', 'endpoint'),
+        )
+        self.envio_email = Histogram(
+            'svca_mail_send_duration_seconds', 'Tempo de envio de cada e-mail pelo SMTP.',
+            ('resultado',), LATENCY_BUCKETS,
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_SERVER_TIMING', True)
+        app.config.setdefault('METRICS_QUERY_BUDGET', 30)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.extensions['instrumentation'] = self
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _antes_do_sql)
+        event.listen(engine, 'after_cursor_execute', _depois_do_sql)
+
+        @app.before_request
+        def _iniciar_medicao():
+            if app.config['METRICS_ENABLED']:
+                g.svca_metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'banco': 0.0, 'email': 0.0}
+
+        @app.after_request
+        def _registrar_medicao(response):
+            medicao = g.pop('svca_metricas', None)
+            if medicao is None:
+                return response
+            self._registrar(app, medicao, response)
+            return response
+
+    def _registrar(self, app, medicao, response):
+        duracao = time.perf_counter() - medicao['inicio']
+        # Agrupa pela regra da rota (e não pela URL) para não criar uma série por ID
+        endpoint = request.endpoint or 'sem_rota'
+        rotulos = (request.method, endpoint)
+        tamanho = response.calculate_content_length()
+        orcamento = app.config['METRICS_QUERY_BUDGET']
+        acima = bool(orcamento) and medicao['consultas'] > orcamento
+
+        with self._lock:
+            self.duracao.observe(rotulos, duracao)
+            self.requisicoes.inc(rotulos + (response.status_code,))
+            self.consultas.observe(rotulos, medicao['consultas'])
+            self.tempo_banco.inc(rotulos, medicao['banco'])
+            if tamanho is not None:
+                self.tamanho.observe(rotulos, tamanho)
+            if acima:
+                self.acima_do_orcamento.inc(rotulos)
+
+        if acima:
+            print(
+                f"AVISO: {request.method} {request.full_path.rstrip('?')} executou {medicao['consultas']} "
+                f"consultas SQL (orçamento: {orcamento}); possível N+1."
+            )
+        if app.config['METRICS_SERVER_TIMING']:
+            partes = [
+                f'app;dur={duracao * 1000:.1f}',
+                f'db;dur={medicao["banco"] * 1000:.1f};desc="{medicao["consultas"]} consultas"',
+            ]
+            if medicao['email']:
+                partes.append(f'mail;dur={medicao["email"] * 1000:.1f}')
+            response.headers['Server-Timing'] = ', '.join(partes)
+
+    def observe_mail_send(self, segundos, sucesso):
+        with self._lock:
+            self.envio_email.observe(('enviado' if sucesso else 'falhou',), segundos)
+
+    def render(self):
+        """
+        Todas as métricas no formato texto do Prometheus (versão 0.0.4).
+        """
+        with self._lock:
+            linhas = []
+            for metrica in (self.duracao, self.requisicoes, self.consultas, self.tempo_banco,
+                            self.tamanho, self.acima_do_orcamento, self.envio_email):
+                linhas.extend(metrica.render())
+
+        limiter = current_app.extensions.get('rate_limiter')
+        if limiter is not None:
+            # Requisições aceitas e rejeitadas pelo limite de tentativas (ver app/rate_limit.py)
+            linhas.append('# HELP svca_rate_limit_requests_total Requisições avaliadas pelo limite de tentativas.')
+            linhas.append('# TYPE svca_rate_limit_requests_total counter')
+            for regra, metricas in sorted(limiter.stats().items()):
+                linhas.append(
+                    f'svca_rate_limit_requests_total{{{_rotulos(("regra", "resultado", "balde"), (regra, "permitida", ""))}}} '
+                    f'{metricas["permitidas"]}'
+                )
+                for balde, total in sorted(metricas['rejeitadas_por'].items()):
+                    linhas.append(
+                        f'svca_rate_limit_requests_total{{{_rotulos(("regra", "resultado", "balde"), (regra, "rejeitada", balde))}}} '
+                        f'{total}'
+                    )
+        return '\n'.join(linhas) + '\n'
+
+
+def _medicao_atual():
+    if has_request_context():
+        return g.get('svca_metricas')
+    return None
+
+
+def _antes_do_sql(conn, cursor, statement, parameters, context, executemany):
+    context._svca_inicio = time.perf_counter()
+
+
+def _depois_do_sql(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_svca_inicio', None)
+    medicao = _medicao_atual()
+    if medicao is not None and inicio is not None:
+        medicao['consultas'] += 1
+        medicao['banco'] += time.perf_counter() - inicio
+
+
+def observe_mail_send(segundos, sucesso):
+    """
+    Registra o tempo de envio de um e-mail (no worker da fila ou na própria requisição).
+    """
+    medicao = _medicao_atual()
+    if medicao is not None:
+        medicao['email'] += segundos
+    if has_app_context():
+        instrumentation = current_app.extensions.get('instrumentation')
+        if instrumentation is not None:
+            instrumentation.observe_mail_send(segundos, sucesso)
+
+
+def get_instrumentation():
+    return current_app.extensions['instrumentation']
+
+
+def metrics_response():
+    """
+    Resposta de /metrics, com o token de METRICS_TOKEN verificado quando configurado.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Não autorizado.\n', status=401, mimetype='text/plain')
+    return Response(get_instrumentation().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
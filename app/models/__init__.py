@@ -11,4 +11,5 @@ from .notificacao import Notificacao
 from .coordenada import Coordenada
 from .ponto_monitoramento import PontoMonitoramento # <-- Certifique-se que esta linha existe
 from .tipo_pontuacao import TipoPontuacao # <-- Verifique se esta linha está descomentada e o arquivo existe
-
+from .fila_email import FilaEmail
+from .historico_pontuacao import HistoricoPontuacao
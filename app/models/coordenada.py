@@ -14,5 +14,10 @@ class Coordenada(db.Model):
     # A linha 'coordenada = db.relationship('Coordenada', backref='pontos_monitoramento', lazy=True)'
     # em PontoMonitoramento já cria o backref 'pontos_monitoramento' aqui.
 
+    __table_args__ = (
+        # Busca por área (bbox) nos bancos sem o R*Tree do SQLite (ver app/spatial.py)
+        db.Index('ix_coordenada_latitude_longitude', 'latitude', 'longitude'),
+    )
+
     def __repr__(self):
         return f"<Coordenada Lat: {self.latitude}, Lon: {self.longitude}>"
\ No newline at end of file
@@ -0,0 +1,43 @@
+# SVCA/app/models/fila_email.py
+from .. import db
+from datetime import datetime
+
+class FilaEmail(db.Model):
+    """
+        E-mail aguardando envio pela fila assíncrona (ver app/mail_queue.py).
+    """
+    __tablename__ = 'fila_email'
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_ENVIANDO = 'enviando'
+    STATUS_ENVIADO = 'enviado'
+    STATUS_FALHOU = 'falhou'
+
+    id = db.Column(db.Integer, primary_key=True)
+    destinatario = db.Column(db.String(255), nullable=False)
+    assunto = db.Column(db.String(255), nullable=False)
+    corpo = db.Column(db.Text, nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDENTE)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    ultimo_erro = db.Column(db.Text)
+    chave_dedup = db.Column(db.String(255), index=True)
+
+    # Reserva feita por um worker; reservas antigas são liberadas se o worker morrer
+    reservado_por = db.Column(db.String(32))
+    reservado_em = db.Column(db.DateTime)
+
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    enviado_em = db.Column(db.DateTime)
+
+    # Notificação do histórico da ocorrência atualizada quando o envio é confirmado
+    notificacao_id = db.Column(db.Integer, db.ForeignKey('notificacao.id', ondelete='SET NULL'), index=True)
+    notificacao = db.relationship('Notificacao', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_fila_email_status_proxima_tentativa', 'status', 'proxima_tentativa'),
+    )
+
+    def __repr__(self):
+        return f"<FilaEmail {self.assunto[:20]}... para {self.destinatario} ({self.status})>"
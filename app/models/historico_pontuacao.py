@@ -0,0 +1,20 @@
+# SVCA/app/models/historico_pontuacao.py
+from .. import db
+from datetime import datetime
+
+class HistoricoPontuacao(db.Model):
+    """
+        Registro de cada alteração de pontos de um usuário.
+        Permite calcular rankings por período sem varrer a tabela usuario.
+    """
+    __tablename__ = 'historico_pontuacao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'), nullable=False, index=True)
+    ocorrencia_id = db.Column(db.Integer, db.ForeignKey('ocorrencia.id', ondelete='SET NULL'), index=True)
+    tipo_pontuacao_id = db.Column(db.Integer, db.ForeignKey('tipo_pontuacao.id')) # Nulo para ajustes manuais do administrador
+    delta = db.Column(db.Integer, nullable=False)
+    criado_em = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+
+    def __repr__(self):
+        return f"<HistoricoPontuacao usuario={self.usuario_id} delta={self.delta}>"
@@ -3,12 +3,41 @@ from .. import db # Importa db de SVCA/app/__init__.py
 
 class Imagem(db.Model):
     __tablename__ = 'imagem'
+
+    # Estados do processamento em segundo plano (ver app/images.py)
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PRONTA = 'pronta'
+    STATUS_FALHOU = 'falhou'
+
     id = db.Column(db.Integer, primary_key=True)
     url = db.Column(db.String(255), nullable=False)
 
+    # Versões reduzidas geradas pelo pipeline; nulas em imagens antigas (usa-se url)
+    url_thumbnail = db.Column(db.String(255))
+    url_media = db.Column(db.String(255))
+    largura = db.Column(db.Integer)
+    altura = db.Column(db.Integer)
+
+    # SHA-256 do arquivo enviado: nome base dos arquivos gerados, compartilhados entre
+    # imagens de mesmo conteúdo (os arquivos só são apagados sem nenhuma referência)
+    nome_arquivo = db.Column(db.String(64), index=True)
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PRONTA, server_default=STATUS_PRONTA)
+    erro = db.Column(db.String(255))
+
     # Chave estrangeira para Ocorrencia
-    ocorrencia_id = db.Column(db.Integer, db.ForeignKey('ocorrencia.id'), nullable=False)
+    ocorrencia_id = db.Column(db.Integer, db.ForeignKey('ocorrencia.id'), nullable=False, index=True)
     # Relacionamento: Uma Imagem pertence a uma Ocorrencia (backref já definido em Ocorrencia)
 
+    def url_para(self, versao):
+        """
+            URL da versão pedida ('thumbnail', 'media' ou 'original'),
+            caindo para a imagem original quando a versão não existe.
+        """
+        if versao == 'thumbnail' and self.url_thumbnail:
+            return self.url_thumbnail
+        if versao == 'media' and self.url_media:
+            return self.url_media
+        return self.url
+
     def __repr__(self):
-        return f"<Imagem {self.url}>"
\ No newline at end of file
+        return f"<Imagem {self.url}>"
@@ -0,0 +1,18 @@
+# SVCA/app/models/limite_requisicao.py
+from .. import db
+
+class LimiteRequisicao(db.Model):
+    """
+        Estado de um token bucket do limite de requisições, compartilhado entre
+        processos quando RATE_LIMIT_STORAGE = 'database' (ver app/rate_limit.py).
+    """
+    __tablename__ = 'limite_requisicao'
+
+    # Regra + identificador, ex.: 'login:ip:203.0.113.7' ou 'login:email:maria@example.com'
+    chave = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    # Segundos desde a época (time.time()), o mesmo relógio em todos os processos
+    atualizado_em = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LimiteRequisicao {self.chave}: {self.tokens:.2f}>"
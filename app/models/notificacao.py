@@ -9,7 +9,7 @@ class Notificacao(db.Model):
     data_envio = db.Column(db.String(100), nullable=False, default=datetime.now().strftime("%Y-%m-%d %H:%M:%S")) # Usando string como no diagrama, mas db.DateTime é recomendado
     email_destino = db.Column(db.String(255))
 
-    ocorrencia_id = db.Column(db.Integer, db.ForeignKey('ocorrencia.id'), nullable=False)
+    ocorrencia_id = db.Column(db.Integer, db.ForeignKey('ocorrencia.id'), nullable=False, index=True)
 
     def __repr__(self):
         return f"<Notificacao '{self.mensagem[:20]}...' para {self.email_destino}>"
\ No newline at end of file
@@ -11,7 +11,17 @@ from datetime import datetime
 # Certifique-se de que está definida onde é necessária ou em um arquivo compartilhado.
 ocorrencia_ponto_monitoramento = db.Table('ocorrencia_ponto_monitoramento',
     db.Column('ocorrencia_id', db.Integer, db.ForeignKey('ocorrencia.id'), primary_key=True),
-    db.Column('ponto_monitoramento_id', db.Integer, db.ForeignKey('ponto_monitoramento.id'), primary_key=True)
+    db.Column('ponto_monitoramento_id', db.Integer, db.ForeignKey('ponto_monitoramento.id'), primary_key=True),
+    # A chave primária cobre buscas por ocorrencia_id; este índice cobre o sentido inverso
+    db.Index('ix_ocorrencia_ponto_monitoramento_ponto_id', 'ponto_monitoramento_id')
+)
+
+# Relatos registrados como duplicata de uma ocorrência aberta próxima (ver app/duplicates.py)
+ocorrencia_duplicata = db.Table('ocorrencia_duplicata',
+    db.Column('ocorrencia_id', db.Integer, db.ForeignKey('ocorrencia.id'), primary_key=True),
+    db.Column('original_id', db.Integer, db.ForeignKey('ocorrencia.id'), primary_key=True),
+    # A chave primária cobre buscas pelo relato; este índice cobre as duplicatas de uma ocorrência
+    db.Index('ix_ocorrencia_duplicata_original_id', 'original_id')
 )
 
 class StatusOcorrencia(db.Model):
@@ -38,14 +48,16 @@ class Ocorrencia(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(255), nullable=False)
     descricao = db.Column(db.Text, nullable=False)
-    data_registro = db.Column(db.Date, nullable=False, default=datetime.now().date())
-    data_finalizacao = db.Column(db.Date)
+    # active_history: o valor anterior é carregado ao alterar status/órgão/datas/coordenada de uma
+    # ocorrência expirada (ex.: após um commit), para o resumo e os tiles (ver app/analytics.py)
+    data_registro = db.column_property(db.Column(db.Date, nullable=False, default=datetime.now().date(), index=True), active_history=True) # Ordenação das listagens
+    data_finalizacao = db.column_property(db.Column(db.Date), active_history=True)
     endereco = db.Column(db.String(255))
 
-    status_id = db.Column(db.Integer, db.ForeignKey('status_ocorrencia.id'), nullable=False)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
-    orgao_responsavel_id = db.Column(db.Integer, db.ForeignKey('orgao_responsavel.id')) # Adicione a classe OrgaoResponsavel
-    coordenada_id = db.Column(db.Integer, db.ForeignKey('coordenada.id')) # Adicione a classe Coordenada
+    status_id = db.column_property(db.Column(db.Integer, db.ForeignKey('status_ocorrencia.id'), nullable=False), active_history=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, index=True)
+    orgao_responsavel_id = db.column_property(db.Column(db.Integer, db.ForeignKey('orgao_responsavel.id'), index=True), active_history=True) # Adicione a classe OrgaoResponsavel
+    coordenada_id = db.column_property(db.Column(db.Integer, db.ForeignKey('coordenada.id'), index=True), active_history=True) # Indexado para as consultas espaciais (ver app/spatial.py)
     tipo_pontuacao_id = db.Column(db.Integer, db.ForeignKey('tipo_pontuacao.id')) # Adicione a classe TipoPontuacao
     
     justificativa_recusa = db.Column(db.Text) # *** NOVO CAMPO ***
@@ -56,6 +68,21 @@ class Ocorrencia(db.Model):
     imagens = db.relationship('Imagem', backref='ocorrencia', lazy=True, cascade="all, delete-orphan") # Adicione a classe Imagem
     historico_notificacoes = db.relationship('Notificacao', backref='ocorrencia_historico', lazy=True, cascade="all, delete-orphan") # Adicione a classe Notificacao
     pontos_monitoramento = db.relationship('PontoMonitoramento', secondary=ocorrencia_ponto_monitoramento, back_populates='ocorrencias', lazy=True) # Adicione a classe PontoMonitoramento
+    # Ocorrência original de um relato duplicado e, no sentido inverso, os relatos ligados a ela
+    duplicata_de = db.relationship(
+        'Ocorrencia',
+        secondary=ocorrencia_duplicata,
+        primaryjoin='Ocorrencia.id == ocorrencia_duplicata.c.ocorrencia_id',
+        secondaryjoin='Ocorrencia.id == ocorrencia_duplicata.c.original_id',
+        backref=db.backref('duplicatas', lazy=True),
+        lazy=True
+    )
+
+    __table_args__ = (
+        # Filtro por status com ordenação por data: mapa de ocorrências ativas e lista do moderador.
+        # Também atende buscas só por status_id (prefixo do índice).
+        db.Index('ix_ocorrencia_status_data_registro', 'status_id', 'data_registro'),
+    )
 
     def __repr__(self):
         return f"<Ocorrencia {self.titulo} - Status: {self.status_ocorrencia.nome if self.status_ocorrencia else 'N/A'}>"
\ No newline at end of file
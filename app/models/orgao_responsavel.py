@@ -6,7 +6,7 @@ class OrgaoResponsavel(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(255), nullable=False)
-    email = db.Column(db.String(255), nullable=False)
+    email = db.Column(db.String(255), nullable=False, index=True) # Verificação de e-mail duplicado no cadastro
     telefone = db.Column(db.String(255), nullable=False)
 
     # Relacionamento: Um OrgaoResponsavel pode ter várias Ocorrências
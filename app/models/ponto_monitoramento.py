@@ -8,7 +8,7 @@ class PontoMonitoramento(db.Model):
     endereco = db.Column(db.String(255))
     status = db.Column(db.Boolean, nullable=False)
 
-    coordenada_id = db.Column(db.Integer, db.ForeignKey('coordenada.id'))
+    coordenada_id = db.Column(db.Integer, db.ForeignKey('coordenada.id'), index=True)
     # Relacionamento: Um PontoMonitoramento tem uma Coordenada
     coordenada = db.relationship('Coordenada', backref='pontos_monitoramento', lazy=True)
 
@@ -0,0 +1,27 @@
+# SVCA/app/models/pontuacao_periodo.py
+from .. import db
+
+class PontuacaoPeriodo(db.Model):
+    """
+        Soma dos pontos de um usuário em uma semana ou mês, mantida a cada lançamento
+        no histórico (ver app/scoring.py). O ranking do período lê só as k primeiras linhas.
+    """
+    __tablename__ = 'pontuacao_periodo'
+
+    PERIODO_SEMANA = 'semana'
+    PERIODO_MES = 'mes'
+
+    periodo = db.Column(db.String(10), primary_key=True)
+    # Segunda-feira da semana ou dia 1 do mês
+    inicio = db.Column(db.Date, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id', ondelete='CASCADE'), primary_key=True)
+    pontos = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Ranking do período lido de trás para frente no índice (pontos e ID decrescentes), sem ordenação
+        db.Index('ix_pontuacao_periodo_ranking', 'periodo', 'inicio', 'pontos', 'usuario_id'),
+        db.Index('ix_pontuacao_periodo_usuario_id', 'usuario_id'),
+    )
+
+    def __repr__(self):
+        return f"<PontuacaoPeriodo {self.periodo} {self.inicio} usuario={self.usuario_id}: {self.pontos}>"
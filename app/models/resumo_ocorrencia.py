@@ -0,0 +1,26 @@
+# SVCA/app/models/resumo_ocorrencia.py
+from .. import db
+
+class ResumoOcorrencia(db.Model):
+    """
+        Contagens de ocorrências por status em cada dimensão dos painéis (total, órgão,
+        semana de registro e célula do mapa), mantidas a cada flush (ver app/analytics.py).
+    """
+    __tablename__ = 'resumo_ocorrencia'
+
+    DIMENSAO_TOTAL = 'total'
+    DIMENSAO_ORGAO = 'orgao'
+    DIMENSAO_SEMANA = 'semana'
+    DIMENSAO_CELULA = 'celula'
+
+    dimensao = db.Column(db.String(10), primary_key=True)
+    # '' (total ou sem órgão), ID do órgão, segunda-feira da semana (ISO) ou 'i:j' da célula
+    chave = db.Column(db.String(32), primary_key=True)
+    status_id = db.Column(db.Integer, db.ForeignKey('status_ocorrencia.id'), primary_key=True)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    # Ocorrências com data_finalizacao e a soma dos dias entre registro e finalização
+    finalizadas = db.Column(db.Integer, nullable=False, default=0)
+    dias_ate_finalizacao = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResumoOcorrencia {self.dimensao}={self.chave} status={self.status_id}: {self.quantidade}>"
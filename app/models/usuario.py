@@ -1,7 +1,7 @@
 # SVCA/app/models/usuario.py
 # Importa a instância 'db' do arquivo principal 'run.py'
 from .. import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from ..passwords import get_password_hasher
 
 class Usuario(db.Model):
     """
@@ -14,11 +14,11 @@ class Usuario(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     telefone = db.Column(db.String(255))
     senha = db.Column(db.String(255), nullable=False)
-    perfil_id = db.Column(db.Integer, db.ForeignKey('perfil.id'), nullable=False)
+    perfil_id = db.Column(db.Integer, db.ForeignKey('perfil.id'), nullable=False, index=True)
     avatar_url = db.Column(db.String(255), default='/avatar.svg')
     ocorrencias_recusadas_count = db.Column(db.Integer, default=0, nullable=False) # *** NOVO CAMPO ***
     is_blocked = db.Column(db.Boolean, default=False, nullable=False) # *** NOVO CAMPO ***
-    pontos = db.Column(db.Integer, default=0, nullable=False) # *** NOVO CAMPO PARA PONTUAÇÃO ***
+    pontos = db.Column(db.Integer, default=0, nullable=False, index=True) # Indexado para o ranking por pontuação total
 
     #Relationship
     ocorrencias = db.relationship('Ocorrencia', backref='usuario', lazy=True)
@@ -27,26 +27,40 @@ class Usuario(db.Model):
     def autenticar(self, senha_digitada):
         """
         Autentica o usuário comparando a senha digitada com a senha hashada armazenada.
+        Se o hash foi gerado com outra política (algoritmo ou custo), ele é refeito
+        com a política atual, aproveitando a senha em texto puro já verificada.
         """
-        # check_password_hash compara a senha hashada (self.senha) com a senha em texto puro digitada
-        return check_password_hash(self.senha, senha_digitada)
+        hasher = get_password_hasher()
+        if not hasher.verify(self.senha, senha_digitada):
+            return False
+        if hasher.needs_rehash(self.senha):
+            try:
+                self.senha = hasher.hash(senha_digitada)
+                db.session.commit()
+            except Exception as e:
+                # O login continua válido com o hash antigo; tenta de novo no próximo login
+                db.session.rollback()
+                print(f"Erro ao atualizar o hash da senha do usuário {self.id}: {e}")
+        return True
 
     # --- MÉTODO REDEFINIR SENHA ATUALIZADO ---
     def redefinir_senha(self, nova_senha):
         """
         Redefine a senha do usuário, armazenando-a como um hash.
         """
-        self.senha = generate_password_hash(nova_senha)
+        self.senha = get_password_hasher().hash(nova_senha)
         db.session.add(self)
         db.session.commit()
 
     @classmethod
-    def criar(cls, nome, email, telefone, senha_plana, perfil_id):
+    def criar(cls, nome, email, telefone, senha_plana, perfil_id, senha_hash=None):
         """
         Cria um novo usuário e o salva no banco de dados, hasheando a senha.
+        senha_hash permite informar um hash já calculado (ex.: em lote no seed-db).
         """
         # Hasheia a senha antes de criar o usuário
-        senha_hash = generate_password_hash(senha_plana)
+        if senha_hash is None:
+            senha_hash = get_password_hasher().hash(senha_plana)
 
         novo_usuario = cls(
             nome=nome,
@@ -0,0 +1,223 @@
+# SVCA/app/moderation.py
+# Moderação em lote: aplica mudanças de status/órgão a muitas ocorrências em uma única
+# transação, com as mesmas regras de pontos e bloqueio de PUT /occurrence/<id>.
+from datetime import datetime
+
+from . import db
+from .identity import invalidate_identity
+from .lookups import get_lookups
+from .mail_queue import enqueue_emails
+from .models.ocorrencia import Ocorrencia
+from .models.orgao_responsavel import OrgaoResponsavel
+from .models.usuario import Usuario
+from .scoring import add_points_many, status_transition_points
+
+# Máximo de ocorrências por requisição de moderação em lote
+BULK_MAX_OCCURRENCES = 500
+
+# Recusas acumuladas que bloqueiam o autor automaticamente
+RECUSAS_PARA_BLOQUEIO = 3
+
+
+class BulkModerationError(ValueError):
+    """
+    Lote inválido; nenhuma ocorrência foi alterada.
+    """
+
+
+def _parse_changes(data):
+    """
+    Aceita {"changes": [{"id", "status_id", "orgao_responsavel_id", "justificativa_recusa"}, ...]}
+    ou a forma resumida {"ids": [...], "status_id": ..., ...} com os mesmos campos para todas.
+    """
+    if not isinstance(data, dict):
+        raise BulkModerationError('Corpo da requisição inválido.')
+    if 'changes' in data:
+        changes = data['changes']
+    elif 'ids' in data:
+        # Uma string ou um objeto seriam percorridos caractere a caractere / chave a chave
+        if not isinstance(data['ids'], list):
+            raise BulkModerationError("'ids' deve ser uma lista de ids de ocorrências.")
+        comuns = {campo: data[campo] for campo in ('status_id', 'orgao_responsavel_id', 'justificativa_recusa') if campo in data}
+        changes = [dict(comuns, id=occurrence_id) for occurrence_id in data['ids']]
+    else:
+        raise BulkModerationError("Informe 'changes' ou 'ids'.")
+
+    if not isinstance(changes, list) or not changes:
+        raise BulkModerationError('Nenhuma ocorrência informada.')
+    if len(changes) > BULK_MAX_OCCURRENCES:
+        raise BulkModerationError(f'No máximo {BULK_MAX_OCCURRENCES} ocorrências por requisição.')
+
+    lookups = get_lookups()
+    normalizadas = {}
+    for change in changes:
+        if not isinstance(change, dict):
+            raise BulkModerationError('Cada alteração deve ser um objeto.')
+        try:
+            occurrence_id = int(change['id'])
+            item = {}
+            if change.get('status_id') not in (None, ''):
+                item['status_id'] = int(change['status_id'])
+            if 'orgao_responsavel_id' in change:
+                orgao_id = change['orgao_responsavel_id']
+                item['orgao_responsavel_id'] = int(orgao_id) if orgao_id not in (None, '') else None
+        except (KeyError, TypeError, ValueError):
+            raise BulkModerationError(f'Alteração inválida: {change}.')
+        if 'status_id' in item:
+            item['status_nome'] = lookups.name_for('status', item['status_id'])
+            if not item['status_nome']:
+                raise BulkModerationError(f'Status de ocorrência inválido na ocorrência {occurrence_id}.')
+        if item.get('status_nome') == 'Recusada':
+            item['justificativa_recusa'] = change.get('justificativa_recusa')
+            if not item['justificativa_recusa']:
+                raise BulkModerationError(f'Justificativa é obrigatória para recusar a ocorrência {occurrence_id}.')
+        if occurrence_id in normalizadas:
+            raise BulkModerationError(f'Ocorrência {occurrence_id} repetida no lote.')
+        normalizadas[occurrence_id] = item
+    return normalizadas
+
+
+def _email_recusa(usuario, recusadas):
+    # Uma recusa usa o mesmo texto de PUT /occurrence/<id>; várias viram um único e-mail
+    if len(recusadas) == 1:
+        titulo, justificativa = recusadas[0]
+        assunto = f"Sua Ocorrência '{titulo}' Foi Recusada"
+        corpo = (
+            f"Prezado(a) {usuario.nome},\n\n"
+            f"Sua ocorrência '{titulo}' foi recusada.\n\n"
+            f"Justificativa: {justificativa}\n\n"
+            f"Status atual: Recusada\n\n"
+        )
+    else:
+        assunto = f"{len(recusadas)} Ocorrências Suas Foram Recusadas"
+        corpo = f"Prezado(a) {usuario.nome},\n\nAs seguintes ocorrências suas foram recusadas:\n\n"
+        for titulo, justificativa in recusadas:
+            corpo += f"- '{titulo}'\n  Justificativa: {justificativa}\n"
+        corpo += "\nStatus atual: Recusada\n\n"
+    if usuario.is_blocked:
+        corpo += (
+            f"ATENÇÃO: Sua conta foi bloqueada automaticamente devido a múltiplas ocorrências recusadas.\n"
+            f"Você acumulou {usuario.ocorrencias_recusadas_count} ocorrências recusadas.\n"
+            f"Para mais informações sobre as políticas de uso, visite o sistema.\n\n"
+        )
+    corpo += "Atenciosamente,\nSua equipe SVCA"
+    return assunto, corpo
+
+
+def apply_bulk_moderation(data):
+    """
+    Valida e aplica o lote na sessão atual, sem commit: carrega ocorrências, autores e
+    órgãos com uma consulta cada, aplica pontos e bloqueios por usuário na ordem do
+    lote e enfileira um e-mail por autor com todas as suas ocorrências recusadas.
+    Levanta BulkModerationError se qualquer item for inválido. Retorna um resumo.
+    """
+    changes = _parse_changes(data)
+    lookups = get_lookups()
+    status_recusada_id = lookups.id_for('status', 'Recusada')
+    tipo_solucionada_id = lookups.id_for('tipo_pontuacao', 'OcorrenciaSolucionada')
+
+    occurrences = {occ.id: occ for occ in Ocorrencia.query.filter(Ocorrencia.id.in_(changes))}
+    faltando = sorted(set(changes) - set(occurrences))
+    if faltando:
+        raise BulkModerationError(f"Ocorrência(s) não encontrada(s): {', '.join(map(str, faltando))}.")
+
+    orgao_ids = {item['orgao_responsavel_id'] for item in changes.values() if item.get('orgao_responsavel_id')}
+    if orgao_ids:
+        existentes = {orgao_id for (orgao_id,) in db.session.query(OrgaoResponsavel.id).filter(OrgaoResponsavel.id.in_(orgao_ids))}
+        if orgao_ids - existentes:
+            raise BulkModerationError(
+                f"Órgão(s) responsável(is) não encontrado(s): {', '.join(map(str, sorted(orgao_ids - existentes)))}."
+            )
+
+    autor_ids = {occurrences[occurrence_id].usuario_id for occurrence_id, item in changes.items() if 'status_id' in item}
+    usuarios = {usuario.id: usuario for usuario in Usuario.query.filter(Usuario.id.in_(autor_ids))} if autor_ids else {}
+
+    agora = datetime.now()
+    alteradas = 0
+    eventos_pontos = []
+    recusadas_por_usuario = {}
+    bloqueados = set()
+    desbloqueados = set()
+
+    for occurrence_id, item in changes.items():
+        occurrence = occurrences[occurrence_id]
+        old_status_id = occurrence.status_id
+        new_status_id = item.get('status_id')
+        alterada = False
+
+        if new_status_id is not None and new_status_id != old_status_id:
+            alterada = True
+            new_status_nome = item['status_nome']
+            occurrence.status_id = new_status_id
+            usuario = usuarios.get(occurrence.usuario_id)
+
+            if usuario:
+                delta, tipo_nome = status_transition_points(lookups.name_for('status', old_status_id), new_status_nome)
+                eventos_pontos.append((usuario, delta, occurrence.id, tipo_nome))
+
+            if new_status_nome == 'Fechada com solução':
+                occurrence.data_finalizacao = agora.date()
+                if tipo_solucionada_id:
+                    occurrence.tipo_pontuacao_id = tipo_solucionada_id
+                if old_status_id == status_recusada_id and usuario and usuario.ocorrencias_recusadas_count > 0:
+                    usuario.ocorrencias_recusadas_count -= 1
+                    if usuario.ocorrencias_recusadas_count < RECUSAS_PARA_BLOQUEIO and usuario.is_blocked:
+                        usuario.is_blocked = False
+                        desbloqueados.add(usuario.id)
+                        bloqueados.discard(usuario.id)
+                occurrence.justificativa_recusa = None
+
+            elif new_status_nome == 'Recusada':
+                occurrence.justificativa_recusa = item['justificativa_recusa']
+                occurrence.data_finalizacao = agora.date()
+                if usuario:
+                    usuario.ocorrencias_recusadas_count += 1
+                    if usuario.ocorrencias_recusadas_count >= RECUSAS_PARA_BLOQUEIO and not usuario.is_blocked:
+                        usuario.is_blocked = True
+                        bloqueados.add(usuario.id)
+                        desbloqueados.discard(usuario.id)
+                    recusadas_por_usuario.setdefault(usuario.id, []).append((occurrence.titulo, item['justificativa_recusa']))
+
+            elif new_status_nome == 'Em andamento':
+                occurrence.data_finalizacao = None
+                occurrence.justificativa_recusa = None
+
+            else:
+                occurrence.data_finalizacao = None
+                occurrence.justificativa_recusa = None
+                occurrence.tipo_pontuacao_id = None
+
+        if 'orgao_responsavel_id' in item and item['orgao_responsavel_id'] != occurrence.orgao_responsavel_id:
+            occurrence.orgao_responsavel_id = item['orgao_responsavel_id']
+            alterada = True
+        alteradas += alterada
+
+    # Pontos (um UPDATE atômico por autor), histórico e e-mails do lote com um executemany cada
+    add_points_many(eventos_pontos)
+    mensagens = []
+    for usuario_id, recusadas in recusadas_por_usuario.items():
+        assunto, corpo = _email_recusa(usuarios[usuario_id], recusadas)
+        mensagens.append((assunto, usuarios[usuario_id].email, corpo))
+    enqueue_emails(mensagens)
+
+    for usuario_id in bloqueados:
+        print(f"Usuário {usuarios[usuario_id].email} bloqueado por ter {usuarios[usuario_id].ocorrencias_recusadas_count} ocorrências recusadas.")
+    for usuario_id in desbloqueados:
+        print(f"Usuário {usuarios[usuario_id].email} desbloqueado após moderação em lote.")
+
+    return {
+        'ocorrencias': len(changes),
+        'alteradas': alteradas,
+        'usuarios_afetados': sorted(usuarios),
+        'usuarios_bloqueados': sorted(bloqueados),
+        'usuarios_desbloqueados': sorted(desbloqueados),
+        'emails_enfileirados': len(recusadas_por_usuario),
+    }
+
+
+def invalidate_moderated_users(resumo):
+    """
+    Descarta a identidade em cache dos autores após o commit (o bloqueio pode ter mudado).
+    """
+    for usuario_id in resumo['usuarios_afetados']:
+        invalidate_identity(usuario_id)
@@ -0,0 +1,178 @@
+# SVCA/app/monitoring.py
+# Vínculo automático entre ocorrências e pontos de monitoramento: cada ocorrência nova é
+# associada aos pontos ativos a até MONITORING_RADIUS_M metros (R*Tree + haversine), e o
+# recálculo em lote cruza ocorrências e pontos por uma grade em NumPy.
+from itertools import chain
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event
+
+from . import db
+from .models.coordenada import Coordenada
+from .models.ocorrencia import Ocorrencia, ocorrencia_ponto_monitoramento
+from .models.ponto_monitoramento import PontoMonitoramento
+from .spatial import active_points_filter
+
+RAIO_PADRAO_M = 500
+RAIO_TERRA_M = 6_371_000
+METROS_POR_GRAU = 111_320
+
+
+def monitoring_radius():
+    return current_app.config.get('MONITORING_RADIUS_M', RAIO_PADRAO_M)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Distância em metros pela fórmula de haversine; aceita números ou arrays NumPy.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(valor) for valor in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _bbox(latitude, longitude, raio_m):
+    delta_lat = raio_m / METROS_POR_GRAU
+    delta_lon = raio_m / (METROS_POR_GRAU * max(0.01, np.cos(np.radians(latitude))))
+    return (max(-180.0, longitude - delta_lon), max(-90.0, latitude - delta_lat),
+            min(180.0, longitude + delta_lon), min(90.0, latitude + delta_lat))
+
+
+def nearby_points(session, latitude, longitude, raio_m=None):
+    """
+    Pontos de monitoramento ativos a até 'raio_m' metros (padrão: MONITORING_RADIUS_M)
+    da posição: o retângulo sai do R*Tree de pontos e a distância exata é conferida aqui.
+    """
+    raio_m = raio_m or monitoring_radius()
+    linhas = session.execute(
+        db.select(PontoMonitoramento, Coordenada.latitude, Coordenada.longitude)
+        .join(Coordenada, PontoMonitoramento.coordenada_id == Coordenada.id)
+        .where(active_points_filter(_bbox(latitude, longitude, raio_m)), PontoMonitoramento.status.is_(True))
+    ).all()
+    return [ponto for ponto, lat, lon in linhas if haversine_m(latitude, longitude, lat, lon) <= raio_m]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _vincular_pontos(session, flush_context, instances):
+    """
+    Associa as ocorrências novas deste flush aos pontos ativos próximos, na mesma
+    transação. Cargas feitas fora do ORM usam rebuild_monitoring_links().
+    """
+    novas = [occ for occ in session.new if isinstance(occ, Ocorrencia)]
+    if not novas:
+        return
+
+    # Coordenada já carregada na sessão ou, senão, lida pelo id (uma consulta para o flush)
+    posicoes = {}
+    pendentes = set()
+    for occ in novas:
+        coordenada = occ.__dict__.get('coordenada')
+        if coordenada is not None:
+            posicoes[id(occ)] = (coordenada.latitude, coordenada.longitude)
+        elif occ.coordenada_id:
+            pendentes.add(occ.coordenada_id)
+    coordenadas = {}
+    if pendentes:
+        coordenadas = {linha.id: (linha.latitude, linha.longitude) for linha in session.execute(
+            db.select(Coordenada.id, Coordenada.latitude, Coordenada.longitude).where(Coordenada.id.in_(pendentes))
+        )}
+
+    for occ in novas:
+        posicao = posicoes.get(id(occ)) or coordenadas.get(occ.coordenada_id)
+        if posicao is None:
+            continue
+        vinculados = set(occ.pontos_monitoramento)
+        occ.pontos_monitoramento.extend(
+            ponto for ponto in nearby_points(session, *posicao) if ponto not in vinculados
+        )
+
+
+def _chaves_grade(latitudes, longitudes, celula_lat, celula_lon):
+    # Célula (coluna, linha) da grade em um único int64
+    coluna = np.floor(longitudes / celula_lon).astype(np.int64)
+    linha = np.floor(latitudes / celula_lat).astype(np.int64)
+    return (coluna << 32) + linha
+
+
+def match_points(latitudes, longitudes, pontos, raio_m):
+    """
+    Pares (índice da ocorrência, índice do ponto) a até 'raio_m' metros, para arrays de
+    posições de ocorrências e 'pontos' = (ids, latitudes, longitudes, grade). Cada
+    ocorrência só é comparada aos pontos das 9 células vizinhas da grade.
+    """
+    _, pontos_lat, pontos_lon, (chaves_ordenadas, ordem, celula_lat, celula_lon) = pontos
+    indices_ocorrencia, indices_ponto = [], []
+    for d_lon in (-1, 0, 1):
+        for d_lat in (-1, 0, 1):
+            chaves = _chaves_grade(latitudes + d_lat * celula_lat, longitudes + d_lon * celula_lon, celula_lat, celula_lon)
+            inicio = np.searchsorted(chaves_ordenadas, chaves, side='left')
+            quantidade = np.searchsorted(chaves_ordenadas, chaves, side='right') - inicio
+            total = int(quantidade.sum())
+            if not total:
+                continue
+            # Expande cada ocorrência nos pontos da célula: posições inicio..inicio+quantidade-1 da ordem
+            ocorrencia = np.repeat(np.arange(len(chaves)), quantidade)
+            deslocamento = np.arange(total) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+            indices_ocorrencia.append(ocorrencia)
+            indices_ponto.append(ordem[np.repeat(inicio, quantidade) + deslocamento])
+    if not indices_ocorrencia:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ocorrencia, ponto = np.concatenate(indices_ocorrencia), np.concatenate(indices_ponto)
+    perto = haversine_m(latitudes[ocorrencia], longitudes[ocorrencia], pontos_lat[ponto], pontos_lon[ponto]) <= raio_m
+    return ocorrencia[perto], ponto[perto]
+
+
+def _grade_de_pontos(connection, raio_m):
+    linhas = connection.execute(
+        db.select(PontoMonitoramento.id, Coordenada.latitude, Coordenada.longitude)
+        .join(Coordenada, PontoMonitoramento.coordenada_id == Coordenada.id)
+        .where(PontoMonitoramento.status.is_(True))
+    ).all()
+    if not linhas:
+        return None
+    ids = np.array([linha[0] for linha in linhas], dtype=np.int64)
+    latitudes = np.array([linha[1] for linha in linhas], dtype=np.float64)
+    longitudes = np.array([linha[2] for linha in linhas], dtype=np.float64)
+    # Células com lado >= raio nos dois eixos: qualquer ponto no raio está nas 9 células vizinhas.
+    # A longitude usa o menor cosseno entre as latitudes dos pontos (célula mais larga em graus)
+    celula_lat = raio_m / METROS_POR_GRAU
+    cosseno = max(0.01, float(np.cos(np.radians(min(89.0, np.abs(latitudes).max() + celula_lat)))))
+    celula_lon = celula_lat / cosseno
+    chaves = _chaves_grade(latitudes, longitudes, celula_lat, celula_lon)
+    ordem = np.argsort(chaves, kind='stable')
+    return ids, latitudes, longitudes, (chaves[ordem], ordem, celula_lat, celula_lon)
+
+
+def rebuild_monitoring_links(batch_size=50000, raio_m=None):
+    """
+    Recalcula ocorrencia_ponto_monitoramento inteira: cada ocorrência é ligada aos pontos
+    ativos a até 'raio_m' metros (padrão: MONITORING_RADIUS_M). As ocorrências são lidas
+    em lotes e cruzadas com os pontos em NumPy (ver match_points). Usado após cargas
+    feitas fora do ORM ou depois de cadastrar, mover ou ativar pontos. Retorna o número
+    de vínculos gravados.
+    """
+    raio_m = raio_m or monitoring_radius()
+    gravados = 0
+    with db.engine.begin() as connection:
+        connection.execute(ocorrencia_ponto_monitoramento.delete())
+        pontos = _grade_de_pontos(connection, raio_m)
+        if pontos is None:
+            return 0
+        # Opção só desta consulta: execution_options() na conexão valeria também para os INSERTs
+        resultado = connection.execute(
+            db.select(Ocorrencia.id, Coordenada.latitude, Coordenada.longitude)
+            .join(Coordenada, Ocorrencia.coordenada_id == Coordenada.id),
+            execution_options={'yield_per': batch_size},
+        )
+        for lote in resultado.partitions():
+            valores = np.fromiter(chain.from_iterable(lote), dtype=np.float64, count=3 * len(lote)).reshape(-1, 3)
+            ocorrencia, ponto = match_points(valores[:, 1], valores[:, 2], pontos, raio_m)
+            if not len(ocorrencia):
+                continue
+            connection.execute(ocorrencia_ponto_monitoramento.insert(), [
+                {'ocorrencia_id': ocorrencia_id, 'ponto_monitoramento_id': ponto_id}
+                for ocorrencia_id, ponto_id in zip(valores[ocorrencia, 0].astype(np.int64).tolist(), pontos[0][ponto].tolist())
+            ])
+            gravados += len(ocorrencia)
+    return gravados
@@ -0,0 +1,113 @@
+# SVCA/app/pagination.py
+# Paginação por cursor (keyset) compartilhada pelas listagens da API.
+import base64
+from datetime import date
+
+from . import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value):
+    """
+    Converte o parâmetro 'limit' da query string, aplicando o padrão e o máximo.
+    Lança ValueError se o valor não for um inteiro positivo.
+    """
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit deve ser maior que zero.')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(data_registro, item_id):
+    """
+    Gera um cursor opaco a partir da chave (data_registro, id) do último item da página.
+    """
+    raw = f"{data_registro.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor. Lança ValueError se for inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        data_str, id_str = raw.split('|', 1)
+        return date.fromisoformat(data_str), int(id_str)
+    except Exception:
+        raise ValueError('Cursor inválido.')
+
+
+def encode_rank_cursor(rank, item_id):
+    """
+    Gera um cursor opaco a partir da chave (rank, id) do último item de uma página
+    ordenada por relevância.
+    """
+    raw = f"rank|{rank!r}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_rank_cursor. Lança ValueError se for inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        prefixo, rank_str, id_str = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if prefixo != 'rank':
+            raise ValueError
+        return float(rank_str), int(id_str)
+    except Exception:
+        raise ValueError('Cursor inválido.')
+
+
+def keyset_page(query, date_column, id_column, cursor, limit):
+    """
+    Aplica a paginação keyset em ordem decrescente de (date_column, id_column).
+
+    Retorna a lista de itens da página e o cursor da próxima página (ou None).
+    """
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            date_column < cursor_date,
+            db.and_(date_column == cursor_date, id_column < cursor_id)
+        ))
+
+    items = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+    return items, next_cursor
+
+
+def ranked_page(query, rank_column, id_column, cursor, limit):
+    """
+    Aplica a paginação keyset em ordem de relevância: rank_column crescente (bm25 do
+    FTS5, menor é mais relevante) e, no empate, id_column decrescente.
+
+    Retorna a lista de itens da página e o cursor da próxima página (ou None).
+    """
+    if cursor:
+        cursor_rank, cursor_id = decode_rank_cursor(cursor)
+        query = query.filter(db.or_(
+            rank_column > cursor_rank,
+            db.and_(rank_column == cursor_rank, id_column < cursor_id)
+        ))
+
+    rows = query.add_columns(rank_column).order_by(rank_column, id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_rank = rows[-1]
+        next_cursor = encode_rank_cursor(last_rank, getattr(last, id_column.key))
+    return [item for item, _ in rows], next_cursor
@@ -0,0 +1,162 @@
+# SVCA/app/passwords.py
+# Hash de senhas com algoritmo e custo configuráveis, calculado em um pool de processos.
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Custo padrão de cada algoritmo (os mesmos padrões do werkzeug)
+DEFAULT_COSTS = {
+    'scrypt': 2 ** 15,      # parâmetro N (memória e CPU)
+    'pbkdf2': 600_000,      # iterações de SHA-256
+}
+
+
+class PasswordHashTimeout(Exception):
+    """
+    O pool de hash não respondeu no tempo configurado (servidor sobrecarregado).
+    """
+
+
+def hash_method(algorithm, cost):
+    """
+    Método no formato do werkzeug para o algoritmo e o custo informados,
+    ex.: 'scrypt:32768:8:1' ou 'pbkdf2:sha256:600000'.
+    """
+    if algorithm == 'scrypt':
+        return f'scrypt:{int(cost)}:8:1'
+    if algorithm == 'pbkdf2':
+        return f'pbkdf2:sha256:{int(cost)}'
+    raise ValueError(f"Algoritmo de hash de senha desconhecido: {algorithm}")
+
+
+def stored_method(senha_hash):
+    """
+    Método com que um hash armazenado foi gerado (parte antes do primeiro '$').
+    """
+    return (senha_hash or '').split('$', 1)[0]
+
+
+# Funções executadas nos processos do pool (precisam ser importáveis no nível do módulo)
+def _generate(senha, method):
+    return generate_password_hash(senha, method=method)
+
+
+def _check(senha_hash, senha):
+    return check_password_hash(senha_hash, senha)
+
+
+class PasswordHasher:
+    """
+    Extensão que calcula e verifica hashes de senha fora da thread da requisição.
+
+    O hash é CPU-bound de propósito; com vários logins simultâneos, calculá-lo na
+    própria thread ocupa todos os workers. Aqui ele roda em um pool limitado de
+    processos (PASSWORD_HASH_WORKERS), e a requisição apenas espera o resultado.
+    Com PASSWORD_HASH_ASYNC = False o cálculo ocorre na própria thread.
+
+    PASSWORD_HASH_ALGORITHM ('scrypt' ou 'pbkdf2') e PASSWORD_HASH_COST definem a
+    política atual; hashes gerados com outra política são refeitos no próximo login.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_ALGORITHM', 'scrypt')
+        app.config.setdefault('PASSWORD_HASH_COST', None)  # None usa DEFAULT_COSTS
+        app.config.setdefault('PASSWORD_HASH_ASYNC', True)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', min(4, multiprocessing.cpu_count()))
+        # Segundos que a requisição espera pelo pool antes de desistir
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+        # Valida a política já na inicialização
+        self.method_for(app)
+        app.extensions['password_hasher'] = self
+
+    @staticmethod
+    def method_for(app):
+        algorithm = app.config['PASSWORD_HASH_ALGORITHM']
+        cost = app.config['PASSWORD_HASH_COST'] or DEFAULT_COSTS.get(algorithm)
+        return hash_method(algorithm, cost)
+
+    @property
+    def method(self):
+        return self.method_for(current_app)
+
+    def _get_executor(self, app):
+        with self._lock:
+            if self._executor is None:
+                # 'spawn': o processo filho não herda as threads (fila de e-mails, imagens) do servidor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        app = current_app._get_current_object()
+        if not app.config['PASSWORD_HASH_ASYNC']:
+            return fn(*args)
+        executor = self._get_executor(app)
+        try:
+            return executor.submit(fn, *args).result(timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+        except FutureTimeoutError as e:
+            raise PasswordHashTimeout('O cálculo do hash de senha excedeu o tempo limite.') from e
+        except BrokenProcessPool:
+            # Um processo do pool morreu (ex.: falta de memória); recria o pool na próxima chamada
+            print("ERRO: pool de hash de senhas interrompido; calculando na própria requisição.")
+            self._discard_executor(executor)
+            return fn(*args)
+
+    def hash(self, senha):
+        """
+        Gera o hash da senha com a política atual.
+        """
+        return self._run(_generate, senha, self.method)
+
+    def hash_many(self, senhas):
+        """
+        Gera os hashes de várias senhas em paralelo (usado ao popular o banco).
+        """
+        app = current_app._get_current_object()
+        method = self.method
+        if not app.config['PASSWORD_HASH_ASYNC'] or len(senhas) < 2:
+            return [_generate(senha, method) for senha in senhas]
+        return list(self._get_executor(app).map(_generate, senhas, [method] * len(senhas)))
+
+    def verify(self, senha_hash, senha):
+        """
+        Verifica a senha contra o hash armazenado (qualquer política suportada pelo werkzeug).
+        """
+        if not senha_hash:
+            return False
+        return self._run(_check, senha_hash, senha)
+
+    def needs_rehash(self, senha_hash):
+        """
+        True se o hash armazenado foi gerado com algoritmo ou custo diferentes da política atual.
+        """
+        return stored_method(senha_hash) != self.method
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def get_password_hasher():
+    return current_app.extensions['password_hasher']
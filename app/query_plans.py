@@ -0,0 +1,237 @@
+# SVCA/app/query_plans.py
+# Verificação dos planos de execução: executa os endpoints de leitura, captura o SQL
+# gerado e roda EXPLAIN em cada consulta para encontrar varreduras completas de tabela.
+import re
+
+from sqlalchemy import event
+
+from . import db
+from .duplicates import nearby_open_query
+from .models.coordenada import Coordenada
+from .models.fila_email import FilaEmail
+from .models.historico_pontuacao import HistoricoPontuacao
+from .models.imagem import Imagem
+from .models.notificacao import Notificacao
+from .models.ocorrencia import Ocorrencia, ocorrencia_duplicata, ocorrencia_ponto_monitoramento
+from .models.orgao_responsavel import OrgaoResponsavel
+from .models.ponto_monitoramento import PontoMonitoramento
+from .models.usuario import Usuario
+from .search import search_index_available
+from .spatial import active_points_filter
+
+# Tabelas de referência com poucas linhas (e o catálogo do SQLite): ler a tabela inteira é o esperado
+ALLOWED_FULL_SCANS = {'status_ocorrencia', 'perfil', 'tipo_pontuacao', 'sqlite_master'}
+
+# Requisições GET executadas pela verificação; {ocorrencia_id}, {usuario_id},
+# {orgao_id}, {status_id} e {ponto_id} são preenchidos com registros existentes no banco
+ENDPOINT_REQUESTS = [
+    '/dashboard',
+    '/user-profile',
+    '/my-occurrences',
+    '/occurrences',
+    '/occurrences?status_id={status_id}',
+    '/occurrences?orgao_id={orgao_id}',
+    '/occurrences?usuario_id={usuario_id}',
+    '/occurrences?data_inicio=2000-01-01&data_fim=2100-12-31',
+    '/occurrences?search=buraco',
+    '/occurrence/{ocorrencia_id}',
+    '/view-occurrence/{ocorrencia_id}',
+    '/active-occurrences',
+    '/active-occurrences?bbox=-180,-90,180,90&zoom=5',
+    '/active-occurrences?bbox=-180,-90,180,90&zoom=18',
+    '/users?search=silva',
+    '/user/{usuario_id}',
+    '/orgaos-responsaveis?search=prefeitura',
+    '/orgao-responsavel/{orgao_id}',
+    '/perfis',
+    '/status-ocorrencias',
+    '/ranking-semanal',
+    '/ranking-semanal?periodo=total',
+    '/analytics',
+    '/analytics/public',
+    '/tiles/heatmap/14/6603/8559.json',
+    '/monitoring-points/{ponto_id}/occurrences',
+]
+
+# Listagens completas por definição (sem filtro nem paginação): a varredura é esperada
+FULL_LIST_REQUESTS = {'/users', '/orgaos-responsaveis'}
+
+
+def write_path_queries():
+    """
+    Consultas dos endpoints de escrita e dos workers, que a verificação não executa.
+    Retorna uma lista de (descrição, statement).
+    """
+    return [
+        ('POST /login, /register, /forgot-password: usuário por e-mail',
+         db.select(Usuario.id).where(Usuario.email == 'x@example.com')),
+        ('POST /orgao-responsavel: e-mail já cadastrado',
+         db.select(OrgaoResponsavel.id).where(OrgaoResponsavel.email == 'x@example.com')),
+        ('POST /register-occurrence: imagem com o mesmo conteúdo',
+         db.select(Imagem.id).where(Imagem.nome_arquivo == '0' * 64, Imagem.status == Imagem.STATUS_PRONTA)),
+        ('POST /register-occurrence: ocorrências abertas próximas (duplicatas)',
+         nearby_open_query(-8.06, -34.88)),
+        ('DELETE /occurrence: vínculos de duplicata com a ocorrência original',
+         db.select(ocorrencia_duplicata.c.ocorrencia_id).where(ocorrencia_duplicata.c.original_id == 1)),
+        ('POST /register-occurrence: pontos de monitoramento ativos próximos',
+         db.select(PontoMonitoramento.id).join(Coordenada, PontoMonitoramento.coordenada_id == Coordenada.id)
+         .where(active_points_filter((-34.89, -8.07, -34.87, -8.05)), PontoMonitoramento.status.is_(True))),
+        ('DELETE /occurrence: vínculos com pontos de monitoramento',
+         db.select(ocorrencia_ponto_monitoramento.c.ponto_monitoramento_id).where(ocorrencia_ponto_monitoramento.c.ocorrencia_id == 1)),
+        ('DELETE /occurrence: imagens da ocorrência (cascata)',
+         db.select(Imagem.id).where(Imagem.ocorrencia_id == 1)),
+        ('DELETE /occurrence: notificações da ocorrência (cascata)',
+         db.select(Notificacao.id).where(Notificacao.ocorrencia_id == 1)),
+        ('DELETE /occurrence: histórico de pontos da ocorrência (SET NULL)',
+         db.select(HistoricoPontuacao.id).where(HistoricoPontuacao.ocorrencia_id == 1)),
+        ('Fila de e-mails: lote pronto para envio',
+         db.select(FilaEmail.id).where(
+             FilaEmail.status == FilaEmail.STATUS_PENDENTE, FilaEmail.proxima_tentativa <= db.func.current_timestamp()
+         ).order_by(FilaEmail.proxima_tentativa, FilaEmail.id).limit(50)),
+    ]
+
+
+# "SCAN tabela" (ou "SCAN tabela AS alias") sem índice: leitura da tabela inteira.
+# Varreduras por índice, tabelas virtuais (FTS5/R*Tree) e subconsultas não contam.
+_SQLITE_SCAN = re.compile(r'^SCAN (?!\()(\w+)(?: AS \w+)?$')
+# Subconsultas no FROM aparecem com nome próprio ("MATERIALIZE anon_1" e depois "SCAN anon_1")
+_SQLITE_SUBQUERY = re.compile(r'^(?:MATERIALIZE|CO-ROUTINE) (\w+)$')
+
+
+def _sqlite_full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    plano = [row[-1] for row in rows]
+    subconsultas = {match.group(1) for match in (_SQLITE_SUBQUERY.match(linha) for linha in plano) if match}
+    tabelas = [
+        match.group(1) for match in (_SQLITE_SCAN.match(linha) for linha in plano)
+        if match and match.group(1) not in subconsultas
+    ]
+    return plano, tabelas
+
+
+def _postgres_full_scans(connection, statement, parameters):
+    # Com enable_seqscan desligado, o planejador só escolhe Seq Scan se não houver índice utilizável
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    plano_json = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plano = []
+    tabelas = []
+
+    def visitar(no, nivel=0):
+        plano.append(f"{'  ' * nivel}{no['Node Type']} {no.get('Relation Name', '')}".rstrip())
+        if no['Node Type'] == 'Seq Scan':
+            tabelas.append(no['Relation Name'])
+        for filho in no.get('Plans', []):
+            visitar(filho, nivel + 1)
+
+    visitar(plano_json[0]['Plan'])
+    return plano, tabelas
+
+
+def explain(connection, statement, parameters=None):
+    """
+    Retorna (linhas do plano, tabelas lidas por completo) para o SQL informado.
+    """
+    if connection.dialect.name == 'sqlite':
+        return _sqlite_full_scans(connection, statement, parameters or ())
+    if connection.dialect.name == 'postgresql':
+        return _postgres_full_scans(connection, statement, parameters or {})
+    raise ValueError(f"EXPLAIN não suportado para o banco {connection.dialect.name}.")
+
+
+def _valores_de_exemplo():
+    valores = {
+        'ocorrencia_id': db.session.query(db.func.min(Ocorrencia.id)).scalar() or 1,
+        'usuario_id': db.session.query(db.func.min(Usuario.id)).scalar() or 1,
+        'orgao_id': db.session.query(db.func.min(OrgaoResponsavel.id)).scalar() or 1,
+        'status_id': db.session.query(db.func.min(Ocorrencia.status_id)).scalar() or 1,
+        'ponto_id': db.session.query(db.func.min(PontoMonitoramento.id)).scalar() or 1,
+    }
+    db.session.remove()
+    return valores
+
+
+def capture_endpoint_queries(app, paths, usuario_id):
+    """
+    Executa as requisições GET como o usuário informado (administrador) e retorna
+    uma lista de (caminho, status HTTP, [(sql, parâmetros), ...]).
+    """
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            capturadas.append((statement, parameters))
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = usuario_id
+            sess['user_profile'] = 'Administrador'
+        resultados = []
+        for path in paths:
+            del capturadas[:]
+            response = client.get(path)
+            resultados.append((path, response.status_code, list(capturadas)))
+        return resultados
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+
+
+def check_query_plans(app):
+    """
+    Roda EXPLAIN em todas as consultas dos endpoints de leitura e das consultas de
+    escrita conhecidas. Retorna um relatório com as varreduras completas encontradas.
+    """
+    admin = Usuario.query.join(Usuario.perfil).filter_by(nome='Administrador').first()
+    if admin is None:
+        raise ValueError('Nenhum administrador cadastrado; execute flask cli seed-db.')
+    admin_id = admin.id
+    valores = _valores_de_exemplo()
+    paths = [path.format(**valores) for path in ENDPOINT_REQUESTS] + sorted(FULL_LIST_REQUESTS)
+
+    relatorio = {'consultas': 0, 'varreduras': [], 'erros_http': [], 'ignoradas': []}
+    if not search_index_available():
+        # Sem FTS5 (ex.: PostgreSQL) a busca usa ILIKE '%termo%', que nenhum índice B-tree atende
+        relatorio['ignoradas'] = [f'GET {path}' for path in paths if 'search=' in path]
+        paths = [path for path in paths if 'search=' not in path]
+    vistos = set()
+    with db.engine.connect() as connection:
+        def verificar(origem, statement, parameters, permitidas):
+            chave = (statement, repr(parameters))
+            if chave in vistos:
+                return
+            vistos.add(chave)
+            relatorio['consultas'] += 1
+            trans = connection.begin()
+            try:
+                plano, tabelas = explain(connection, statement, parameters)
+            finally:
+                trans.rollback()
+            tabelas = [tabela for tabela in tabelas if tabela not in permitidas]
+            if tabelas:
+                relatorio['varreduras'].append({
+                    'origem': origem,
+                    'tabelas': tabelas,
+                    'sql': ' '.join(statement.split()),
+                    'plano': plano,
+                })
+
+        for path, status, consultas in capture_endpoint_queries(app, paths, admin_id):
+            if status >= 400:
+                relatorio['erros_http'].append({'origem': f'GET {path}', 'status': status})
+            permitidas = set(ALLOWED_FULL_SCANS)
+            if path in FULL_LIST_REQUESTS:
+                permitidas.update({'usuario', 'orgao_responsavel'})
+            for statement, parameters in consultas:
+                verificar(f'GET {path}', statement, parameters, permitidas)
+
+        for descricao, query in write_path_queries():
+            compilado = query.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+            if connection.dialect.paramstyle == 'qmark':
+                parametros = tuple(compilado.params[nome] for nome in compilado.positiontup)
+            else:
+                parametros = compilado.params
+            verificar(descricao, str(compilado), parametros, ALLOWED_FULL_SCANS)
+
+    return relatorio
@@ -0,0 +1,251 @@
+# SVCA/app/rate_limit.py
+# Limite de requisições por IP e por e-mail (token bucket) para login, cadastro e recuperação de senha.
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from sqlalchemy import case
+
+from . import db
+from .models.limite_requisicao import LimiteRequisicao
+
+# Regra -> {identificador: (capacidade, período em segundos)}. O balde começa cheio com
+# 'capacidade' tokens e é reabastecido continuamente à razão de capacidade/período.
+DEFAULT_RATE_LIMITS = {
+    'login': {'ip': (20, 300), 'email': (5, 300)},
+    'register': {'ip': (5, 3600)},
+    'forgot-password': {'ip': (5, 900), 'email': (3, 3600)},
+}
+
+# Métodos que nunca consomem tokens (ex.: GET /login apenas confirma que o backend está no ar)
+METODOS_LIVRES = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def _refill(tokens, decorrido, capacidade, periodo):
+    return min(float(capacidade), tokens + decorrido * capacidade / periodo)
+
+
+def _espera(tokens, capacidade, periodo):
+    # Segundos até o balde ter 1 token
+    return max(0.0, (1 - tokens) * periodo / capacidade)
+
+
+class MemoryBucketStore:
+    """
+    Baldes em memória, por processo. Guarda no máximo 'max_keys' chaves; as usadas
+    há mais tempo são descartadas primeiro (voltam cheias, como um cliente novo).
+    """
+
+    def __init__(self, max_keys=100_000):
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def acquire(self, chave, capacidade, periodo):
+        """
+        Consome um token da chave. Retorna (permitido, segundos até o próximo token).
+        """
+        agora = time.monotonic()
+        with self._lock:
+            tokens, atualizado_em = self._baldes.pop(chave, (float(capacidade), agora))
+            tokens = _refill(tokens, agora - atualizado_em, capacidade, periodo)
+            permitido = tokens >= 1
+            if permitido:
+                tokens -= 1
+            self._baldes[chave] = (tokens, agora)
+            while len(self._baldes) > self._max_keys:
+                self._baldes.popitem(last=False)
+        return permitido, _espera(tokens, capacidade, periodo)
+
+    def clear(self):
+        with self._lock:
+            self._baldes.clear()
+
+
+class DatabaseBucketStore:
+    """
+    Baldes na tabela limite_requisicao, compartilhados por todos os processos que usam
+    o mesmo banco. Cada tentativa é um único INSERT ... ON CONFLICT DO UPDATE atômico,
+    bem mais barato que a consulta do usuário e o hash da senha que ele evita.
+    """
+
+    # A cada N tentativas, apaga baldes parados há mais tempo que o maior período (já estariam cheios)
+    PRUNE_EVERY = 1000
+
+    def __init__(self, engine, max_periodo):
+        if engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif engine.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"RATE_LIMIT_STORAGE = 'database' não suportado para o banco {engine.dialect.name}.")
+        self._insert = insert
+        self._engine = engine
+        self._max_periodo = max_periodo
+        self._tentativas = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, chave, capacidade, periodo):
+        agora = time.time()
+        tabela = LimiteRequisicao.__table__
+        disponiveis = tabela.c.tokens + (agora - tabela.c.atualizado_em) * (capacidade / periodo)
+        reabastecido = case((disponiveis > capacidade, float(capacidade)), else_=disponiveis)
+        statement = self._insert(tabela).values(chave=chave, tokens=float(capacidade) - 1, atualizado_em=agora)
+        statement = statement.on_conflict_do_update(
+            index_elements=[tabela.c.chave],
+            set_={'tokens': reabastecido - 1, 'atualizado_em': agora},
+            where=reabastecido >= 1,
+        ).returning(tabela.c.tokens)
+
+        with self._engine.begin() as connection:
+            tokens = connection.execute(statement).scalar()
+            if tokens is not None:
+                permitido = True
+            else:
+                # Sem token: a linha não foi alterada; lê o saldo para calcular o Retry-After
+                permitido = False
+                linha = connection.execute(
+                    db.select(tabela.c.tokens, tabela.c.atualizado_em).where(tabela.c.chave == chave)
+                ).one()
+                tokens = _refill(linha.tokens, agora - linha.atualizado_em, capacidade, periodo)
+        self._maybe_prune(agora)
+        return permitido, _espera(tokens, capacidade, periodo)
+
+    def _maybe_prune(self, agora):
+        with self._lock:
+            self._tentativas += 1
+            if self._tentativas % self.PRUNE_EVERY:
+                return
+        with self._engine.begin() as connection:
+            connection.execute(
+                LimiteRequisicao.__table__.delete().where(LimiteRequisicao.atualizado_em < agora - self._max_periodo)
+            )
+
+    def clear(self):
+        with self._engine.begin() as connection:
+            connection.execute(LimiteRequisicao.__table__.delete())
+
+
+class RateLimiter:
+    """
+    Extensão de limite de requisições com token bucket por IP e por e-mail.
+
+    RATE_LIMIT_STORAGE = 'memory' (padrão) mantém os baldes no processo; com vários
+    processos/servidores, 'database' os compartilha pelo banco configurado.
+    Com RATE_LIMIT_ENABLED = False nenhuma requisição é limitada.
+    """
+
+    def __init__(self, app=None):
+        self._store = None
+        self._lock = threading.Lock()
+        self._metricas = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', True)
+        app.config.setdefault('RATE_LIMIT_STORAGE', 'memory')
+        app.config.setdefault('RATE_LIMITS', DEFAULT_RATE_LIMITS)
+        app.config.setdefault('RATE_LIMIT_MAX_KEYS', 100_000)
+        if app.config['RATE_LIMIT_STORAGE'] not in ('memory', 'database'):
+            raise ValueError("RATE_LIMIT_STORAGE deve ser 'memory' ou 'database'.")
+        app.extensions['rate_limiter'] = self
+
+    def _get_store(self, app):
+        with self._lock:
+            if self._store is None:
+                if app.config['RATE_LIMIT_STORAGE'] == 'database':
+                    max_periodo = max(
+                        periodo for limites in app.config['RATE_LIMITS'].values() for _, periodo in limites.values()
+                    )
+                    self._store = DatabaseBucketStore(db.engine, max_periodo)
+                else:
+                    self._store = MemoryBucketStore(app.config['RATE_LIMIT_MAX_KEYS'])
+            return self._store
+
+    def _contar(self, regra, chave_metrica):
+        with self._lock:
+            metricas = self._metricas.setdefault(regra, {'permitidas': 0, 'rejeitadas': 0, 'rejeitadas_por': {}})
+            if chave_metrica is None:
+                metricas['permitidas'] += 1
+            else:
+                metricas['rejeitadas'] += 1
+                metricas['rejeitadas_por'][chave_metrica] = metricas['rejeitadas_por'].get(chave_metrica, 0) + 1
+
+    def check(self, regra, identificadores):
+        """
+        Consome um token de cada balde da regra ({'ip': ..., 'email': ...}).
+        Retorna None se a requisição pode seguir, ou os segundos de espera se foi rejeitada.
+        """
+        app = current_app._get_current_object()
+        limites = app.config['RATE_LIMITS'].get(regra, {})
+        store = self._get_store(app)
+        for tipo, (capacidade, periodo) in limites.items():
+            valor = identificadores.get(tipo)
+            if not valor:
+                continue
+            try:
+                permitido, espera = store.acquire(f'{regra}:{tipo}:{valor}'[:255], capacidade, periodo)
+            except Exception as e:
+                # Falha no armazenamento (ex.: banco indisponível) não pode impedir o login
+                print(f"Erro no limite de requisições ({regra}/{tipo}): {e}")
+                continue
+            if not permitido:
+                self._contar(regra, tipo)
+                return espera
+        self._contar(regra, None)
+        return None
+
+    def stats(self):
+        """
+        Requisições permitidas e rejeitadas por regra (desde o início do processo).
+        """
+        with self._lock:
+            return {
+                regra: dict(metricas, rejeitadas_por=dict(metricas['rejeitadas_por']))
+                for regra, metricas in self._metricas.items()
+            }
+
+    def reset(self):
+        """
+        Esvazia os baldes e as métricas (ex.: após um bloqueio indevido).
+        """
+        app = current_app._get_current_object()
+        self._get_store(app).clear()
+        with self._lock:
+            self._metricas.clear()
+
+
+def get_rate_limiter():
+    return current_app.extensions['rate_limiter']
+
+
+def _email_da_requisicao():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limited(regra):
+    """
+    Decorador que aplica a regra de RATE_LIMITS antes de qualquer acesso ao banco ou hash
+    de senha. Excedido o limite, responde 429 com o cabeçalho Retry-After.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method in METODOS_LIVRES or not current_app.config['RATE_LIMIT_ENABLED']:
+                return f(*args, **kwargs)
+            espera = get_rate_limiter().check(regra, {'ip': request.remote_addr, 'email': _email_da_requisicao()})
+            if espera is not None:
+                segundos = max(1, math.ceil(espera))
+                response = jsonify({'error': f'Muitas tentativas. Tente novamente em {segundos} segundo(s).'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(segundos)
+                return response
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,227 @@
+# SVCA/app/response_cache.py
+# Cache das respostas JSON dos endpoints de leitura mais acessados: corpo, ETag forte e
+# versão gzip guardados por endpoint + parâmetros + perfil e invalidados por contadores de
+# versão que os commits incrementam; e compressão gzip das demais respostas JSON grandes.
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from itertools import chain
+
+from flask import Response, current_app, request, session
+from sqlalchemy import event
+
+from . import db
+
+# Grupos de respostas afetados pela escrita em cada tabela
+GRUPOS_POR_TABELA = {
+    'ocorrencia': ('ocorrencias',),
+    'coordenada': ('ocorrencias',),
+    'imagem': ('ocorrencias',),
+    'notificacao': ('ocorrencias',),
+    'ocorrencia_duplicata': ('ocorrencias',),
+    'status_ocorrencia': ('ocorrencias',),
+    'orgao_responsavel': ('ocorrencias', 'orgaos'),
+    'usuario': ('ocorrencias', 'ranking'),
+    'historico_pontuacao': ('ranking',),
+    'pontuacao_periodo': ('ranking',),
+}
+
+
+class ResponseCache:
+    """
+    Extensão de cache de respostas em memória, por processo.
+
+    Cada resposta guardada leva as versões dos seus grupos no momento em que foi gerada;
+    um commit que escreve em tabelas do grupo incrementa a versão e a resposta deixa de
+    valer. Escritas feitas por outros processos (ou fora da sessão, como as cargas em lote)
+    aparecem em até RESPONSE_CACHE_TTL segundos. Com RESPONSE_CACHE_ENABLED = False as
+    respostas são sempre geradas de novo (a compressão continua ativa).
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._versoes = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 30)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        # Corpos menores que isto vão sem compressão (o gzip não compensa)
+        app.config.setdefault('RESPONSE_GZIP_MIN_BYTES', 1024)
+        app.config.setdefault('RESPONSE_GZIP_LEVEL', 6)
+        app.extensions['response_cache'] = self
+        app.after_request(self._comprimir)
+
+    def bump(self, grupos):
+        """
+        Incrementa a versão dos grupos: as respostas guardadas deles deixam de valer.
+        """
+        with self._lock:
+            for grupo in grupos:
+                self._versoes[grupo] = self._versoes.get(grupo, 0) + 1
+
+    def versions(self, grupos):
+        with self._lock:
+            return tuple(self._versoes.get(grupo, 0) for grupo in grupos)
+
+    def clear(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def get(self, chave, versoes):
+        """
+        Entrada guardada para a chave se ainda vale para as versões informadas, ou None.
+        """
+        ttl = current_app.config['RESPONSE_CACHE_TTL']
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            if entrada['versoes'] != versoes or time.monotonic() - entrada['criada'] > ttl:
+                self._remover(chave)
+                return None
+            self._entradas.move_to_end(chave)
+            return entrada
+
+    def put(self, chave, versoes, corpo, mimetype):
+        """
+        Guarda o corpo com seu ETag (SHA-256 do conteúdo) e, se for grande, a versão gzip.
+        Retorna a entrada.
+        """
+        config = current_app.config
+        comprimido = None
+        if len(corpo) >= config['RESPONSE_GZIP_MIN_BYTES']:
+            comprimido = gzip.compress(corpo, config['RESPONSE_GZIP_LEVEL'], mtime=0)
+        entrada = {
+            'versoes': versoes,
+            'criada': time.monotonic(),
+            'corpo': corpo,
+            'gzip': comprimido,
+            'etag': hashlib.sha256(corpo).hexdigest()[:32],
+            'mimetype': mimetype,
+        }
+        with self._lock:
+            self._remover(chave)
+            self._entradas[chave] = entrada
+            self._bytes += self._tamanho(entrada)
+            # Remove as menos usadas até caber nos limites
+            while self._entradas and (len(self._entradas) > config['RESPONSE_CACHE_MAX_ENTRIES']
+                                      or self._bytes > config['RESPONSE_CACHE_MAX_BYTES']):
+                self._remover(next(iter(self._entradas)))
+        return entrada
+
+    def _tamanho(self, entrada):
+        return len(entrada['corpo']) + len(entrada['gzip'] or b'')
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self._bytes -= self._tamanho(entrada)
+
+    def respond(self, entrada):
+        """
+        Resposta para a entrada: gzip se o cliente aceitar e 304 sem corpo se o
+        If-None-Match já tiver o ETag atual.
+        """
+        usar_gzip = entrada['gzip'] is not None and 'gzip' in request.accept_encodings
+        response = Response(entrada['gzip'] if usar_gzip else entrada['corpo'], mimetype=entrada['mimetype'])
+        if entrada['gzip'] is not None:
+            response.vary.add('Accept-Encoding')
+        if usar_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+        # Cada codificação é uma representação diferente, com o seu próprio ETag forte
+        response.set_etag(entrada['etag'] + ('-gzip' if usar_gzip else ''))
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def _comprimir(self, response):
+        # Respostas JSON grandes fora do cache (listagens, painéis); as com ETag próprio ficam como estão
+        if (response.status_code != 200 or response.direct_passthrough or response.mimetype != 'application/json'
+                or 'Content-Encoding' in response.headers or 'ETag' in response.headers
+                or 'gzip' not in request.accept_encodings):
+            return response
+        corpo = response.get_data()
+        if len(corpo) < current_app.config['RESPONSE_GZIP_MIN_BYTES']:
+            return response
+        response.set_data(gzip.compress(corpo, current_app.config['RESPONSE_GZIP_LEVEL'], mtime=0))
+        response.headers['Content-Encoding'] = 'gzip'
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
+
+
+def cached_response(*grupos):
+    """
+    Decorador de rotas GET: a resposta JSON (só status 200) é guardada por endpoint,
+    parâmetros da URL e perfil do usuário e servida com ETag enquanto as versões dos
+    grupos não mudarem. Vai abaixo dos decoradores de acesso, que rodam sempre.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or not current_app.config['RESPONSE_CACHE_ENABLED']:
+                return view(*args, **kwargs)
+            cache = get_response_cache()
+            chave = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True))),
+                session.get('user_profile'),
+            )
+            # Versões lidas antes de gerar: um commit no meio invalida a entrada recém-guardada
+            versoes = cache.versions(grupos)
+            entrada = cache.get(chave, versoes)
+            if entrada is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != 'application/json':
+                    return response
+                entrada = cache.put(chave, versoes, response.get_data(), response.mimetype)
+            return cache.respond(entrada)
+        return wrapper
+    return decorator
+
+
+def _registrar_grupos(session, tabelas):
+    grupos = {grupo for tabela in tabelas for grupo in GRUPOS_POR_TABELA.get(tabela, ())}
+    if grupos:
+        session.info.setdefault('cache_grupos', set()).update(grupos)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_objetos_alterados(session, flush_context):
+    _registrar_grupos(session, {
+        getattr(obj, '__tablename__', None) for obj in chain(session.new, session.dirty, session.deleted)
+    })
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _registrar_dml(orm_execute_state):
+    # INSERT/UPDATE/DELETE executados direto pela sessão (ex.: incrementos de pontos em app/scoring.py)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabela = getattr(orm_execute_state.statement, 'table', None)
+        _registrar_grupos(orm_execute_state.session, {getattr(tabela, 'name', None)})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_respostas(session):
+    grupos = session.info.pop('cache_grupos', None)
+    if grupos and current_app and 'response_cache' in current_app.extensions:
+        get_response_cache().bump(grupos)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _descartar_grupos_alterados(session, previous_transaction):
+    session.info.pop('cache_grupos', None)
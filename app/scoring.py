@@ -0,0 +1,252 @@
+# SVCA/app/scoring.py
+# Motor de pontuação: incrementos atômicos de usuario.pontos no próprio SQL, livro-razão
+# append-only (historico_pontuacao) e somas por semana/mês lidas pelos rankings.
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, case
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import db
+from .lookups import get_lookups
+from .models.historico_pontuacao import HistoricoPontuacao
+from .models.pontuacao_periodo import PontuacaoPeriodo
+from .models.usuario import Usuario
+
+# Tipo de pontuação registrado no histórico conforme o novo status da ocorrência
+TIPO_PONTUACAO_POR_STATUS = {
+    'Em andamento': 'OcorrenciaValidada',
+    'Fechada com solução': 'OcorrenciaSolucionada',
+    'Recusada': 'OcorrenciaFalsa',
+}
+
+# Pontos do autor enquanto a ocorrência está no status, e a penalidade ao ser recusada
+PONTOS_POR_STATUS = {'Em andamento': 25, 'Fechada com solução': 50}
+PENALIDADE_RECUSA = 10
+
+PERIODOS = (PontuacaoPeriodo.PERIODO_SEMANA, PontuacaoPeriodo.PERIODO_MES)
+
+
+def inicio_da_semana(agora=None):
+    """
+    Segunda-feira 00:00 da semana corrente (horário local do servidor).
+    """
+    agora = agora or datetime.now()
+    return datetime.combine(agora.date() - timedelta(days=agora.weekday()), datetime.min.time())
+
+
+def inicio_do_periodo(periodo, agora=None):
+    """
+    Data de início da semana (segunda-feira) ou do mês que contém 'agora'.
+    """
+    agora = agora or datetime.now()
+    if periodo == PontuacaoPeriodo.PERIODO_SEMANA:
+        return inicio_da_semana(agora).date()
+    if periodo == PontuacaoPeriodo.PERIODO_MES:
+        return agora.date().replace(day=1)
+    raise ValueError(f"Período inválido: {periodo}.")
+
+
+def status_transition_points(old_status_nome, new_status_nome):
+    """
+    Variação de pontos do autor quando a ocorrência muda de status e o tipo de
+    pontuação do lançamento: sai o valor do status antigo, entra o do novo.
+    """
+    delta = PONTOS_POR_STATUS.get(new_status_nome, 0) - PONTOS_POR_STATUS.get(old_status_nome, 0)
+    if new_status_nome == 'Recusada':
+        delta -= PENALIDADE_RECUSA
+    return delta, TIPO_PONTUACAO_POR_STATUS.get(new_status_nome)
+
+
+def _somar_no_banco(delta):
+    # pontos = pontos + delta calculado pelo banco (sem sobrescrever alterações concorrentes), nunca negativo
+    novo = Usuario.__table__.c.pontos + delta
+    return case((novo < 0, 0), else_=novo)
+
+
+def _pontos_no_banco(usuario_ids):
+    """
+    Pontos atuais dos usuários lidos com SELECT ... FOR UPDATE: as linhas ficam travadas
+    até o fim da transação (ordem de id, sem deadlock entre lotes), então nenhum outro
+    processo altera os pontos entre esta leitura e o UPDATE. O SQLite ignora o FOR UPDATE,
+    mas serializa as escritas da transação inteira.
+    """
+    tabela = Usuario.__table__
+    return dict(db.session.execute(
+        db.select(tabela.c.id, tabela.c.pontos).where(tabela.c.id.in_(usuario_ids)).order_by(tabela.c.id).with_for_update()
+    ).all())
+
+
+def add_points(usuario, delta, ocorrencia_id=None, tipo_nome=None):
+    """
+    Soma 'delta' a usuario.pontos com um UPDATE atômico e registra a variação efetiva
+    (a pontuação não fica negativa) no histórico e nas somas do período, na sessão
+    atual. A variação sai dos pontos do banco antes (linha travada) e depois do UPDATE
+    (RETURNING), não do objeto em memória. Retorna a variação efetiva.
+    """
+    anterior = _pontos_no_banco([usuario.id])[usuario.id]
+    efetivo = max(delta, -anterior)
+    if not efetivo:
+        set_committed_value(usuario, 'pontos', anterior)
+        return 0
+    tabela = Usuario.__table__
+    statement = tabela.update().where(tabela.c.id == usuario.id).values(pontos=_somar_no_banco(efetivo))
+    if db.engine.dialect.update_returning:
+        atual = db.session.execute(statement.returning(tabela.c.pontos)).scalar()
+    else:
+        db.session.execute(statement)
+        atual = anterior + efetivo
+    set_committed_value(usuario, 'pontos', atual)
+    record_points_many([(usuario.id, atual - anterior, ocorrencia_id, tipo_nome)])
+    return atual - anterior
+
+
+def add_points_many(eventos):
+    """
+    Versão em lote de add_points para tuplas (usuario, delta, ocorrencia_id, tipo_nome),
+    aplicadas na ordem: cada usuário recebe a soma das variações efetivas em um único
+    UPDATE executemany. As variações partem dos pontos lidos do banco com as linhas
+    travadas (ver _pontos_no_banco). Retorna a lista de variações efetivas.
+    """
+    eventos = list(eventos)
+    if not eventos:
+        return []
+    atuais = _pontos_no_banco({usuario.id for usuario, _, _, _ in eventos})
+    usuarios = {}
+    lancamentos = []
+    for usuario, delta, ocorrencia_id, tipo_nome in eventos:
+        atual = atuais[usuario.id]
+        efetivo = max(delta, -atual)
+        atuais[usuario.id] = atual + efetivo
+        usuarios[usuario.id] = usuario
+        lancamentos.append((usuario.id, efetivo, ocorrencia_id, tipo_nome))
+
+    totais = {}
+    for usuario_id, efetivo, _, _ in lancamentos:
+        totais[usuario_id] = totais.get(usuario_id, 0) + efetivo
+    parametros = [{'b_id': usuario_id, 'b_delta': total} for usuario_id, total in totais.items() if total]
+    if parametros:
+        tabela = Usuario.__table__
+        db.session.execute(
+            tabela.update().where(tabela.c.id == bindparam('b_id')).values(pontos=_somar_no_banco(bindparam('b_delta'))),
+            parametros,
+        )
+    for usuario_id, usuario in usuarios.items():
+        set_committed_value(usuario, 'pontos', atuais[usuario_id])
+    record_points_many(lancamentos)
+    return [efetivo for _, efetivo, _, _ in lancamentos]
+
+
+def set_points(usuario, pontos):
+    """
+    Ajuste manual do administrador: define a pontuação e lança a diferença no histórico.
+    """
+    pontos = max(0, int(pontos))
+    delta = pontos - _pontos_no_banco([usuario.id])[usuario.id]
+    if not delta:
+        set_committed_value(usuario, 'pontos', pontos)
+        return 0
+    db.session.execute(Usuario.__table__.update().where(Usuario.__table__.c.id == usuario.id).values(pontos=pontos))
+    set_committed_value(usuario, 'pontos', pontos)
+    record_points_many([(usuario.id, delta, None, None)])
+    return delta
+
+
+def aggregate_rows(lancamentos):
+    """
+    Somas por (período, início, usuário) de tuplas (usuario_id, delta, criado_em),
+    no formato das linhas de pontuacao_periodo.
+    """
+    somas = {}
+    for usuario_id, delta, criado_em in lancamentos:
+        for periodo in PERIODOS:
+            chave = (periodo, inicio_do_periodo(periodo, criado_em), usuario_id)
+            somas[chave] = somas.get(chave, 0) + delta
+    return [{'periodo': periodo, 'inicio': inicio, 'usuario_id': usuario_id, 'pontos': pontos}
+            for (periodo, inicio, usuario_id), pontos in somas.items() if pontos]
+
+
+def upsert_aggregates(executor, linhas):
+    """
+    Soma as linhas às de pontuacao_periodo (INSERT ... ON CONFLICT DO UPDATE atômico no
+    SQLite e no PostgreSQL). 'executor' é a sessão ou uma conexão.
+    """
+    if not linhas:
+        return
+    tabela = PontuacaoPeriodo.__table__
+    dialeto = db.engine.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(tabela)
+        statement = statement.on_conflict_do_update(
+            index_elements=[tabela.c.periodo, tabela.c.inicio, tabela.c.usuario_id],
+            set_={'pontos': tabela.c.pontos + statement.excluded.pontos},
+        )
+        executor.execute(statement, linhas)
+        return
+    for linha in linhas:
+        alteradas = executor.execute(tabela.update().where(
+            tabela.c.periodo == linha['periodo'], tabela.c.inicio == linha['inicio'], tabela.c.usuario_id == linha['usuario_id']
+        ).values(pontos=tabela.c.pontos + linha['pontos'])).rowcount
+        if not alteradas:
+            executor.execute(tabela.insert(), [linha])
+
+
+def record_points_many(lancamentos):
+    """
+    Lança no histórico tuplas (usuario_id, delta, ocorrencia_id, tipo_nome) de variações
+    já aplicadas em usuario.pontos e atualiza as somas do período, com um executemany
+    cada. Tudo na transação da sessão: um rollback descarta também os agregados.
+    """
+    lookups = get_lookups()
+    agora = datetime.now()
+    linhas = [{
+        'usuario_id': usuario_id,
+        'ocorrencia_id': ocorrencia_id,
+        'tipo_pontuacao_id': lookups.id_for('tipo_pontuacao', tipo_nome) if tipo_nome else None,
+        'delta': delta,
+        'criado_em': agora,
+    } for usuario_id, delta, ocorrencia_id, tipo_nome in lancamentos if delta]
+    if linhas:
+        db.session.execute(db.insert(HistoricoPontuacao), linhas)
+        upsert_aggregates(db.session, aggregate_rows(
+            (linha['usuario_id'], linha['delta'], linha['criado_em']) for linha in linhas
+        ))
+    return len(linhas)
+
+
+def top_scores(periodo, n):
+    """
+    Os n usuários com mais pontos no período atual ('semana' ou 'mes'), como lista de
+    (usuario, pontos), lidos pelo índice de pontuacao_periodo; 'total' usa usuario.pontos.
+    """
+    if periodo == 'total':
+        return [(usuario, usuario.pontos) for usuario in Usuario.query.order_by(Usuario.pontos.desc()).limit(n)]
+    rows = db.session.query(Usuario, PontuacaoPeriodo.pontos).join(
+        PontuacaoPeriodo, PontuacaoPeriodo.usuario_id == Usuario.id
+    ).filter(
+        PontuacaoPeriodo.periodo == periodo,
+        PontuacaoPeriodo.inicio == inicio_do_periodo(periodo),
+        PontuacaoPeriodo.pontos > 0
+    ).order_by(PontuacaoPeriodo.pontos.desc(), PontuacaoPeriodo.usuario_id.desc()).limit(n).all()
+    return [(usuario, pontos) for usuario, pontos in rows]
+
+
+def rebuild_aggregates(batch_size=10000):
+    """
+    Recalcula pontuacao_periodo a partir do histórico inteiro (ex.: após cargas feitas
+    fora do motor de pontuação). Retorna o número de linhas gravadas.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(PontuacaoPeriodo.__table__.delete())
+        # Opção só desta consulta: execution_options() na conexão valeria também para os INSERTs
+        resultado = connection.execute(
+            db.select(HistoricoPontuacao.usuario_id, HistoricoPontuacao.delta, HistoricoPontuacao.criado_em),
+            execution_options={'yield_per': batch_size},
+        )
+        linhas = aggregate_rows(resultado)
+        for inicio in range(0, len(linhas), batch_size):
+            upsert_aggregates(connection, linhas[inicio:inicio + batch_size])
+    return len(linhas)
@@ -0,0 +1,134 @@
+# SVCA/app/search.py
+# Índice de busca textual (SQLite FTS5) para ocorrências, usuários e órgãos responsáveis.
+import re
+
+from sqlalchemy import text
+
+from . import db
+
+# Tabela FTS -> (tabela de conteúdo, colunas indexadas)
+SEARCH_TABLES = {
+    'ocorrencia_fts': ('ocorrencia', ['titulo', 'descricao', 'endereco']),
+    'usuario_fts': ('usuario', ['nome', 'email', 'telefone']),
+    'orgao_responsavel_fts': ('orgao_responsavel', ['nome', 'email']),
+}
+
+# remove_diacritics 2 torna a busca insensível a acentos ("sao" encontra "São");
+# os índices de prefixo aceleram a busca enquanto o usuário digita.
+FTS_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Cache por URL do banco indicando se o índice FTS existe
+_available = {}
+
+
+def _ddl_statements(fts_table, content_table, columns):
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{cols}, content='{content_table}', content_rowid='id', {FTS_OPTIONS})",
+        # Triggers mantêm o índice sincronizado em qualquer INSERT/UPDATE/DELETE,
+        # inclusive em inserções em massa feitas fora do ORM.
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        # O trigger de UPDATE só dispara quando colunas indexadas mudam: alterar status,
+        # órgão, pontos etc. não reescreve o documento no índice
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {content_table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def create_search_index(connection):
+    """
+    Cria (se necessário) as tabelas FTS5 e os triggers de sincronização, e reconstrói
+    o índice a partir dos dados existentes. Só tem efeito em bancos SQLite.
+    Retorna True se o índice foi criado.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    for fts_table, (content_table, columns) in SEARCH_TABLES.items():
+        for statement in _ddl_statements(fts_table, content_table, columns):
+            connection.execute(text(statement))
+        connection.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+    _available[str(connection.engine.url)] = True
+    return True
+
+
+def drop_search_index(connection):
+    """
+    Remove as tabelas FTS5 e seus triggers.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    for fts_table in SEARCH_TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {fts_table}"))
+    _available.pop(str(connection.engine.url), None)
+
+
+def search_index_available():
+    """
+    Indica se o banco atual possui o índice FTS5. O resultado é memorizado por processo.
+    """
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _available:
+        if engine.dialect.name != 'sqlite':
+            _available[key] = False
+        else:
+            with engine.connect() as conn:
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ocorrencia_fts'")
+                ).first()
+            _available[key] = found is not None
+    return _available[key]
+
+
+def build_match_query(search_term):
+    """
+    Converte o termo digitado em uma expressão MATCH do FTS5: cada palavra vira uma
+    busca por prefixo e todas precisam estar presentes. Retorna None se não houver palavras.
+    """
+    tokens = _TOKEN_RE.findall(search_term)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def ranked_search(query, model, fts_table, match_query):
+    """
+    Restringe a consulta às linhas que casam com a busca, ordenadas por relevância.
+    """
+    matches = match_subquery(fts_table, match_query)
+    return query.join(matches, model.id == matches.c.rowid).order_by(matches.c.rank)
+
+
+def match_subquery(fts_table, match_query):
+    """
+    Subconsulta com (rowid, rank) das linhas que casam com a expressão, para
+    filtrar com IN ou fazer JOIN e ordenar por relevância (bm25).
+    """
+    param = f'{fts_table}_match'
+    return text(
+        f"SELECT rowid, rank FROM {fts_table} WHERE {fts_table} MATCH :{param}"
+    ).bindparams(**{param: match_query}).columns(rowid=db.Integer, rank=db.Float).subquery()
+
+
+def ranked_occurrence_matches(match_query):
+    """
+    Subconsulta (id, rank) das ocorrências cujo texto ou cujo autor (nome/e-mail) casa
+    com a expressão. Se casar pelos dois, vale a melhor relevância (menor bm25).
+    """
+    from .models.ocorrencia import Ocorrencia
+    ocorrencias = match_subquery('ocorrencia_fts', match_query)
+    usuarios = match_subquery('usuario_fts', match_query)
+    por_autor = db.select(Ocorrencia.id, usuarios.c.rank).join(usuarios, Ocorrencia.usuario_id == usuarios.c.rowid)
+    todas = db.union_all(db.select(ocorrencias.c.rowid.label('id'), ocorrencias.c.rank), por_autor).subquery()
+    return db.select(todas.c.id, db.func.min(todas.c.rank).label('rank')).group_by(todas.c.id).subquery()
@@ -0,0 +1,112 @@
+# SVCA/app/serializers.py
+# Serialização compartilhada das ocorrências para as respostas JSON dos controllers.
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models.imagem import Imagem
+from .models.ocorrencia import Ocorrencia
+
+
+def occurrence_load_options(with_history=False):
+    """
+    Retorna as opções de carregamento antecipado usadas pelos serializadores.
+
+    Os relacionamentos muitos-para-um (status, usuário, coordenada, órgão) vêm no
+    mesmo SELECT via JOIN; as coleções (imagens e, com 'with_history', histórico e
+    duplicatas) são carregadas com um único SELECT ... IN por consulta. Assim, o
+    número de queries não cresce com o número de ocorrências.
+    """
+    options = [
+        joinedload(Ocorrencia.status_ocorrencia),
+        joinedload(Ocorrencia.usuario),
+        joinedload(Ocorrencia.coordenada),
+        joinedload(Ocorrencia.orgao_responsavel),
+        selectinload(Ocorrencia.imagens),
+    ]
+    if with_history:
+        options += [
+            selectinload(Ocorrencia.historico_notificacoes),
+            selectinload(Ocorrencia.duplicata_de),
+            selectinload(Ocorrencia.duplicatas),
+        ]
+    return options
+
+
+def image_urls(occ, versao):
+    """
+    URLs das imagens já processadas da ocorrência, na versão pedida.
+    Imagens ainda em processamento (ou que falharam) não são listadas.
+    """
+    return [img.url_para(versao) for img in occ.imagens if img.status == Imagem.STATUS_PRONTA]
+
+
+def serialize_occurrence(occ):
+    """
+    Serializa uma ocorrência no formato resumido usado pelas listagens.
+    """
+    latitude = None
+    longitude = None
+    if occ.coordenada:
+        latitude = occ.coordenada.latitude
+        longitude = occ.coordenada.longitude
+
+    return {
+        'id': occ.id,
+        'titulo': occ.titulo,
+        'descricao': occ.descricao,
+        'endereco': occ.endereco,
+        'data_registro': occ.data_registro.strftime('%Y-%m-%d'),
+        'status': occ.status_ocorrencia.nome if occ.status_ocorrencia else 'N/A',
+        'usuario_nome': occ.usuario.nome if occ.usuario else 'N/A',
+        'orgao_responsavel_nome': occ.orgao_responsavel.nome if occ.orgao_responsavel else None,
+        'imagens': image_urls(occ, 'thumbnail'),
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+
+
+def serialize_occurrence_detail(occ, include_justificativa=False):
+    """
+    Serializa uma ocorrência com todos os detalhes e o histórico de notificações.
+    """
+    latitude = None
+    longitude = None
+    if occ.coordenada:
+        latitude = occ.coordenada.latitude
+        longitude = occ.coordenada.longitude
+
+    historico_notificacoes = [
+        {
+            'mensagem': notificacao.mensagem,
+            'data_envio': notificacao.data_envio,
+            'email_destino': notificacao.email_destino
+        }
+        for notificacao in occ.historico_notificacoes
+    ]
+    historico_notificacoes.sort(key=lambda x: x['data_envio'], reverse=True)
+
+    data = {
+        'id': occ.id,
+        'titulo': occ.titulo,
+        'descricao': occ.descricao,
+        'endereco': occ.endereco,
+        'data_registro': occ.data_registro.strftime('%Y-%m-%d'),
+        'data_finalizacao': occ.data_finalizacao.strftime('%Y-%m-%d') if occ.data_finalizacao else None,
+        'status_id': occ.status_id,
+        'status_nome': occ.status_ocorrencia.nome if occ.status_ocorrencia else 'N/A',
+        'usuario_id': occ.usuario_id,
+        'usuario_nome': occ.usuario.nome if occ.usuario else 'N/A',
+        'orgao_responsavel_id': occ.orgao_responsavel_id,
+        'orgao_responsavel_nome': occ.orgao_responsavel.nome if occ.orgao_responsavel else None,
+        'tipo_pontuacao_id': occ.tipo_pontuacao_id,
+        'imagens': image_urls(occ, 'media'),
+        'imagens_originais': image_urls(occ, 'original'),
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+    if include_justificativa:
+        data['justificativa_recusa'] = occ.justificativa_recusa
+    data['historico_notificacoes'] = historico_notificacoes
+    # Relatos ligados como duplicatas no registro (ver app/duplicates.py)
+    data['duplicata_de'] = [original.id for original in occ.duplicata_de]
+    data['duplicatas'] = [duplicata.id for duplicata in occ.duplicatas]
+    return data
@@ -0,0 +1,339 @@
+# SVCA/app/spatial.py
+# Índices espaciais (SQLite R*Tree) sobre coordenada, sobre ocorrencia (posição e dia de
+# registro) e sobre os pontos de monitoramento ativos, e consultas por área do mapa.
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import contains_eager, joinedload
+
+from . import db
+from .models.coordenada import Coordenada
+from .models.ocorrencia import Ocorrencia
+from .models.ponto_monitoramento import PontoMonitoramento
+
+# Abaixo deste zoom as ocorrências são agrupadas em clusters no servidor
+CLUSTER_MAX_ZOOM = 15
+# Tamanho aproximado de cada célula de cluster, em pixels de um tile de 256px
+CLUSTER_CELL_PX = 64
+# Máximo de ocorrências individuais devolvidas por bbox (zoom alto ou sem zoom)
+MAX_BBOX_OCCURRENCES = 2000
+
+# Cache por URL do banco indicando se o R*Tree existe
+_available = {}
+
+SPATIAL_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS coordenada_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    # Triggers mantêm o R*Tree sincronizado com a tabela coordenada
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_ai AFTER INSERT ON coordenada BEGIN "
+    "INSERT INTO coordenada_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_ad AFTER DELETE ON coordenada BEGIN "
+    "DELETE FROM coordenada_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_au AFTER UPDATE ON coordenada BEGIN "
+    "DELETE FROM coordenada_rtree WHERE id = old.id; "
+    "INSERT INTO coordenada_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    # A consulta parte do R*Tree para a ocorrência; sem este índice cada coordenada varreria a tabela
+    "CREATE INDEX IF NOT EXISTS ix_ocorrencia_coordenada_id ON ocorrencia (coordenada_id)",
+]
+
+# Escala do eixo de tempo do R*Tree de ocorrências: 1 dia vale 0,001 grau (~110 m). Com dias
+# sem escala, um ano de registros "achata" os nós no tempo e cada busca percorre um mês inteiro
+# da cidade; com eixos comparáveis os nós ficam compactos no espaço e no tempo.
+GRAUS_POR_DIA = 0.001
+
+# Linhas do R*Tree espaço-temporal: posição da coordenada e dia de registro (desde 1970) em escala
+_TEMPO_SQL = f"(julianday(o.data_registro) - 2440587.5) * {GRAUS_POR_DIA}"
+OCORRENCIA_RTREE_SELECT = (
+    f"SELECT o.id, c.latitude, c.latitude, c.longitude, c.longitude, {_TEMPO_SQL}, {_TEMPO_SQL} "
+    "FROM ocorrencia o JOIN coordenada c ON c.id = o.coordenada_id"
+)
+
+OCORRENCIA_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ocorrencia_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon, min_tempo, max_tempo)",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_rtree_ai AFTER INSERT ON ocorrencia BEGIN "
+    f"INSERT INTO ocorrencia_rtree {OCORRENCIA_RTREE_SELECT} WHERE o.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_rtree_ad AFTER DELETE ON ocorrencia BEGIN "
+    "DELETE FROM ocorrencia_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_rtree_au AFTER UPDATE OF coordenada_id, data_registro ON ocorrencia BEGIN "
+    "DELETE FROM ocorrencia_rtree WHERE id = old.id; "
+    f"INSERT INTO ocorrencia_rtree {OCORRENCIA_RTREE_SELECT} WHERE o.id = new.id; END",
+    # Coordenada movida: as ocorrências que a usam mudam de posição no índice
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_rtree_coordenada_au AFTER UPDATE OF latitude, longitude ON coordenada BEGIN "
+    "DELETE FROM ocorrencia_rtree WHERE id IN (SELECT id FROM ocorrencia WHERE coordenada_id = new.id); "
+    f"INSERT INTO ocorrencia_rtree {OCORRENCIA_RTREE_SELECT} WHERE o.coordenada_id = new.id; END",
+]
+
+# R*Tree só com os pontos de monitoramento ativos (status verdadeiro)
+PONTO_RTREE_SELECT = (
+    "SELECT p.id, c.latitude, c.latitude, c.longitude, c.longitude "
+    "FROM ponto_monitoramento p JOIN coordenada c ON c.id = p.coordenada_id WHERE p.status"
+)
+
+PONTO_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ponto_monitoramento_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_ai AFTER INSERT ON ponto_monitoramento BEGIN "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_ad AFTER DELETE ON ponto_monitoramento BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_au AFTER UPDATE OF status, coordenada_id ON ponto_monitoramento BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id = old.id; "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_coordenada_au AFTER UPDATE OF latitude, longitude ON coordenada BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id IN (SELECT id FROM ponto_monitoramento WHERE coordenada_id = new.id); "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.coordenada_id = new.id; END",
+]
+
+EPOCH = date(1970, 1, 1)
+
+
+def create_spatial_index(connection):
+    """
+    Cria (se necessário) os R*Tree de coordenadas, de ocorrências e de pontos de
+    monitoramento e seus triggers, e os repopula a partir das tabelas. Só tem efeito em
+    bancos SQLite. Retorna True se foi criado.
+    """
+    if connection.dialect.name != 'sqlite':
+        return False
+    for statement in SPATIAL_DDL + OCORRENCIA_RTREE_DDL + PONTO_RTREE_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("DELETE FROM coordenada_rtree"))
+    connection.execute(text(
+        "INSERT INTO coordenada_rtree SELECT id, latitude, latitude, longitude, longitude FROM coordenada"
+    ))
+    connection.execute(text("DELETE FROM ocorrencia_rtree"))
+    connection.execute(text(f"INSERT INTO ocorrencia_rtree {OCORRENCIA_RTREE_SELECT}"))
+    connection.execute(text("DELETE FROM ponto_monitoramento_rtree"))
+    connection.execute(text(f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT}"))
+    url = str(connection.engine.url)
+    for tabela in ('coordenada_rtree', 'ocorrencia_rtree', 'ponto_monitoramento_rtree'):
+        _available[(url, tabela)] = True
+    return True
+
+
+def drop_spatial_index(connection):
+    """
+    Remove o R*Tree de coordenadas e seus triggers.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS coordenada_rtree_{suffix}"))
+    connection.execute(text("DROP TABLE IF EXISTS coordenada_rtree"))
+    _available.pop((str(connection.engine.url), 'coordenada_rtree'), None)
+    drop_occurrence_index(connection)
+    drop_monitoring_index(connection)
+
+
+def drop_occurrence_index(connection):
+    """
+    Remove só o R*Tree espaço-temporal de ocorrências e seus triggers.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au', 'coordenada_au'):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS ocorrencia_rtree_{suffix}"))
+    connection.execute(text("DROP TABLE IF EXISTS ocorrencia_rtree"))
+    _available.pop((str(connection.engine.url), 'ocorrencia_rtree'), None)
+
+
+def drop_monitoring_index(connection):
+    """
+    Remove só o R*Tree de pontos de monitoramento e seus triggers.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au', 'coordenada_au'):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS ponto_monitoramento_rtree_{suffix}"))
+    connection.execute(text("DROP TABLE IF EXISTS ponto_monitoramento_rtree"))
+    _available.pop((str(connection.engine.url), 'ponto_monitoramento_rtree'), None)
+
+
+def _rtree_available(tabela):
+    engine = db.engine
+    key = (str(engine.url), tabela)
+    if key not in _available:
+        if engine.dialect.name != 'sqlite':
+            _available[key] = False
+        else:
+            with engine.connect() as conn:
+                found = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"), {'nome': tabela}
+                ).first()
+            _available[key] = found is not None
+    return _available[key]
+
+
+def spatial_index_available():
+    """
+    Indica se o banco atual possui o R*Tree de coordenadas. O resultado é memorizado por processo.
+    """
+    return _rtree_available('coordenada_rtree')
+
+
+def occurrence_index_available():
+    """
+    Indica se o banco atual possui o R*Tree espaço-temporal de ocorrências.
+    """
+    return _rtree_available('ocorrencia_rtree')
+
+
+def monitoring_index_available():
+    """
+    Indica se o banco atual possui o R*Tree de pontos de monitoramento ativos.
+    """
+    return _rtree_available('ponto_monitoramento_rtree')
+
+
+def parse_bbox(value):
+    """
+    Converte 'minLon,minLat,maxLon,maxLat' em uma tupla de floats.
+    Lança ValueError se o formato ou os limites forem inválidos.
+    """
+    parts = value.split(',')
+    if len(parts) != 4:
+        raise ValueError('bbox deve ter o formato minLon,minLat,maxLon,maxLat.')
+    min_lon, min_lat, max_lon, max_lat = (float(p) for p in parts)
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise ValueError('bbox com limites inválidos.')
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValueError('bbox fora dos limites de latitude/longitude.')
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def bbox_filter(bbox):
+    """
+    Condição que restringe Coordenada ao retângulo, usando o R*Tree quando disponível.
+    O R*Tree guarda as caixas em float32 arredondadas para fora, por isso a consulta
+    usa interseção em vez de contenção.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if spatial_index_available():
+        in_box = text(
+            "SELECT id FROM coordenada_rtree "
+            "WHERE max_lat >= :bbox_min_lat AND min_lat <= :bbox_max_lat "
+            "AND max_lon >= :bbox_min_lon AND min_lon <= :bbox_max_lon"
+        ).bindparams(
+            bbox_min_lat=min_lat, bbox_max_lat=max_lat, bbox_min_lon=min_lon, bbox_max_lon=max_lon
+        ).columns(id=db.Integer)
+        return Coordenada.id.in_(in_box)
+    return db.and_(
+        Coordenada.latitude.between(min_lat, max_lat),
+        Coordenada.longitude.between(min_lon, max_lon)
+    )
+
+
+def recent_in_bbox_filter(bbox, desde):
+    """
+    Condição que restringe Ocorrencia às registradas a partir de 'desde' dentro do
+    retângulo (com Coordenada no JOIN). Com o R*Tree de ocorrências, posição e data
+    são filtradas juntas no índice; sem ele, cai em bbox_filter e data_registro.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if occurrence_index_available():
+        in_box = text(
+            "SELECT id FROM ocorrencia_rtree "
+            "WHERE max_lat >= :bbox_min_lat AND min_lat <= :bbox_max_lat "
+            "AND max_lon >= :bbox_min_lon AND min_lon <= :bbox_max_lon AND max_tempo >= :desde_tempo"
+        ).bindparams(
+            bbox_min_lat=min_lat, bbox_max_lat=max_lat, bbox_min_lon=min_lon, bbox_max_lon=max_lon,
+            desde_tempo=(desde - EPOCH).days * GRAUS_POR_DIA
+        ).columns(id=db.Integer)
+        return Ocorrencia.id.in_(in_box)
+    return db.and_(bbox_filter(bbox), Ocorrencia.data_registro >= desde)
+
+
+def active_points_filter(bbox):
+    """
+    Condição que restringe PontoMonitoramento aos pontos ativos dentro do retângulo (com
+    Coordenada no JOIN). Com o R*Tree a busca percorre só os pontos, não as coordenadas
+    das ocorrências.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if monitoring_index_available():
+        in_box = text(
+            "SELECT id FROM ponto_monitoramento_rtree "
+            "WHERE max_lat >= :bbox_min_lat AND min_lat <= :bbox_max_lat "
+            "AND max_lon >= :bbox_min_lon AND min_lon <= :bbox_max_lon"
+        ).bindparams(
+            bbox_min_lat=min_lat, bbox_max_lat=max_lat, bbox_min_lon=min_lon, bbox_max_lon=max_lon
+        ).columns(id=db.Integer)
+        return PontoMonitoramento.id.in_(in_box)
+    return db.and_(PontoMonitoramento.status.is_(True), bbox_filter(bbox))
+
+
+def cluster_cell_size(zoom):
+    """
+    Lado da célula de agrupamento, em graus, para o nível de zoom informado.
+    """
+    return 360.0 / (2 ** zoom) * CLUSTER_CELL_PX / 256.0
+
+
+def _floor(valor):
+    # floor() só existe no SQLite compilado com as funções matemáticas; lá o CAST trunca
+    # em direção a zero, então os negativos não inteiros descontam 1
+    if db.engine.dialect.name == 'sqlite':
+        inteiro = db.cast(valor, db.Integer)
+        return db.case((valor < inteiro, inteiro - 1), else_=inteiro)
+    return db.func.floor(valor)
+
+
+def occurrences_in_bbox(query, bbox, zoom=None, limit=MAX_BBOX_OCCURRENCES):
+    """
+    Retorna (clusterizado, itens do mapa, truncado) dentro do bbox para a consulta de
+    ocorrências informada.
+
+    Em zoom alto (ou sem zoom) retorna cada ocorrência, no máximo 'limit' (as mais
+    recentes; 'truncado' indica que havia mais). Abaixo de CLUSTER_MAX_ZOOM agrupa as
+    ocorrências com GROUP BY no banco em uma grade ancorada no mundo (célula =
+    floor(coordenada / lado)), a mesma para qualquer bbox: mover o mapa não muda os
+    clusters. Células com uma única ocorrência voltam como ocorrência comum.
+    """
+    query = query.join(Coordenada, Ocorrencia.coordenada_id == Coordenada.id).filter(bbox_filter(bbox))
+
+    if zoom is None or zoom >= CLUSTER_MAX_ZOOM:
+        occurrences = query.options(
+            contains_eager(Ocorrencia.coordenada), joinedload(Ocorrencia.status_ocorrencia)
+        ).order_by(Ocorrencia.id.desc()).limit(limit + 1).all()
+        return False, [_point(occ) for occ in occurrences[:limit]], len(occurrences) > limit
+
+    cell = cluster_cell_size(zoom)
+    cell_x = _floor(Coordenada.longitude / cell)
+    cell_y = _floor(Coordenada.latitude / cell)
+
+    cells = query.with_entities(
+        db.func.count(Ocorrencia.id),
+        db.func.avg(Coordenada.latitude),
+        db.func.avg(Coordenada.longitude),
+        db.func.min(Ocorrencia.id),
+    ).group_by(cell_x, cell_y).all()
+
+    items = []
+    single_ids = []
+    for count, latitude, longitude, first_id in cells:
+        if count == 1:
+            single_ids.append(first_id)
+        else:
+            items.append({
+                'type': 'cluster',
+                'count': count,
+                'latitude': latitude,
+                'longitude': longitude,
+            })
+
+    if single_ids:
+        singles = Ocorrencia.query.options(
+            joinedload(Ocorrencia.coordenada), joinedload(Ocorrencia.status_ocorrencia)
+        ).filter(Ocorrencia.id.in_(single_ids)).all()
+        items.extend(_point(occ) for occ in singles)
+    return True, items, False
+
+
+def _point(occ):
+    return {
+        'type': 'occurrence',
+        'id': occ.id,
+        'titulo': occ.titulo,
+        'endereco': occ.endereco,
+        'latitude': occ.coordenada.latitude,
+        'longitude': occ.coordenada.longitude,
+        'status': occ.status_ocorrencia.nome if occ.status_ocorrencia else 'N/A',
+    }
@@ -13,6 +13,11 @@ interface Occurrence {
   imagens: string[];
 }
 
+interface OccurrencesPage {
+  items: Occurrence[];
+  next_cursor: string | null;
+}
+
 interface StatusOption {
   id: number;
   nome: string;
@@ -27,14 +32,26 @@ const ManageOccurrencesPage: React.FC = () => {
   const [statusOptions, setStatusOptions] = useState<StatusOption[]>([]);
   const [currentStatusId, setCurrentStatusId] = useState<number | null>(null);
   const [message, setMessage] = useState<{ type: 'success' | 'error', text: string } | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [statusFilter, setStatusFilter] = useState<string>('');
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
 
   const navigate = useNavigate();
 
-  const fetchOccurrences = async () => {
-    setLoading(true);
+  // Busca uma página de ocorrências; com cursor, acrescenta ao final da lista atual
+  const fetchOccurrences = async (cursor: string | null = null) => {
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     setError(null);
     try {
-      const response = await fetch('http://localhost:5000/occurrences', {
+      const params = new URLSearchParams();
+      if (statusFilter) params.set('status_id', statusFilter);
+      if (cursor) params.set('cursor', cursor);
+      const query = params.toString();
+      const response = await fetch(`http://localhost:5000/occurrences${query ? `?${query}` : ''}`, {
         method: 'GET',
         credentials: 'include',
       });
@@ -48,13 +65,15 @@ const ManageOccurrencesPage: React.FC = () => {
         throw new Error(errorData.error || 'Falha ao buscar ocorrências.');
       }
 
-      const data: Occurrence[] = await response.json();
-      setOccurrences(data);
+      const data: OccurrencesPage = await response.json();
+      setOccurrences(prev => (cursor ? [...prev, ...data.items] : data.items));
+      setNextCursor(data.next_cursor);
     } catch (err: any) {
       console.error("Erro ao buscar ocorrências:", err);
       setError(err.message || 'Ocorreu um erro ao carregar as ocorrências.');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -76,10 +95,13 @@ const ManageOccurrencesPage: React.FC = () => {
   };
 
   useEffect(() => {
-    fetchOccurrences();
     fetchStatusOptions();
   }, [navigate]);
 
+  useEffect(() => {
+    fetchOccurrences();
+  }, [navigate, statusFilter]);
+
 
   const closeModal = () => {
     setIsModalOpen(false);
@@ -169,6 +191,18 @@ const ManageOccurrencesPage: React.FC = () => {
       <div className="manage-box">
         <h1 className="manage-title">Gerenciar Ocorrências</h1>
 
+        <div className="form-group">
+          <label htmlFor="status-filter">Filtrar por status:</label>
+          <select id="status-filter" value={statusFilter} onChange={(e) => setStatusFilter(e.target.value)}>
+            <option value="">Todos</option>
+            {statusOptions.map(status => (
+              <option key={status.id} value={status.id}>
+                {status.nome}
+              </option>
+            ))}
+          </select>
+        </div>
+
         {occurrences.length === 0 && (
           <p className="no-items-message">Nenhuma ocorrência encontrada.</p>
         )}
@@ -192,6 +226,12 @@ const ManageOccurrencesPage: React.FC = () => {
         </div>
         )}
 
+        {nextCursor && (
+          <button className="btn-primary" onClick={() => fetchOccurrences(nextCursor)} disabled={loadingMore}>
+            {loadingMore ? 'Carregando...' : 'Carregar mais'}
+          </button>
+        )}
+
         {isModalOpen && selectedOccurrence && (
           <div className="modal-overlay">
             <div className="modal-content">
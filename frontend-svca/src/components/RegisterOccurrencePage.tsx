@@ -2,6 +2,14 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 
+interface DuplicateCandidate {
+  id: number;
+  titulo: string;
+  status: string;
+  data_registro: string;
+  distancia_m: number;
+}
+
 const RegisterOccurrencePage: React.FC = () => {
   const [titulo, setTitulo] = useState<string>('');
   const [street, setStreet] = useState<string>(''); // Novo campo
@@ -15,6 +23,7 @@ const RegisterOccurrencePage: React.FC = () => {
   const [latitude, setLatitude] = useState<number | null>(null);
   const [longitude, setLongitude] = useState<number | null>(null);
   const [message, setMessage] = useState<{ type: 'success' | 'error', text: string } | null>(null);
+  const [candidatos, setCandidatos] = useState<DuplicateCandidate[]>([]); // Ocorrências parecidas devolvidas pelo backend (409)
   const navigate = useNavigate();
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -55,7 +64,13 @@ const RegisterOccurrencePage: React.FC = () => {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
+    await submitOccurrence();
+  };
+
+  // extra: duplicata_de (mesmo problema de uma ocorrência existente) ou ignorar_duplicatas
+  const submitOccurrence = async (extra: Record<string, string> = {}) => {
     setMessage(null);
+    setCandidatos([]);
 
     // Constrói a string de endereço a partir dos campos separados para enviar ao backend
     const fullAddressForBackend = `${street}, ${houseNumber}, ${neighborhood}, ${city}, ${state}, ${postcode}`.replace(/,(\s*,)+/g, ',').replace(/^,\s*|,\s*$/g, '');
@@ -75,6 +90,7 @@ const RegisterOccurrencePage: React.FC = () => {
     imagens.forEach((file) => {
       formData.append('imagens', file);
     });
+    Object.entries(extra).forEach(([key, value]) => formData.append(key, value));
 
     try {
       const response = await fetch('http://localhost:5000/register-occurrence', {
@@ -101,6 +117,9 @@ const RegisterOccurrencePage: React.FC = () => {
         setTimeout(() => {
           navigate('/dashboard');
         }, 2000);
+      } else if (response.status === 409 && data.candidatos) {
+        setMessage({ type: 'error', text: data.error });
+        setCandidatos(data.candidatos);
       } else {
         setMessage({ type: 'error', text: data.error || 'Erro ao registrar ocorrência.' });
       }
@@ -125,6 +144,24 @@ const RegisterOccurrencePage: React.FC = () => {
           </div>
         )}
 
+        {candidatos.length > 0 && (
+          <div className="duplicate-candidates">
+            <ul>
+              {candidatos.map((candidato) => (
+                <li key={candidato.id}>
+                  <strong>{candidato.titulo}</strong> ({candidato.status}, {candidato.data_registro}, a {Math.round(candidato.distancia_m)} m)
+                  <button type="button" className="btn-primary" onClick={() => submitOccurrence({ duplicata_de: candidato.id.toString() })}>
+                    É esta ocorrência
+                  </button>
+                </li>
+              ))}
+            </ul>
+            <button type="button" className="btn-primary" onClick={() => submitOccurrence({ ignorar_duplicatas: '1' })}>
+              Registrar mesmo assim
+            </button>
+          </div>
+        )}
+
         <form className="register-occurrence-form" onSubmit={handleSubmit}>
           <div className="form-group">
             <label htmlFor="titulo">Título</label>
@@ -0,0 +1,173 @@
+"""Fila de e-mails, histórico de pontos, versões das imagens e índices de busca/espacial
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:47:16.006792
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+FTS_TABLES = ('ocorrencia_fts', 'usuario_fts', 'orgao_responsavel_fts')
+
+# Índice FTS5 como criado nesta revisão (triggers de UPDATE em qualquer coluna; a 0009 os restringe)
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ocorrencia_fts USING fts5(titulo, descricao, endereco, content='ocorrencia', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_fts_ai AFTER INSERT ON ocorrencia BEGIN "
+    "INSERT INTO ocorrencia_fts(rowid, titulo, descricao, endereco) VALUES (new.id, new.titulo, new.descricao, new.endereco); END",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_fts_ad AFTER DELETE ON ocorrencia BEGIN "
+    "INSERT INTO ocorrencia_fts(ocorrencia_fts, rowid, titulo, descricao, endereco) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco); END",
+    "CREATE TRIGGER IF NOT EXISTS ocorrencia_fts_au AFTER UPDATE ON ocorrencia BEGIN "
+    "INSERT INTO ocorrencia_fts(ocorrencia_fts, rowid, titulo, descricao, endereco) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco); "
+    "INSERT INTO ocorrencia_fts(rowid, titulo, descricao, endereco) VALUES (new.id, new.titulo, new.descricao, new.endereco); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS usuario_fts USING fts5(nome, email, telefone, content='usuario', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS usuario_fts_ai AFTER INSERT ON usuario BEGIN "
+    "INSERT INTO usuario_fts(rowid, nome, email, telefone) VALUES (new.id, new.nome, new.email, new.telefone); END",
+    "CREATE TRIGGER IF NOT EXISTS usuario_fts_ad AFTER DELETE ON usuario BEGIN "
+    "INSERT INTO usuario_fts(usuario_fts, rowid, nome, email, telefone) "
+    "VALUES ('delete', old.id, old.nome, old.email, old.telefone); END",
+    "CREATE TRIGGER IF NOT EXISTS usuario_fts_au AFTER UPDATE ON usuario BEGIN "
+    "INSERT INTO usuario_fts(usuario_fts, rowid, nome, email, telefone) "
+    "VALUES ('delete', old.id, old.nome, old.email, old.telefone); "
+    "INSERT INTO usuario_fts(rowid, nome, email, telefone) VALUES (new.id, new.nome, new.email, new.telefone); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS orgao_responsavel_fts USING fts5(nome, email, content='orgao_responsavel', "
+    "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS orgao_responsavel_fts_ai AFTER INSERT ON orgao_responsavel BEGIN "
+    "INSERT INTO orgao_responsavel_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS orgao_responsavel_fts_ad AFTER DELETE ON orgao_responsavel BEGIN "
+    "INSERT INTO orgao_responsavel_fts(orgao_responsavel_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email); END",
+    "CREATE TRIGGER IF NOT EXISTS orgao_responsavel_fts_au AFTER UPDATE ON orgao_responsavel BEGIN "
+    "INSERT INTO orgao_responsavel_fts(orgao_responsavel_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email); "
+    "INSERT INTO orgao_responsavel_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email); END",
+]
+
+# R*Tree de coordenadas (o índice ix_ocorrencia_coordenada_id é criado acima)
+SPATIAL_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS coordenada_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_ai AFTER INSERT ON coordenada BEGIN "
+    "INSERT INTO coordenada_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_ad AFTER DELETE ON coordenada BEGIN "
+    "DELETE FROM coordenada_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS coordenada_rtree_au AFTER UPDATE ON coordenada BEGIN "
+    "DELETE FROM coordenada_rtree WHERE id = old.id; "
+    "INSERT INTO coordenada_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude); END",
+]
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('historico_pontuacao',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('ocorrencia_id', sa.Integer(), nullable=True),
+    sa.Column('tipo_pontuacao_id', sa.Integer(), nullable=True),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['ocorrencia_id'], ['ocorrencia.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['tipo_pontuacao_id'], ['tipo_pontuacao.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('historico_pontuacao', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_historico_pontuacao_criado_em'), ['criado_em'], unique=False)
+        batch_op.create_index(batch_op.f('ix_historico_pontuacao_usuario_id'), ['usuario_id'], unique=False)
+
+    op.create_table('fila_email',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('destinatario', sa.String(length=255), nullable=False),
+    sa.Column('assunto', sa.String(length=255), nullable=False),
+    sa.Column('corpo', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+    sa.Column('ultimo_erro', sa.Text(), nullable=True),
+    sa.Column('chave_dedup', sa.String(length=255), nullable=True),
+    sa.Column('reservado_por', sa.String(length=32), nullable=True),
+    sa.Column('reservado_em', sa.DateTime(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), nullable=False),
+    sa.Column('enviado_em', sa.DateTime(), nullable=True),
+    sa.Column('notificacao_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['notificacao_id'], ['notificacao.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('fila_email', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_fila_email_chave_dedup'), ['chave_dedup'], unique=False)
+        batch_op.create_index('ix_fila_email_status_proxima_tentativa', ['status', 'proxima_tentativa'], unique=False)
+
+    with op.batch_alter_table('imagem', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('url_thumbnail', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('url_media', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('largura', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('altura', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('nome_arquivo', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='pronta', nullable=False))
+        batch_op.add_column(sa.Column('erro', sa.String(length=255), nullable=True))
+        batch_op.create_index(batch_op.f('ix_imagem_nome_arquivo'), ['nome_arquivo'], unique=False)
+
+    with op.batch_alter_table('ocorrencia', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ocorrencia_coordenada_id'), ['coordenada_id'], unique=False)
+
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_usuario_pontos'), ['pontos'], unique=False)
+
+    # ### end Alembic commands ###
+
+    # Tabelas virtuais FTS5 e R*Tree com seus triggers (só no SQLite)
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SEARCH_DDL + SPATIAL_DDL:
+            op.execute(statement)
+        for fts_table in FTS_TABLES:
+            op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+        op.execute("INSERT INTO coordenada_rtree SELECT id, latitude, latitude, longitude, longitude FROM coordenada")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('coordenada_rtree_ai', 'coordenada_rtree_ad', 'coordenada_rtree_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS coordenada_rtree")
+        for fts_table in FTS_TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts_table}")
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_usuario_pontos'))
+
+    with op.batch_alter_table('ocorrencia', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ocorrencia_coordenada_id'))
+
+    with op.batch_alter_table('imagem', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_imagem_nome_arquivo'))
+        batch_op.drop_column('erro')
+        batch_op.drop_column('status')
+        batch_op.drop_column('nome_arquivo')
+        batch_op.drop_column('altura')
+        batch_op.drop_column('largura')
+        batch_op.drop_column('url_media')
+        batch_op.drop_column('url_thumbnail')
+
+    with op.batch_alter_table('fila_email', schema=None) as batch_op:
+        batch_op.drop_index('ix_fila_email_status_proxima_tentativa')
+        batch_op.drop_index(batch_op.f('ix_fila_email_chave_dedup'))
+
+    op.drop_table('fila_email')
+    with op.batch_alter_table('historico_pontuacao', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_historico_pontuacao_usuario_id'))
+        batch_op.drop_index(batch_op.f('ix_historico_pontuacao_criado_em'))
+
+    op.drop_table('historico_pontuacao')
+    # ### end Alembic commands ###
@@ -0,0 +1,51 @@
+"""R*Tree dos pontos de monitoramento ativos para o vínculo automático com ocorrências
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 15:02:11.482907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# R*Tree só com os pontos de monitoramento ativos (status verdadeiro)
+PONTO_RTREE_SELECT = (
+    "SELECT p.id, c.latitude, c.latitude, c.longitude, c.longitude "
+    "FROM ponto_monitoramento p JOIN coordenada c ON c.id = p.coordenada_id WHERE p.status"
+)
+
+PONTO_RTREE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ponto_monitoramento_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_ai AFTER INSERT ON ponto_monitoramento BEGIN "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_ad AFTER DELETE ON ponto_monitoramento BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_au AFTER UPDATE OF status, coordenada_id ON ponto_monitoramento BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id = old.id; "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS ponto_monitoramento_rtree_coordenada_au AFTER UPDATE OF latitude, longitude ON coordenada BEGIN "
+    "DELETE FROM ponto_monitoramento_rtree WHERE id IN (SELECT id FROM ponto_monitoramento WHERE coordenada_id = new.id); "
+    f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT} AND p.coordenada_id = new.id; END",
+]
+
+
+def upgrade():
+    # Só no SQLite; nos demais bancos a busca usa ix_coordenada_latitude_longitude
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in PONTO_RTREE_DDL:
+            op.execute(statement)
+        op.execute(f"INSERT INTO ponto_monitoramento_rtree {PONTO_RTREE_SELECT}")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for suffix in ('ai', 'ad', 'au', 'coordenada_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS ponto_monitoramento_rtree_{suffix}")
+        op.execute("DROP TABLE IF EXISTS ponto_monitoramento_rtree")
@@ -0,0 +1,75 @@
+"""Triggers de UPDATE da busca textual só para as colunas indexadas
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:40:27.316052
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# Trigger de UPDATE de cada tabela FTS5, só nas colunas indexadas
+GATILHOS_COLUNAS_INDEXADAS = {
+    'ocorrencia_fts': (
+        "CREATE TRIGGER ocorrencia_fts_au AFTER UPDATE OF titulo, descricao, endereco ON ocorrencia BEGIN "
+        "INSERT INTO ocorrencia_fts(ocorrencia_fts, rowid, titulo, descricao, endereco) VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco); "
+        "INSERT INTO ocorrencia_fts(rowid, titulo, descricao, endereco) VALUES (new.id, new.titulo, new.descricao, new.endereco); END"
+    ),
+    'usuario_fts': (
+        "CREATE TRIGGER usuario_fts_au AFTER UPDATE OF nome, email, telefone ON usuario BEGIN "
+        "INSERT INTO usuario_fts(usuario_fts, rowid, nome, email, telefone) VALUES ('delete', old.id, old.nome, old.email, old.telefone); "
+        "INSERT INTO usuario_fts(rowid, nome, email, telefone) VALUES (new.id, new.nome, new.email, new.telefone); END"
+    ),
+    'orgao_responsavel_fts': (
+        "CREATE TRIGGER orgao_responsavel_fts_au AFTER UPDATE OF nome, email ON orgao_responsavel BEGIN "
+        "INSERT INTO orgao_responsavel_fts(orgao_responsavel_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email); "
+        "INSERT INTO orgao_responsavel_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email); END"
+    ),
+}
+
+# Triggers da revisão 0002, em qualquer UPDATE (restaurados no downgrade)
+GATILHOS_QUALQUER_COLUNA = {
+    'ocorrencia_fts': (
+        "CREATE TRIGGER ocorrencia_fts_au AFTER UPDATE ON ocorrencia BEGIN "
+        "INSERT INTO ocorrencia_fts(ocorrencia_fts, rowid, titulo, descricao, endereco) VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco); "
+        "INSERT INTO ocorrencia_fts(rowid, titulo, descricao, endereco) VALUES (new.id, new.titulo, new.descricao, new.endereco); END"
+    ),
+    'usuario_fts': (
+        "CREATE TRIGGER usuario_fts_au AFTER UPDATE ON usuario BEGIN "
+        "INSERT INTO usuario_fts(usuario_fts, rowid, nome, email, telefone) VALUES ('delete', old.id, old.nome, old.email, old.telefone); "
+        "INSERT INTO usuario_fts(rowid, nome, email, telefone) VALUES (new.id, new.nome, new.email, new.telefone); END"
+    ),
+    'orgao_responsavel_fts': (
+        "CREATE TRIGGER orgao_responsavel_fts_au AFTER UPDATE ON orgao_responsavel BEGIN "
+        "INSERT INTO orgao_responsavel_fts(orgao_responsavel_fts, rowid, nome, email) VALUES ('delete', old.id, old.nome, old.email); "
+        "INSERT INTO orgao_responsavel_fts(rowid, nome, email) VALUES (new.id, new.nome, new.email); END"
+    ),
+}
+
+
+def _recriar_gatilhos(gatilhos):
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for fts_table, gatilho in gatilhos.items():
+        existe = op.get_bind().execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"), {'nome': fts_table}
+        ).first()
+        if existe:
+            op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_au")
+            op.execute(gatilho)
+
+
+def upgrade():
+    # Só tem efeito no SQLite (índice FTS5): AFTER UPDATE OF <colunas indexadas>
+    _recriar_gatilhos(GATILHOS_COLUNAS_INDEXADAS)
+
+
+def downgrade():
+    _recriar_gatilhos(GATILHOS_QUALQUER_COLUNA)
@@ -1,7 +1,8 @@
 #!/bin/bash
 
 # Este script inicia o aplicativo Flask.
-# Ele verifica se o banco de dados SQLite existe e o cria/popula se não existir.
+# Ele verifica se o banco de dados SQLite existe e o cria/popula se não existir;
+# se já existir (ou se DATABASE_URL apontar para outro banco), aplica as migrações pendentes.
 
 # Define o caminho para a pasta instance e o arquivo do banco de dados
 INSTANCE_DIR="./instance"
@@ -12,8 +13,8 @@ export FLASK_APP=app.run
 
 echo "Verificando o banco de dados em $DB_FILE..."
 
-# Verifica se o arquivo do banco de dados existe
-if [ ! -f "$DB_FILE" ]; then
+# Verifica se o arquivo do banco de dados existe (com DATABASE_URL definido, usa o banco configurado)
+if [ -z "$DATABASE_URL" ] && [ ! -f "$DB_FILE" ]; then
     echo "Banco de dados não encontrado. Criando e populando o banco de dados..."
 
     # Garante que a pasta instance existe
@@ -23,7 +24,7 @@ if [ ! -f "$DB_FILE" ]; then
     echo "Limpando caches Python..."
     rm -rf __pycache__/ app/__pycache__/
 
-    # Cria as tabelas do banco de dados
+    # Cria as tabelas do banco de dados (aplica as migrações)
     flask cli create-db
     if [ $? -ne 0 ]; then # Verifica o código de saída do comando anterior
         echo "Erro ao criar o banco de dados. Verifique o traceback acima."
@@ -39,7 +40,12 @@ if [ ! -f "$DB_FILE" ]; then
 
     echo "Banco de dados criado e populado com sucesso."
 else
-    echo "Banco de dados encontrado. Pulando a criação e população."
+    echo "Banco de dados encontrado. Aplicando migrações pendentes..."
+    flask cli create-db
+    if [ $? -ne 0 ]; then
+        echo "Erro ao aplicar as migrações. Verifique o traceback acima."
+        exit 1
+    fi
 fi
 
 echo "Iniciando o servidor Flask..."
@@ -0,0 +1,87 @@
+# SVCA/tests/conftest.py
+# Aplicação de teste sobre um banco SQLite temporário, já com perfis, status, tipos de
+# pontuação e os usuários iniciais do seed-db (admin, moderador e usuario @example.com).
+from datetime import date
+
+import pytest
+
+from app import create_app, db
+from app.models.coordenada import Coordenada
+from app.models.ocorrencia import Ocorrencia, StatusOcorrencia
+from app.models.usuario import Usuario
+from app.search import create_search_index
+from app.spatial import create_spatial_index
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'MAIL_QUEUE_WORKER': False,
+    'IMAGE_PROCESS_ASYNC': False,
+    'PASSWORD_HASH_ASYNC': False,
+    'RATE_LIMIT_ENABLED': False,
+    'RESPONSE_CACHE_ENABLED': False,
+    'METRICS_QUERY_BUDGET': 0,
+}
+
+
+def build_app(pasta):
+    """
+    Cria a aplicação com banco e cache de tiles dentro de 'pasta' e roda o seed-db.
+    """
+    app = create_app(dict(
+        TEST_CONFIG,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{pasta / 'svca.db'}",
+        HEATMAP_CACHE_DIR=str(pasta / 'heatmap_tiles'),
+    ))
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+            create_spatial_index(connection)
+    resultado = app.test_cli_runner().invoke(args=['cli', 'seed-db'])
+    assert resultado.exit_code == 0, resultado.output
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = build_app(tmp_path)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email):
+    """
+    Abre a sessão do usuário no cliente de teste, sem passar pelo /login.
+    """
+    usuario = Usuario.query.filter_by(email=email).one()
+    with client.session_transaction() as sessao:
+        sessao['user_id'] = usuario.id
+        sessao['user_profile'] = usuario.perfil.nome
+        sessao['user_name'] = usuario.nome
+    return usuario
+
+
+def status_id(nome):
+    return StatusOcorrencia.query.filter_by(nome=nome).one().id
+
+
+def register_occurrence(email='usuario@example.com', latitude=-8.05, longitude=-34.90):
+    """
+    Grava (com commit) uma ocorrência 'Registrada' do usuário, com coordenada própria.
+    """
+    ocorrencia = Ocorrencia(
+        titulo='Buraco na pista', descricao='Buraco grande', data_registro=date(2026, 3, 2),
+        status_id=status_id('Registrada'),
+        usuario_id=Usuario.query.filter_by(email=email).one().id,
+        coordenada=Coordenada(latitude=latitude, longitude=longitude),
+    )
+    db.session.add(ocorrencia)
+    db.session.commit()
+    return ocorrencia
@@ -0,0 +1,126 @@
+# SVCA/tests/test_analytics.py
+from datetime import date
+
+from app import db
+from app.analytics import build_dashboard, rebuild_summary
+from app.models.coordenada import Coordenada
+from app.models.orgao_responsavel import OrgaoResponsavel
+from app.models.resumo_ocorrencia import ResumoOcorrencia
+
+from conftest import register_occurrence, status_id
+
+
+def _resumo():
+    return {
+        (linha.dimensao, linha.chave, linha.status_id): (linha.quantidade, linha.finalizadas, linha.dias_ate_finalizacao)
+        for linha in ResumoOcorrencia.query.all()
+        if linha.quantidade or linha.finalizadas or linha.dias_ate_finalizacao
+    }
+
+
+def _resumo_recalculado():
+    incremental = _resumo()
+    rebuild_summary()
+    return incremental, _resumo()
+
+
+def _painel_recalculado():
+    incremental = build_dashboard()
+    rebuild_summary()
+    return incremental, build_dashboard()
+
+
+def test_alteracao_de_ocorrencia_expirada_move_a_contagem(app):
+    ocorrencia = register_occurrence()
+    registrada, em_andamento = status_id('Registrada'), status_id('Em andamento')
+
+    # Após o commit a ocorrência está expirada: o status anterior não está carregado
+    assert 'status_id' not in ocorrencia.__dict__
+    ocorrencia.status_id = em_andamento
+    db.session.commit()
+
+    total = _resumo()
+    assert (ResumoOcorrencia.DIMENSAO_TOTAL, '', em_andamento) in total
+    assert (ResumoOcorrencia.DIMENSAO_TOTAL, '', registrada) not in total
+    incremental, recalculado = _resumo_recalculado()
+    assert incremental == recalculado
+
+
+def test_finalizacao_e_mudanca_de_coordenada_de_ocorrencia_expirada(app):
+    ocorrencia = register_occurrence()
+    nova_coordenada = Coordenada(latitude=-8.10, longitude=-34.95)
+    db.session.add(nova_coordenada)
+    db.session.commit()
+
+    ocorrencia.status_id = status_id('Fechada com solução')
+    ocorrencia.data_finalizacao = date(2026, 3, 12)
+    ocorrencia.coordenada_id = nova_coordenada.id
+    db.session.commit()
+
+    incremental, recalculado = _resumo_recalculado()
+    assert incremental == recalculado
+
+
+def test_remocao_de_ocorrencia_expirada(app):
+    ocorrencia = register_occurrence()
+    db.session.delete(ocorrencia)
+    db.session.commit()
+
+    assert _resumo() == {}
+
+
+def test_remocao_de_orgao_move_as_ocorrencias_para_sem_orgao(app):
+    orgao = OrgaoResponsavel(nome='Compesa', email='compesa@example.com', telefone='8100000000')
+    db.session.add(orgao)
+    db.session.commit()
+    for ocorrencia in (register_occurrence(), register_occurrence()):
+        ocorrencia.orgao_responsavel_id = orgao.id
+    db.session.commit()
+    assert [linha['orgao_id'] for linha in build_dashboard()['por_orgao']] == [orgao.id]
+
+    # O flush anula orgao_responsavel_id das ocorrências depois do before_flush
+    db.session.delete(orgao)
+    db.session.commit()
+
+    incremental, recalculado = _painel_recalculado()
+    assert incremental == recalculado
+    assert incremental['por_orgao'] == [{'orgao_id': None, 'nome': None, 'quantidade': 2, 'tempo_medio_finalizacao_dias': None}]
+
+
+def test_orgao_criado_no_mesmo_flush_da_atribuicao(app):
+    ocorrencia = register_occurrence()
+    ocorrencia.orgao_responsavel = OrgaoResponsavel(nome='Emlurb', email='emlurb@example.com', telefone='8100000001')
+    db.session.commit()
+
+    incremental, recalculado = _painel_recalculado()
+    assert incremental == recalculado
+    assert [linha['orgao_id'] for linha in incremental['por_orgao']] == [ocorrencia.orgao_responsavel_id]
+
+
+def test_coordenada_movida_muda_a_celula_das_ocorrencias(app):
+    ocorrencia = register_occurrence(latitude=-8.05, longitude=-34.90)
+    coordenada = ocorrencia.coordenada
+    db.session.commit()
+
+    coordenada.latitude, coordenada.longitude = -7.95, -34.85
+    db.session.commit()
+
+    incremental, recalculado = _painel_recalculado()
+    assert incremental == recalculado
+    assert [(celula['latitude'], celula['longitude']) for celula in incremental['por_celula']] == [(-7.945, -34.845)]
+
+
+def test_troca_e_remocao_de_coordenada(app):
+    ocorrencia = register_occurrence()
+    antiga = ocorrencia.coordenada
+    ocorrencia.coordenada = Coordenada(latitude=-8.20, longitude=-35.10)
+    db.session.commit()
+    incremental, recalculado = _painel_recalculado()
+    assert incremental == recalculado
+
+    db.session.delete(antiga)
+    db.session.delete(ocorrencia.coordenada)
+    db.session.commit()
+    incremental, recalculado = _painel_recalculado()
+    assert incremental == recalculado
+    assert incremental['por_celula'] == []
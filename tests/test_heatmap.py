@@ -0,0 +1,69 @@
+# SVCA/tests/test_heatmap.py
+import math
+import os
+import random
+
+from app import db
+from app.heatmap import affected_tiles
+
+from conftest import register_occurrence, status_id
+
+# Tile de zoom 14 que contém o ponto padrão de register_occurrence (-8.05, -34.90)
+TILE = (14, 6603, 8559)
+
+
+def _tiles_em_cache(app):
+    raiz = app.config['HEATMAP_CACHE_DIR']
+    return sorted(
+        os.path.relpath(os.path.join(pasta, arquivo), raiz)
+        for pasta, _, arquivos in os.walk(raiz) for arquivo in arquivos
+    )
+
+
+def _tile_do_ponto(latitude, longitude, z, deslocamento_x=0.0, deslocamento_y=0.0):
+    n = 2 ** z
+    mundo_x = (longitude + 180.0) / 360.0
+    mundo_y = (1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0
+    return (min(n - 1, max(0, int(mundo_x * n + deslocamento_x))),
+            min(n - 1, max(0, int(mundo_y * n + deslocamento_y))))
+
+
+def test_tiles_afetados_incluem_vizinhos_da_margem():
+    rng = random.Random(3)
+    pontos = [(rng.uniform(-60, 60), rng.uniform(-179, 179)) for _ in range(200)]
+    margem = 2 / 64
+    tiles = affected_tiles([lat for lat, _ in pontos], [lon for _, lon in pontos], range(19), margem)
+    for z in range(19):
+        esperados = {
+            _tile_do_ponto(lat, lon, z, dx, dy)
+            for lat, lon in pontos for dx in (-margem, 0, margem) for dy in (-margem, 0, margem)
+        }
+        assert {tuple(par) for par in tiles[z].tolist()} == esperados
+
+
+def test_so_filtros_da_lista_ficam_em_disco(app, client):
+    z, x, y = TILE
+    em_andamento, registrada = status_id('Em andamento'), status_id('Registrada')
+    for parametros in ('', f'?status_id={em_andamento}', f'?status_id={em_andamento},{registrada}',
+                       '?data_inicio=2026-01-01', '?status_id=999'):
+        assert client.get(f'/tiles/heatmap/{z}/{x}/{y}.json{parametros}').status_code == 200
+
+    assert _tiles_em_cache(app) == [
+        os.path.join('padrao', str(z), str(x), f'{y}.json'),
+        os.path.join(f'status-{em_andamento}', str(z), str(x), f'{y}.json'),
+    ]
+
+
+def test_registro_invalida_os_tiles_do_ponto(app, client):
+    z, x, y = TILE
+    assert client.get(f'/tiles/heatmap/{z}/{x}/{y}.json').get_json()['total'] == 0
+    assert client.get('/tiles/heatmap/0/0/0.json').status_code == 200
+
+    ocorrencia = register_occurrence()
+    assert _tiles_em_cache(app) == []
+    assert client.get(f'/tiles/heatmap/{z}/{x}/{y}.json').get_json()['total'] == 1
+
+    # Moderação (mudança de status) também invalida
+    ocorrencia.status_id = status_id('Recusada')
+    db.session.commit()
+    assert client.get(f'/tiles/heatmap/{z}/{x}/{y}.json').get_json()['total'] == 0
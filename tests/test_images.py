@@ -0,0 +1,147 @@
+# SVCA/tests/test_images.py
+import io
+import os
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+from app import db, images
+from app.images import (discard_staged, new_image_for_upload, output_dir, process_image, rendition_filenames,
+                        renditions_exist, stage_upload, staged_copies)
+from app.models.imagem import Imagem
+
+from conftest import register_occurrence
+
+_render_original = images.render_image
+
+
+def _foto():
+    # Conteúdo aleatório: cada teste tem o seu hash e não reaproveita arquivos de outro
+    img = Image.frombytes('RGB', (64, 48), os.urandom(64 * 48 * 3))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _enviar(conteudo):
+    return stage_upload(FileStorage(stream=io.BytesIO(conteudo), filename='foto.jpg'))
+
+
+@pytest.fixture
+def hashes(app):
+    # Requisição para o url_for das imagens; no fim apaga as versões e cópias pendentes do teste
+    nomes = []
+    with app.test_request_context():
+        yield nomes
+        for nome_arquivo in nomes:
+            for caminho in staged_copies(nome_arquivo):
+                discard_staged(caminho)
+            images._remove_renditions(nome_arquivo)
+
+
+def test_envios_simultaneos_do_mesmo_conteudo_tem_copias_proprias(app, hashes):
+    conteudo = _foto()
+    nome_a, caminho_a = _enviar(conteudo)
+    nome_b, caminho_b = _enviar(conteudo)
+    hashes.append(nome_a)
+    assert nome_a == nome_b and caminho_a != caminho_b
+
+    # O segundo envio falha e descarta a sua cópia: a do primeiro continua lá
+    discard_staged(caminho_b)
+    ocorrencia = register_occurrence()
+    imagem = new_image_for_upload(nome_a, caminho_a, ocorrencia.id)
+    db.session.add(imagem)
+    db.session.commit()
+
+    assert process_image(imagem)
+    assert renditions_exist(nome_a)
+    assert staged_copies(nome_a) == []
+
+
+def test_falha_no_processamento_nao_apaga_versoes_compartilhadas(app, hashes, monkeypatch):
+    conteudo = _foto()
+    nome_arquivo, caminho = _enviar(conteudo)
+    hashes.append(nome_arquivo)
+    ocorrencia = register_occurrence()
+    imagem = new_image_for_upload(nome_arquivo, caminho, ocorrencia.id)
+    db.session.add(imagem)
+    db.session.commit()
+
+    # Outro worker termina as versões do mesmo conteúdo enquanto este falha
+    def render_concorrente(source_path, nome, config):
+        _render_original(source_path, nome, config)
+        raise OSError('disco cheio')
+    monkeypatch.setattr(images, 'render_image', render_concorrente)
+
+    assert not process_image(imagem)
+    assert imagem.status == Imagem.STATUS_FALHOU
+    assert all(os.path.exists(os.path.join(output_dir(), nome)) for nome in rendition_filenames(nome_arquivo))
+
+
+
+def test_versoes_sem_referencia_sao_removidas_apos_o_commit(app, hashes):
+    nome_arquivo, caminho = _enviar(_foto())
+    hashes.append(nome_arquivo)
+    ocorrencia = register_occurrence()
+    imagem = new_image_for_upload(nome_arquivo, caminho, ocorrencia.id)
+    db.session.add(imagem)
+    db.session.commit()
+    assert process_image(imagem)
+    db.session.commit()
+
+    db.session.delete(imagem)
+    db.session.commit()
+    assert not renditions_exist(nome_arquivo)
+
+
+def _imagem_pronta(conteudo):
+    nome_arquivo, caminho = _enviar(conteudo)
+    imagem = new_image_for_upload(nome_arquivo, caminho, register_occurrence().id)
+    db.session.add(imagem)
+    db.session.commit()
+    assert process_image(imagem)
+    db.session.commit()
+    return imagem
+
+
+def test_envio_em_andamento_protege_as_versoes_reaproveitadas(app, hashes):
+    conteudo = _foto()
+    anterior = _imagem_pronta(conteudo)
+    nome_arquivo = anterior.nome_arquivo
+    hashes.append(nome_arquivo)
+
+    # Novo envio do mesmo conteúdo reaproveita as versões; a transação dele ainda não terminou
+    _, caminho = _enviar(conteudo)
+    imagem = new_image_for_upload(nome_arquivo, caminho, register_occurrence().id)
+    assert imagem.status == Imagem.STATUS_PRONTA
+    assert staged_copies(nome_arquivo) == [caminho]
+
+    # A última referência gravada sai em outra sessão
+    with db.engine.begin() as connection:
+        connection.execute(Imagem.__table__.delete().where(Imagem.__table__.c.id == anterior.id))
+    assert images.remove_unreferenced([nome_arquivo]) == 0
+    assert renditions_exist(nome_arquivo)
+
+    db.session.add(imagem)
+    db.session.commit()
+    assert renditions_exist(nome_arquivo)
+    assert staged_copies(nome_arquivo) == []
+
+
+def test_envio_entre_a_verificacao_e_a_remocao_refaz_as_versoes(app, hashes, monkeypatch):
+    conteudo = _foto()
+    imagem = _imagem_pronta(conteudo)
+    nome_arquivo = imagem.nome_arquivo
+    hashes.append(nome_arquivo)
+
+    remover = images._remove_renditions
+    def remover_com_envio_concorrente(nome):
+        remover(nome)
+        _enviar(conteudo)
+    monkeypatch.setattr(images, '_remove_renditions', remover_com_envio_concorrente)
+
+    db.session.delete(imagem)
+    db.session.commit()
+    assert renditions_exist(nome_arquivo)
+    assert len(staged_copies(nome_arquivo)) == 1
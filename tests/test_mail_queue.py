@@ -0,0 +1,185 @@
+# SVCA/tests/test_mail_queue.py
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, mail
+from app.mail_queue import MENSAGEM_SUBSTITUIDA, _registrar_envio, enqueue_email, process_mail_queue
+from app.models.fila_email import FilaEmail
+from app.models.notificacao import Notificacao
+
+from conftest import register_occurrence
+
+ENFILEIRADA = "Notificação enfileirada para envio ao Órgão Responsável."
+
+
+def _notificacao(ocorrencia):
+    notificacao = Notificacao(mensagem=ENFILEIRADA, email_destino='orgao@example.com', ocorrencia_id=ocorrencia.id)
+    db.session.add(notificacao)
+    return notificacao
+
+
+def test_reenvio_deduplicado_marca_a_notificacao_anterior(app):
+    ocorrencia = register_occurrence()
+    primeira = _notificacao(ocorrencia)
+    enqueue_email('Notificação de Ocorrência', 'orgao@example.com', 'corpo', notificacao=primeira)
+    db.session.commit()
+
+    segunda = _notificacao(ocorrencia)
+    item = enqueue_email('Notificação de Ocorrência', 'orgao@example.com', 'corpo', notificacao=segunda)
+    db.session.commit()
+
+    assert FilaEmail.query.count() == 1
+    assert item.notificacao is segunda
+    assert primeira.mensagem == MENSAGEM_SUBSTITUIDA
+
+    _registrar_envio(item)
+    db.session.commit()
+    assert segunda.mensagem == "Notificação enviada ao Órgão Responsável."
+    assert primeira.mensagem == MENSAGEM_SUBSTITUIDA
+
+
+def test_mesma_notificacao_enfileirada_de_novo_nao_e_substituida(app):
+    notificacao = _notificacao(register_occurrence())
+    enqueue_email('Assunto', 'orgao@example.com', 'corpo', notificacao=notificacao)
+    enqueue_email('Assunto', 'orgao@example.com', 'corpo', notificacao=notificacao)
+    db.session.commit()
+
+    assert FilaEmail.query.count() == 1
+    assert notificacao.mensagem == ENFILEIRADA
+
+
+class ServidorSMTP:
+    """
+    Substituto do servidor SMTP: cada mail.connect() abre uma conexão nova. Um envio para
+    um destinatário em 'falhas' derruba a conexão, e os envios seguintes nela também falham;
+    um em 'recusados' é rejeitado sem derrubá-la.
+    """
+
+    def __init__(self):
+        self.falhas = {}
+        self.recusados = set()
+        self.entregues = []
+        self.conexoes = 0
+
+    def connect(self):
+        self.conexoes += 1
+        return ConexaoSMTP(self)
+
+
+class ConexaoSMTP:
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.caiu = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.caiu:
+            raise smtplib.SMTPServerDisconnected('Conexão encerrada')
+
+    def send(self, mensagem):
+        destinatario, = mensagem.recipients
+        if self.caiu:
+            raise smtplib.SMTPServerDisconnected('Conexão encerrada')
+        if self.servidor.falhas.get(destinatario):
+            self.servidor.falhas[destinatario] -= 1
+            self.caiu = True
+            raise smtplib.SMTPServerDisconnected('Conexão encerrada')
+        if destinatario in self.servidor.recusados:
+            raise smtplib.SMTPRecipientsRefused({destinatario: (550, b'Mailbox unavailable')})
+        self.servidor.entregues.append((destinatario, mensagem.subject))
+
+
+@pytest.fixture
+def smtp(app, monkeypatch):
+    servidor = ServidorSMTP()
+    monkeypatch.setattr(mail, 'connect', servidor.connect)
+    return servidor
+
+
+def _enfileirar(*destinatarios):
+    itens = [enqueue_email('Assunto', destinatario, 'corpo') for destinatario in destinatarios]
+    db.session.commit()
+    return itens
+
+
+def _vencer(*itens):
+    for item in itens:
+        item.proxima_tentativa = datetime.now() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_lote_entregue_numa_conexao(app, smtp):
+    notificacao = _notificacao(register_occurrence())
+    primeiro = enqueue_email('Assunto', 'a@example.com', 'corpo', notificacao=notificacao)
+    segundo, = _enfileirar('b@example.com')
+
+    assert process_mail_queue() == (2, 0)
+    assert smtp.entregues == [('a@example.com', 'Assunto'), ('b@example.com', 'Assunto')]
+    assert smtp.conexoes == 1
+    assert {primeiro.status, segundo.status} == {FilaEmail.STATUS_ENVIADO}
+    assert notificacao.mensagem == "Notificação enviada ao Órgão Responsável."
+    assert process_mail_queue() == (0, 0)
+
+
+def test_conexao_caida_interrompe_o_lote_sem_gastar_tentativas(app, smtp):
+    smtp.falhas['b@example.com'] = 1
+    primeiro, segundo, terceiro, quarto = _enfileirar('a@example.com', 'b@example.com', 'c@example.com', 'd@example.com')
+
+    assert process_mail_queue() == (1, 1)
+    assert primeiro.status == FilaEmail.STATUS_ENVIADO
+    assert segundo.tentativas == 1 and segundo.status == FilaEmail.STATUS_PENDENTE
+    # O restante volta à fila como estava, pronto para a próxima conexão
+    for item in (terceiro, quarto):
+        assert (item.status, item.tentativas, item.reservado_por) == (FilaEmail.STATUS_PENDENTE, 0, None)
+
+    assert process_mail_queue() == (2, 0)
+    assert smtp.conexoes == 2
+    assert [destinatario for destinatario, _ in smtp.entregues] == ['a@example.com', 'c@example.com', 'd@example.com']
+
+
+def test_destinatario_recusado_nao_interrompe_o_lote(app, smtp):
+    smtp.recusados.add('b@example.com')
+    _, recusado, _ = _enfileirar('a@example.com', 'b@example.com', 'c@example.com')
+
+    assert process_mail_queue() == (2, 1)
+    assert smtp.conexoes == 1
+    assert recusado.tentativas == 1 and recusado.status == FilaEmail.STATUS_PENDENTE
+
+
+def test_falhas_reagendadas_com_backoff_exponencial(app, smtp):
+    smtp.falhas['a@example.com'] = 2
+    item, = _enfileirar('a@example.com')
+
+    for tentativa, espera in ((1, 30), (2, 60)):
+        _vencer(item)
+        antes = datetime.now()
+        assert process_mail_queue(backoff_base=30) == (0, 1)
+        assert item.tentativas == tentativa and item.status == FilaEmail.STATUS_PENDENTE
+        assert antes + timedelta(seconds=espera) <= item.proxima_tentativa <= datetime.now() + timedelta(seconds=espera)
+        assert process_mail_queue(backoff_base=30) == (0, 0)
+
+    _vencer(item)
+    assert process_mail_queue(backoff_base=30) == (1, 0)
+    assert (item.status, item.tentativas, item.ultimo_erro) == (FilaEmail.STATUS_ENVIADO, 3, None)
+
+
+def test_falha_definitiva_ao_atingir_max_attempts(app, smtp):
+    smtp.falhas['orgao@example.com'] = 5
+    notificacao = _notificacao(register_occurrence())
+    item = enqueue_email('Assunto', 'orgao@example.com', 'corpo', notificacao=notificacao)
+    db.session.commit()
+
+    for _ in range(3):
+        _vencer(item)
+        assert process_mail_queue(max_attempts=3) == (0, 1)
+    assert (item.status, item.tentativas) == (FilaEmail.STATUS_FALHOU, 3)
+    assert 'Conexão encerrada' in item.ultimo_erro
+    assert notificacao.mensagem == "Falha ao enviar notificação ao Órgão Responsável."
+
+    _vencer(item)
+    assert process_mail_queue(max_attempts=3) == (0, 0)
+    assert smtp.entregues == []
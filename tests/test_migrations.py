@@ -0,0 +1,77 @@
+# SVCA/tests/test_migrations.py
+import os
+import re
+
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import text
+
+from app import create_app, db
+from app.analytics import rebuild_summary
+from app.models.historico_pontuacao import HistoricoPontuacao
+from app.scoring import aggregate_rows
+from app.search import create_search_index
+from app.spatial import create_spatial_index
+
+from conftest import TEST_CONFIG
+
+MIGRACOES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def _app(pasta, nome):
+    return create_app(dict(TEST_CONFIG, SQLALCHEMY_DATABASE_URI=f"sqlite:///{pasta / nome}"))
+
+
+def _indices_virtuais():
+    # Tabelas FTS5/R*Tree e seus triggers, com o SQL normalizado
+    return {
+        nome: re.sub(r'\s+', ' ', sql) for nome, sql in db.session.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'trigger') "
+            "AND (name LIKE '%\\_fts%' ESCAPE '\\' OR name LIKE '%\\_rtree%' ESCAPE '\\')"
+        ))
+    }
+
+
+def _tabela(nome, colunas):
+    return sorted(tuple(str(valor) for valor in linha) for linha in db.session.execute(text(f"SELECT {colunas} FROM {nome}")))
+
+
+def test_migracoes_criam_os_indices_do_codigo_atual(tmp_path):
+    atual = _app(tmp_path, 'atual.db')
+    with atual.app_context():
+        db.create_all()
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+            create_spatial_index(connection)
+        esperado = _indices_virtuais()
+        db.engine.dispose()
+
+    migrado = _app(tmp_path, 'migrado.db')
+    with migrado.app_context():
+        upgrade(directory=MIGRACOES)
+        assert _indices_virtuais() == esperado
+
+        downgrade(directory=MIGRACOES, revision='base')
+        assert _indices_virtuais() == {}
+        db.engine.dispose()
+
+
+def test_migracoes_preenchem_agregados_das_linhas_existentes(tmp_path):
+    app = _app(tmp_path, 'svca.db')
+    with app.app_context():
+        upgrade(directory=MIGRACOES)
+        resultado = app.test_cli_runner().invoke(args=['cli', 'seed-synthetic', '--users', '20', '--occurrences', '300'])
+        assert resultado.exit_code == 0, resultado.output
+
+        # Volta para antes de pontuacao_periodo e resumo_ocorrencia: o upgrade os recalcula
+        downgrade(directory=MIGRACOES, revision='0004')
+        upgrade(directory=MIGRACOES)
+        pontuacao = _tabela('pontuacao_periodo', 'periodo, inicio, usuario_id, pontos')
+        resumo = _tabela('resumo_ocorrencia', 'dimensao, chave, status_id, quantidade, finalizadas, dias_ate_finalizacao')
+
+        lancamentos = [(linha.usuario_id, linha.delta, linha.criado_em) for linha in HistoricoPontuacao.query]
+        assert pontuacao == sorted(tuple(str(valor) for valor in linha.values()) for linha in aggregate_rows(lancamentos))
+        rebuild_summary()
+        assert resumo == _tabela('resumo_ocorrencia', 'dimensao, chave, status_id, quantidade, finalizadas, dias_ate_finalizacao')
+        assert pontuacao and resumo
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,29 @@
+# SVCA/tests/test_moderation.py
+import pytest
+
+from app import db
+from app.models.ocorrencia import Ocorrencia
+
+from conftest import login, register_occurrence, status_id
+
+
+@pytest.mark.parametrize('ids', ['12', {'1': 1}, 7, None])
+def test_ids_que_nao_sao_lista_respondem_400(app, client, ids):
+    ocorrencia = register_occurrence()
+    login(client, 'moderador@example.com')
+
+    resposta = client.patch('/occurrences/bulk', json={'ids': ids, 'status_id': status_id('Em andamento')})
+    assert resposta.status_code == 400
+    assert 'lista' in resposta.get_json()['error']
+    db.session.expire_all()
+    assert db.session.get(Ocorrencia, ocorrencia.id).status_id == status_id('Registrada')
+
+
+def test_ids_em_lista_aplicam_o_lote(app, client):
+    ocorrencia = register_occurrence()
+    login(client, 'moderador@example.com')
+
+    resposta = client.patch('/occurrences/bulk', json={'ids': [ocorrencia.id], 'status_id': status_id('Em andamento')})
+    assert resposta.status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Ocorrencia, ocorrencia.id).status_id == status_id('Em andamento')
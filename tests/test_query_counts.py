@@ -0,0 +1,57 @@
+# SVCA/tests/test_query_counts.py
+# As listagens carregam os relacionamentos em lote: o número de consultas por requisição
+# não pode crescer com o número de ocorrências (sem N+1).
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.benchmarks.dataset import seed_dataset
+from app.models.usuario import Usuario
+
+from conftest import build_app, login
+
+N = 15
+ROTAS = ('/occurrences?limit=200', '/my-occurrences')
+
+
+def _contar_consultas(pasta, ocorrencias):
+    """
+    Consultas SQL de cada rota com 'ocorrencias' ocorrências, todas de um mesmo autor e
+    cada uma com imagens, órgão e notificações (ver seed_dataset).
+    """
+    app = build_app(pasta)
+    with app.app_context():
+        dados = seed_dataset(users=1, occurrences=ocorrencias, orgaos=3, images_per_occurrence=2, seed=7)
+        autor = db.session.get(Usuario, dados['usuario_ids'][0])
+        admin_email, autor_email = 'admin@example.com', autor.email
+        db.session.remove()
+
+        consultas = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(1))
+        contagens = {}
+        for rota, email in zip(ROTAS, (admin_email, autor_email)):
+            client = app.test_client()
+            login(client, email)
+            # Primeira chamada aquece os caches (identidade, tabelas de apoio)
+            resposta = client.get(rota)
+            assert resposta.status_code == 200
+            del consultas[:]
+            resposta = client.get(rota)
+            assert resposta.status_code == 200
+            itens = resposta.get_json()
+            assert len(itens['items'] if isinstance(itens, dict) else itens) == ocorrencias
+            contagens[rota] = len(consultas)
+        db.session.remove()
+        db.engine.dispose()
+    return contagens
+
+
+@pytest.fixture(scope='module')
+def contagens(tmp_path_factory):
+    return _contar_consultas(tmp_path_factory.mktemp('n'), N), _contar_consultas(tmp_path_factory.mktemp('10n'), 10 * N)
+
+
+@pytest.mark.parametrize('rota', ROTAS)
+def test_listagens_sem_consultas_por_ocorrencia(contagens, rota):
+    poucas, muitas = contagens
+    assert poucas[rota] == muitas[rota]
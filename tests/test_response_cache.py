@@ -0,0 +1,97 @@
+# SVCA/tests/test_response_cache.py
+import gzip
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.ocorrencia import StatusOcorrencia
+
+from conftest import login, register_occurrence
+
+
+@pytest.fixture
+def client(app):
+    app.config['RESPONSE_CACHE_ENABLED'] = True
+    cliente = app.test_client()
+    login(cliente, 'usuario@example.com')
+    return cliente
+
+
+def _titulo_fora_da_sessao(ocorrencia_id, titulo):
+    # Escrita que não passa pela sessão não invalida nada: só aparece se a resposta for gerada de novo
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE ocorrencia SET titulo = :titulo WHERE id = :id"), {'titulo': titulo, 'id': ocorrencia_id})
+
+
+def test_segunda_leitura_vem_do_cache(app, client):
+    ocorrencia = register_occurrence()
+    url = f'/view-occurrence/{ocorrencia.id}'
+    primeira = client.get(url)
+    assert primeira.get_json()['titulo'] == 'Buraco na pista'
+
+    _titulo_fora_da_sessao(ocorrencia.id, 'Alterado por fora')
+    segunda = client.get(url)
+    assert segunda.get_data() == primeira.get_data()
+    assert segunda.headers['ETag'] == primeira.headers['ETag']
+
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    db.session.expire_all()
+    assert client.get(url).get_json()['titulo'] == 'Alterado por fora'
+
+
+def test_commit_invalida_a_resposta(app, client):
+    ocorrencia = register_occurrence()
+    url = f'/view-occurrence/{ocorrencia.id}'
+    etag = client.get(url).headers['ETag']
+
+    ocorrencia.titulo = 'Buraco fechado'
+    db.session.commit()
+    resposta = client.get(url)
+    assert resposta.get_json()['titulo'] == 'Buraco fechado'
+    assert resposta.headers['ETag'] != etag
+
+
+def test_commit_no_status_invalida_as_ocorrencias(app, client):
+    ocorrencia = register_occurrence()
+    url = f'/view-occurrence/{ocorrencia.id}'
+    client.get(url)
+
+    status = db.session.get(StatusOcorrencia, ocorrencia.status_id)
+    status.nome = 'Recebida'
+    db.session.commit()
+    assert 'Recebida' in client.get(url).get_data(as_text=True)
+
+
+def test_if_none_match_responde_304(app, client):
+    url = f'/view-occurrence/{register_occurrence().id}'
+    etag = client.get(url).headers['ETag']
+
+    resposta = client.get(url, headers={'If-None-Match': etag})
+    assert resposta.status_code == 304
+    assert resposta.get_data() == b''
+    assert client.get(url, headers={'If-None-Match': '"outro"'}).status_code == 200
+
+
+def test_gzip_so_acima_do_limite(app, client):
+    pequena = register_occurrence()
+    grande = register_occurrence()
+    grande.descricao = 'Buraco grande na pista principal. ' * 60
+    db.session.commit()
+
+    resposta = client.get(f'/view-occurrence/{pequena.id}', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in resposta.headers
+
+    resposta = client.get(f'/view-occurrence/{grande.id}', headers={'Accept-Encoding': 'gzip'})
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    corpo = gzip.decompress(resposta.get_data())
+    assert len(corpo) >= app.config['RESPONSE_GZIP_MIN_BYTES']
+    assert json.loads(corpo)['descricao'] == grande.descricao
+
+    # A mesma entrada serve sem compressão a quem não aceita gzip, com outro ETag
+    simples = client.get(f'/view-occurrence/{grande.id}')
+    assert 'Content-Encoding' not in simples.headers
+    assert simples.get_data() == corpo
+    assert simples.headers['ETag'] != resposta.headers['ETag']
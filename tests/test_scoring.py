@@ -0,0 +1,47 @@
+# SVCA/tests/test_scoring.py
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models.historico_pontuacao import HistoricoPontuacao
+from app.models.usuario import Usuario
+from app.scoring import add_points, add_points_many, set_points
+
+
+def _usuario_com_pontos_desatualizados(pontos_no_banco, pontos_em_memoria):
+    # Outro processo alterou os pontos depois que o objeto foi carregado
+    usuario = Usuario.query.filter_by(email='usuario@example.com').one()
+    db.session.execute(Usuario.__table__.update().where(Usuario.__table__.c.id == usuario.id).values(pontos=pontos_no_banco))
+    set_committed_value(usuario, 'pontos', pontos_em_memoria)
+    return usuario
+
+
+def _historico(usuario_id):
+    return [linha.delta for linha in HistoricoPontuacao.query.filter_by(usuario_id=usuario_id).order_by(HistoricoPontuacao.id)]
+
+
+def test_add_points_usa_os_pontos_do_banco(app):
+    usuario = _usuario_com_pontos_desatualizados(30, 0)
+
+    assert add_points(usuario, -50, tipo_nome='OcorrenciaFalsa') == -30
+    db.session.commit()
+    assert usuario.pontos == 0
+    assert _historico(usuario.id) == [-30]
+
+
+def test_add_points_many_usa_os_pontos_do_banco(app):
+    usuario = _usuario_com_pontos_desatualizados(5, 100)
+
+    efetivos = add_points_many([(usuario, -10, None, 'OcorrenciaFalsa'), (usuario, 25, None, 'OcorrenciaValidada')])
+    db.session.commit()
+    assert efetivos == [-5, 25]
+    assert usuario.pontos == 25
+    assert _historico(usuario.id) == [-5, 25]
+
+
+def test_set_points_lanca_a_diferenca_real(app):
+    usuario = _usuario_com_pontos_desatualizados(40, 10)
+
+    assert set_points(usuario, 50) == 10
+    db.session.commit()
+    assert usuario.pontos == 50
+    assert _historico(usuario.id) == [10]
@@ -0,0 +1,75 @@
+# SVCA/tests/test_search.py
+from sqlalchemy import text
+
+from app import db
+from app.search import SEARCH_TABLES, build_match_query, match_subquery
+
+from conftest import login, register_occurrence, status_id
+
+
+def _busca(termo):
+    encontradas = match_subquery('ocorrencia_fts', build_match_query(termo))
+    return [linha.rowid for linha in db.session.execute(db.select(encontradas.c.rowid))]
+
+
+def _gatilhos_de_update():
+    return {
+        nome: sql for nome, sql in db.session.execute(
+            text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_fts_au'")
+        )
+    }
+
+
+def test_gatilhos_de_update_so_disparam_nas_colunas_indexadas(app):
+    gatilhos = _gatilhos_de_update()
+    assert set(gatilhos) == {f'{fts_table}_au' for fts_table in SEARCH_TABLES}
+    for fts_table, (content_table, colunas) in SEARCH_TABLES.items():
+        assert f"AFTER UPDATE OF {', '.join(colunas)} ON {content_table}" in gatilhos[f'{fts_table}_au']
+
+
+def test_indice_acompanha_alteracoes_do_texto(app):
+    ocorrencia = register_occurrence()
+    assert _busca('buraco') == [ocorrencia.id]
+
+    ocorrencia.status_id = status_id('Em andamento')
+    db.session.commit()
+    assert _busca('buraco') == [ocorrencia.id]
+
+    ocorrencia.titulo = 'Poste apagado'
+    ocorrencia.descricao = 'Sem luz na rua'
+    db.session.commit()
+    assert _busca('buraco') == []
+    assert _busca('poste') == [ocorrencia.id]
+
+
+def _ocorrencia(titulo, descricao):
+    ocorrencia = register_occurrence()
+    ocorrencia.titulo, ocorrencia.descricao = titulo, descricao
+    db.session.commit()
+    return ocorrencia.id
+
+
+def test_listagem_com_busca_vem_por_relevancia(app, client):
+    forte = _ocorrencia('Vazamento na calçada', 'Vazamento grande, a água do vazamento desce a rua')
+    fraca = _ocorrencia('Poste apagado', 'Poste sem luz na esquina da praça, perto de um antigo vazamento já consertado')
+    _ocorrencia('Buraco na pista', 'Buraco grande')
+    login(client, 'admin@example.com')
+
+    # Sem relevância a mais recente (maior id) viria primeiro
+    resposta = client.get('/occurrences?search=vazamento').get_json()
+    assert [item['id'] for item in resposta['items']] == [forte, fraca]
+
+    pagina = client.get('/occurrences?search=vazamento&limit=1').get_json()
+    assert [item['id'] for item in pagina['items']] == [forte]
+    pagina = client.get(f"/occurrences?search=vazamento&limit=1&cursor={pagina['next_cursor']}").get_json()
+    assert [item['id'] for item in pagina['items']] == [fraca]
+    assert pagina['next_cursor'] is None
+
+
+def test_cursor_de_data_nao_vale_para_a_busca(app, client):
+    _ocorrencia('Vazamento na calçada', 'Vazamento grande')
+    _ocorrencia('Vazamento na praça', 'Vazamento pequeno')
+    login(client, 'admin@example.com')
+
+    cursor = client.get('/occurrences?limit=1').get_json()['next_cursor']
+    assert client.get(f'/occurrences?search=vazamento&cursor={cursor}').status_code == 400
@@ -0,0 +1,21 @@
+# SVCA/tests/test_serializers.py
+from app import db
+from app.models.ocorrencia import Ocorrencia
+from app.serializers import occurrence_load_options
+
+from conftest import register_occurrence
+
+
+def test_detalhe_carrega_as_duplicatas_antecipadamente(app):
+    original = register_occurrence()
+    duplicata = register_occurrence()
+    duplicata.duplicata_de.append(original)
+    db.session.commit()
+    original_id, duplicata_id = original.id, duplicata.id
+    db.session.expunge_all()
+
+    ocorrencia = db.session.get(Ocorrencia, original_id, options=occurrence_load_options(with_history=True))
+    # Já carregadas pela consulta: serialize_occurrence_detail não dispara lazy loads
+    for relacionamento in ('historico_notificacoes', 'duplicata_de', 'duplicatas'):
+        assert relacionamento in ocorrencia.__dict__
+    assert [occ.id for occ in ocorrencia.duplicatas] == [duplicata_id]
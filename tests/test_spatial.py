@@ -0,0 +1,47 @@
+# SVCA/tests/test_spatial.py
+import math
+import random
+
+from app.models.ocorrencia import Ocorrencia
+from app.spatial import cluster_cell_size, occurrences_in_bbox
+
+from conftest import register_occurrence
+
+ZOOM = 12
+
+
+def _clusters(bbox):
+    clustered, items, truncado = occurrences_in_bbox(Ocorrencia.query, bbox, ZOOM)
+    assert clustered and not truncado
+    return sorted(
+        (item['count'], round(item['latitude'], 9), round(item['longitude'], 9)) if item['type'] == 'cluster'
+        else (1, item['latitude'], item['longitude'])
+        for item in items
+    )
+
+
+def test_clusters_ancorados_na_grade_do_mundo(app):
+    rng = random.Random(5)
+    pontos = [(rng.uniform(-8.10, -8.00), rng.uniform(-34.95, -34.85)) for _ in range(60)]
+    for latitude, longitude in pontos:
+        register_occurrence(latitude=latitude, longitude=longitude)
+
+    # Arrastar o mapa muda o bbox, não os clusters
+    assert _clusters((-35.0, -8.2, -34.8, -7.9)) == _clusters((-34.97, -8.13, -34.61, -7.95))
+
+    lado = cluster_cell_size(ZOOM)
+    celulas = {}
+    for latitude, longitude in pontos:
+        celulas.setdefault((math.floor(longitude / lado), math.floor(latitude / lado)), []).append(latitude)
+    assert sorted(len(membros) for membros in celulas.values()) == [item[0] for item in _clusters((-35.0, -8.2, -34.8, -7.9))]
+
+
+def test_zoom_alto_limita_as_ocorrencias(app):
+    ids = [register_occurrence(latitude=-8.05 + i * 0.0001).id for i in range(5)]
+
+    clustered, items, truncado = occurrences_in_bbox(Ocorrencia.query, (-35.0, -8.2, -34.8, -7.9), None, limit=3)
+    assert not clustered and truncado
+    assert [item['id'] for item in items] == sorted(ids, reverse=True)[:3]
+
+    _, items, truncado = occurrences_in_bbox(Ocorrencia.query, (-35.0, -8.2, -34.8, -7.9), None, limit=5)
+    assert len(items) == 5 and not truncado